@@ -0,0 +1,146 @@
+"""
+Upload counters behind the monthly targets and weekly counts.
+
+A billboard counts towards its owner's `Target` for the month, and
+`WeeklyUploadCount` for the week, of its upload date in local time. The
+counters only change when a billboard is created or deleted, or its owner
+or date is changed, with one atomic increment per counter row, so reading
+them never counts billboards. `rebuild_counters` recomputes them all from
+the billboards table.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from ansaa_server.db import increment
+from ansaa_server.versioning import bump_version
+from media_asset.models import Billboards
+from .models import Target, WeeklyUploadCount
+
+
+def week_start(day):
+    """
+    The Monday starting the week of `day`.
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def upload_key(values):
+    """
+    (user_id, local upload date) of a billboard, from a dict of attnames or
+    a model instance, or None if either is missing.
+    """
+    get = values.get if isinstance(values, dict) else lambda attname: getattr(values, attname)
+    user_id, date = get('user_id'), get('date')
+    if user_id is None or date is None:
+        return None
+    return user_id, timezone.localtime(date).date()
+
+
+def upload_deltas(old, new):
+    """
+    Changes per (user_id, day) when a billboard moves from `old` to `new`
+    (either may be None for a create or delete).
+    """
+    deltas = Counter()
+    if old and upload_key(old):
+        deltas[upload_key(old)] -= 1
+    if new and upload_key(new):
+        deltas[upload_key(new)] += 1
+    return {key: change for key, change in deltas.items() if change}
+
+
+def _add(model, lookup, field, change):
+    if change > 0:
+        increment(model, lookup, **{field: change})
+    elif change < 0:
+        # Never below zero, in case the counter was already out of step
+        model.objects.filter(**lookup).update(**{field: Greatest(F(field) + change, 0)})
+
+
+def apply_upload_deltas(deltas):
+    """
+    Apply changes per (user_id, day) to the monthly and weekly counters,
+    one increment per counter row.
+    """
+    monthly, weekly = Counter(), Counter()
+    for (user_id, day), change in deltas.items():
+        monthly[(user_id, day.year, day.month)] += change
+        weekly[(user_id, week_start(day))] += change
+
+    for (user_id, year, month), change in sorted(monthly.items()):
+        _add(Target, {'user_id': user_id, 'year': year, 'month': month}, 'target_count', change)
+    for (user_id, week), change in sorted(weekly.items()):
+        _add(WeeklyUploadCount, {'user_id': user_id, 'week_start': week}, 'upload_count', change)
+    if deltas:
+        bump_version(*{f'targets:user:{user_id}' for user_id, _ in deltas})
+
+
+def weekly_count(user_id, week=None):
+    """
+    Number of billboards the user uploaded in the week starting `week`
+    (the current week by default).
+    """
+    if week is None:
+        week = week_start(timezone.localdate())
+    count = (
+        WeeklyUploadCount.objects.filter(user_id=user_id, week_start=week)
+        .values_list('upload_count', flat=True).first()
+    )
+    return count or 0
+
+
+def rebuild_counters():
+    """
+    Recompute every monthly target count and weekly count from the
+    billboards table in one grouped query. Targets keep their goals, and
+    targets without uploads are set to zero. Returns the number of monthly
+    and weekly counters with uploads.
+    """
+    rows = (
+        Billboards.objects
+        .order_by()
+        .annotate(day=TruncDate('date', tzinfo=timezone.get_current_timezone()))
+        .values_list('user_id', 'day')
+        .annotate(count=Count('id'))
+    )
+    monthly, weekly = Counter(), Counter()
+    for user_id, day, count in rows:
+        monthly[(user_id, day.year, day.month)] += count
+        weekly[(user_id, week_start(day))] += count
+
+    with transaction.atomic():
+        targets = {
+            (target.user_id, target.year, target.month): target
+            for target in Target.objects.select_for_update().only('pk', 'user_id', 'year', 'month', 'target_count')
+        }
+        changed = []
+        for key, target in targets.items():
+            count = monthly.get(key, 0)
+            if target.target_count != count:
+                target.target_count = count
+                changed.append(target)
+        Target.objects.bulk_update(changed, ['target_count'], batch_size=1000)
+        Target.objects.bulk_create(
+            [
+                Target(user_id=user_id, year=year, month=month, target_count=count)
+                for (user_id, year, month), count in monthly.items()
+                if (user_id, year, month) not in targets
+            ],
+            batch_size=1000,
+        )
+
+        WeeklyUploadCount.objects.all().delete()
+        WeeklyUploadCount.objects.bulk_create(
+            [
+                WeeklyUploadCount(user_id=user_id, week_start=week, upload_count=count)
+                for (user_id, week), count in weekly.items()
+            ],
+            batch_size=1000,
+        )
+        bump_version(*{f'targets:user:{user_id}' for user_id, _, _ in set(targets) | set(monthly)})
+    return len(monthly), len(weekly)
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ansa_target.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly target counts and weekly upload counts from the billboards table.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        months, weeks = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {months} monthly and {weeks} weekly counter(s) in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_targets(apps, schema_editor):
+    """
+    Keep the oldest target of each user and month. Their counts are
+    recomputed afterwards by `rebuild_target_counters`.
+    """
+    Target = apps.get_model('ansa_target', 'Target')
+    duplicated = (
+        Target.objects.order_by().values('user_id', 'year', 'month')
+        .annotate(copies=Count('id'), keep=Min('id')).filter(copies__gt=1)
+    )
+    for row in duplicated:
+        Target.objects.filter(user_id=row['user_id'], year=row['year'], month=row['month']).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ansa_target', '0004_alter_target_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyUploadCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('upload_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Weekly upload count',
+                'verbose_name_plural': 'Weekly upload counts',
+            },
+        ),
+        migrations.RunPython(remove_duplicate_targets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='target',
+            constraint=models.UniqueConstraint(fields=('user', 'year', 'month'), name='target_user_year_month_uniq'),
+        ),
+        migrations.AddField(
+            model_name='weeklyuploadcount',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='weeklyuploadcount',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start'), name='weekly_upload_count_user_week_uniq'),
+        ),
+    ]
@@ -1,11 +1,15 @@
+from collections import Counter
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from authentication.models import AnsaaUser
 from datetime import datetime
 from media_asset.models import Billboards
+from media_asset.signals import billboards_bulk_created
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
+from ansaa_server.versioning import bump_version
 
 
 class Month(models.IntegerChoices):
@@ -34,54 +38,75 @@ class Target(models.Model):
     class Meta:
         verbose_name = _('Monthly Target')
         verbose_name_plural = _('Monthly Targets')
+        constraints = [
+            # One counter row per month, so uploads can increment it atomically
+            models.UniqueConstraint(fields=['user', 'year', 'month'], name='target_user_year_month_uniq'),
+        ]
 
     def __str__(self):
         return f'{self.user.fullname} - {self.month}/{self.year} Target'
 
 
+class WeeklyUploadCount(models.Model):
+    """
+    Number of billboards a user uploaded in the week starting on
+    `week_start` (a Monday, local time). Kept up to date by the receivers
+    below; see ansa_target/counters.py.
+    """
+    user = models.ForeignKey(AnsaaUser, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    upload_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Weekly upload count')
+        verbose_name_plural = _('Weekly upload counts')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start'], name='weekly_upload_count_user_week_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - week of {self.week_start}: {self.upload_count}'
+
+
+@receiver([post_save, post_delete], sender=Target)
+def bump_targets_version(sender, instance, **kwargs):
+    bump_version(f'targets:user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Billboards)
 def count_user_target(sender, instance, created, **kwargs):
     """
-    Updates the target_count of the user's current month's target upon billboard creation.
+    Count a new billboard towards its owner's target and weekly count for
+    the month and week of its upload date. Edits only move it between
+    counters when they change the owner or the date.
     """
-    year = datetime.now().year
-    month = datetime.now().month
-    target_obj, created = Target.objects.get_or_create(
-        user=instance.user, 
-        year=year, 
-        month=month,
-        defaults={'target': 50}
-    )
+    from .counters import apply_upload_deltas, upload_deltas
 
-    if created:  # Only increment if a new billboard is created
-        target_obj.target_count += 1
-        target_obj.save()
+    old = None if created else instance.loaded_values()
+    if not created and not old:
+        # Saved without being loaded, so there is nothing to compare with
+        return
+    apply_upload_deltas(upload_deltas(old, instance))
 
-        
-    if not created:  # Increment the count if the target already existed
-        target_obj.target_count += 1
-        target_obj.save()
 
-# Connect signal to create or update target count
-models.signals.post_save.connect(count_user_target, sender=Billboards)
+@receiver(billboards_bulk_created, sender=Billboards)
+def count_bulk_created_target(sender, billboards, **kwargs):
+    """
+    Add a batch of new billboards to the counters, with one increment per
+    user, month and week.
+    """
+    from .counters import apply_upload_deltas, upload_key
+
+    deltas = Counter(upload_key(billboard) for billboard in billboards)
+    deltas.pop(None, None)
+    apply_upload_deltas(deltas)
 
 
 @receiver(post_delete, sender=Billboards)
 def decrement_target_count(sender, instance, **kwargs):
     """
-    Decrements the target_count of the user's current month's target 
-    when a billboard is deleted.
+    Remove a deleted billboard from the counters of its upload date.
     """
-    current_date = timezone.now()
-    month = current_date.month
-    year = current_date.year
-
-    try:
-        target_obj = Target.objects.get(user=instance.user, month=month, year=year)
-        if target_obj.target_count > 0:
-            target_obj.target_count -= 1
-            target_obj.save()
-    except Target.DoesNotExist:
-        pass  # If no target object exists, nothing to decrement
-
-# Connect signals
-models.signals.post_save.connect(count_user_target, sender=Billboards)
\ No newline at end of file
+    from .counters import apply_upload_deltas, upload_deltas
+
+    apply_upload_deltas(upload_deltas(instance, None))
@@ -1,8 +1,7 @@
 from rest_framework import serializers
 from .models import Target
+from .counters import weekly_count
 from media_asset.models import Billboards
-from datetime import timedelta
-from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field
 
 
@@ -26,19 +25,9 @@ class TargetSerializer(serializers.ModelSerializer):
     @extend_schema_field(serializers.IntegerField)  # Specifying the expected return type for schema
     def get_weekly_count(self, obj) -> int:
 
-        current_date = timezone.now()
-
-        # Calculate the start and end of the current week
-        start_of_week = current_date - timedelta(days=current_date.weekday())
-        end_of_week = start_of_week + timedelta(days=6)
-
-        # Count uploads for the current week (ensure 'date' is the upload date field)
-        weekly_count = Billboards.objects.filter(
-            user=obj.user,
-            date__range=[start_of_week, end_of_week]  # Ensure 'date' is the correct field for filtering uploads
-        ).count()
-
-        return weekly_count
+        # Read from the weekly counter kept up to date on upload, instead of
+        # counting the week's billboards on every request
+        return weekly_count(obj.user_id)
 
 
 class WeeklyUploadSerializer(serializers.ModelSerializer):
@@ -1,3 +1,75 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from ansaa_server.testing import TEST_SETTINGS, QueryBudgetTestCase, SeededDataMixin, create_user
+from media_asset.models import Billboards
+from media_asset.tests import asset_payload
+from .counters import rebuild_counters, weekly_count
+from .models import Target, WeeklyUploadCount
+
+
+class MonthlyTargetTests(QueryBudgetTestCase):
+
+    def test_monthly_stats(self):
+        # The first request of the month creates the target
+        self.assertQueryBudget(5, '/api/monthly-stats')
+        response = self.assertQueryBudget(2, '/api/monthly-stats')
+        self.assertEqual(response.data['target'], 50)
+
+    def test_monthly_stats_not_modified(self):
+        etag = self.client.get('/api/monthly-stats')['ETag']
+        response = self.assertQueryBudget(0, '/api/monthly-stats', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Billboards.objects.create(user=self.user, sign_type=Billboards.UNIPOLES)
+        self.assertEqual(self.client.get('/api/monthly-stats', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(**TEST_SETTINGS)
+class MonthlyTargetETagTests(APITransactionTestCase):
+    # Commits for real, so creating the target bumps its version stamp
+
+    def test_first_response_has_current_etag(self):
+        self.client.force_authenticate(create_user(1))
+        first = self.client.get('/api/monthly-stats')
+        self.assertEqual(Target.objects.count(), 1)
+        self.assertEqual(self.client.get('/api/monthly-stats', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+
+class TargetCounterTests(SeededDataMixin, APITestCase):
+
+    def counters(self):
+        return (
+            set(Target.objects.filter(target_count__gt=0).values_list('user_id', 'year', 'month', 'target_count')),
+            set(WeeklyUploadCount.objects.filter(upload_count__gt=0).values_list('user_id', 'week_start', 'upload_count')),
+        )
+
+    def test_counts_only_creates(self):
+        billboard = Billboards.objects.create(user=self.user, sign_type=Billboards.UNIPOLES)
+        billboard.payment_status = 'paid'
+        billboard.save()
+        response = self.client.get('/api/monthly-stats')
+        self.assertEqual((response.data['target_count'], response.data['weekly_count']), (1, 1))
+
+        billboard.delete()
+        self.assertEqual(weekly_count(self.user.pk), 0)
+        self.assertEqual(Target.objects.get(user=self.user).target_count, 0)
+
+    def test_incremental_matches_rebuild(self):
+        rebuild_counters()
+        moved, deleted = Billboards.objects.filter(user=self.user)[:2]
+        moved.date = timezone.now() - timedelta(days=40)
+        moved.save()
+        deleted.delete()
+        Billboards.objects.create(user=self.other_user, sign_type=Billboards.UNIPOLES)
+        with patch('media_asset.bulk.schedule_qr_render'):
+            self.client.post('/api/asset/post-assets/bulk/', [asset_payload(number) for number in range(3)], format='json')
+
+        incremental = self.counters()
+        rebuild_counters()
+        self.assertEqual(incremental, self.counters())
@@ -9,6 +9,21 @@ from media_asset.models import Billboards
 from django.utils import timezone
 from datetime import timedelta
 from drf_spectacular.utils import extend_schema
+from ansaa_server.etags import conditional_get
+from report.utils import period_start
+
+
+def current_week(request):
+    # The weekly count and the monthly target roll over with the week
+    return period_start('week').isoformat() + timezone.now().strftime('%Y-%m')
+
+
+def create_monthly_target(view, request):
+    # Runs before the ETag is computed, so creating the target changes it
+    current_date = timezone.now()
+    view.monthly_target, created = Target.objects.get_or_create(
+        user=request.user, year=current_date.year, month=current_date.month, defaults={'target': 50},
+    )
 
 @extend_schema(
     request=TargetSerializer,
@@ -21,14 +36,8 @@ class MonthlyTarget(APIView):
     serializer_class = TargetSerializer
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(['targets:user:{user}', 'billboards:user:{user}'], scope=current_week, prepare=create_monthly_target)
     def get(self, request, format=None):
-        current_date = timezone.now()
-        month = current_date.month
-        year = current_date.year
-        user = self.request.user
-        target = Target.objects.filter(user=user)
-
-        monthly_target, created = Target.objects.get_or_create(user=user, year=year, month=month, defaults={'target': 50})
-        target_data = TargetSerializer(monthly_target)
+        target_data = TargetSerializer(self.monthly_target)
         return Response(target_data.data, status=status.HTTP_200_OK)
 
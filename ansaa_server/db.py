@@ -0,0 +1,50 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+
+def increment(model, lookup, **deltas):
+    """
+    Atomically add `deltas` to the counter columns of the row matching
+    `lookup`, creating the row when it does not exist yet. `lookup` must
+    match a unique constraint so concurrent creators collide instead of
+    duplicating the row.
+    """
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**updates)
+
+
+def increment_many(model, key_fields, rows, batch_size=1000):
+    """
+    Add counters to many rows with one statement per `batch_size` rows,
+    creating the rows that do not exist yet. Each row is a dict of the `key_fields`, which must be
+    the columns of a unique constraint, and the counter columns to add to.
+    Uses INSERT ... ON CONFLICT DO UPDATE (PostgreSQL, SQLite 3.24+).
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = list(rows[0])
+    counters = [column for column in columns if column not in key_fields]
+    # A stable row order keeps concurrent upserts from deadlocking each other
+    rows = sorted(rows, key=lambda row: tuple(row[field] for field in key_fields))
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) VALUES {{values}} "
+        f"ON CONFLICT ({', '.join(quote(field) for field in key_fields)}) DO UPDATE SET "
+        + ', '.join(f'{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}' for column in counters)
+    )
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                sql.format(values=', '.join([row_placeholder] * len(batch))),
+                [row[column] for row in batch for column in columns],
+            )
@@ -0,0 +1,78 @@
+"""
+Conditional GET for DRF views, with ETags built from data version stamps.
+
+The ETag is computed from the stamps of the data a response depends on, so
+deciding whether a client's copy is still current costs one cache read.
+Neither the queryset nor the serializer runs.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .versioning import get_versions
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+
+
+def compute_etag(request, namespaces, scope=None):
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    parts = get_versions(*(namespace.format(user=user_id) for namespace in namespaces))
+    parts += [
+        str(user_id),
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', '') or '',
+        scope(request) if scope else '',
+    ]
+    return '"' + hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32] + '"'
+
+
+def conditional_get(namespaces, scope=None, prepare=None):
+    """
+    Decorate a DRF view's `get` to send an ETag and answer a matching
+    If-None-Match with 304 Not Modified.
+
+    `namespaces` are the version stamps the response depends on; "{user}"
+    is replaced with the requesting user's id, e.g. "billboards:user:{user}".
+    `scope` is an optional callable returning anything else the response
+    depends on, such as the current week. The ETag also covers the user,
+    the full path with its query string and the negotiated media type.
+    Authentication and permission checks have already run by the time the
+    method is called.
+
+    `prepare` is an optional callable taking the view and request, for a
+    view that writes before it reads, e.g. to create a missing row. It runs
+    only when the response is going to be built, and the ETag is computed
+    again afterwards, so it covers that write.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapped_view(view, request, *args, **kwargs):
+            etag = compute_etag(request, namespaces, scope)
+
+            if _matches(request.headers.get('If-None-Match'), etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                if prepare is not None:
+                    prepare(view, request)
+                    etag = compute_etag(request, namespaces, scope)
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization', 'Accept'])
+            return response
+        return wrapped_view
+    return decorator
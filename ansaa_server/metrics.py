@@ -0,0 +1,360 @@
+"""
+Request, SQL and outbound HTTP metrics in the Prometheus text format.
+
+Each process keeps its metrics in memory and periodically writes them to
+its own JSON file in METRICS_DIR, named after its PID and a token chosen
+when it started. The /metrics view sums the files of every worker, so a
+scrape sees totals for the whole gunicorn server whichever worker answers
+it. Files left by workers that have exited are folded into one archive
+file, so totals never go backwards and the directory does not grow with
+every worker restart.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name: (type, help, buckets)
+METRICS = {
+    'ansaa_http_requests_total': ('counter', 'HTTP requests by view, method and status.', None),
+    'ansaa_http_request_duration_seconds': ('histogram', 'Time to produce the full response, by view.', LATENCY_BUCKETS),
+    'ansaa_http_response_size_bytes': ('histogram', 'Response body size, by view.', SIZE_BUCKETS),
+    'ansaa_db_queries_per_request': ('histogram', 'SQL queries run per request, by view.', QUERY_COUNT_BUCKETS),
+    'ansaa_db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries, by view.', None),
+    'ansaa_outbound_request_duration_seconds': ('histogram', 'Outbound call time, by service and outcome.', LATENCY_BUCKETS),
+}
+
+UNRESOLVED_VIEW = '<unresolved>'
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = 'metrics.lock'
+
+
+def _serialize(counters, histograms):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), list(counts), total, count]
+            for (name, labels), (counts, total, count) in histograms.items()
+        ],
+    }
+
+
+class Registry:
+    """
+    In-process metric values, flushed to this worker's file in METRICS_DIR.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+        self.pid = None
+        self.boot = None
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            counts, total, count = self.histograms.get(key) or ([0] * len(buckets), 0.0, 0)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.histograms[key] = (counts, total + value, count + 1)
+
+    def snapshot(self):
+        with self.lock:
+            return _serialize(self.counters, self.histograms)
+
+    def path(self):
+        """
+        This process's file. The token tells it apart from a file left by an
+        earlier process with the same PID, and is chosen again after a fork.
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.boot = uuid.uuid4().hex[:12]
+        return os.path.join(settings.METRICS_DIR, f'metrics-{self.pid}-{self.boot}.json')
+
+    def flush(self, force=False):
+        """
+        Write this worker's metrics to its file, at most once every
+        METRICS_FLUSH_SECONDS unless `force` is set.
+        """
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        if not self.counters and not self.histograms:
+            return
+        with self.flush_lock:
+            self.last_flush = now
+            path = self.path()
+            try:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                with open(f'{path}.tmp', 'w') as f:
+                    json.dump(self.snapshot(), f)
+                os.replace(f'{path}.tmp', path)
+            except OSError:
+                pass
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+@contextmanager
+def outbound(service):
+    """
+    Time an outbound call, e.g. `with outbound('oasis'): ...`. The outcome
+    label is "error" when the block raises.
+    """
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        registry.observe(
+            'ansaa_outbound_request_duration_seconds',
+            {'service': service, 'outcome': outcome},
+            time.perf_counter() - started,
+        )
+        registry.flush()
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts queries and the time spent in them.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    view = getattr(match.func, 'view_class', match.func)
+    return getattr(view, '__name__', match.view_name)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status, response size and SQL usage for every request,
+    labelled with the class name of the view that handled it. Streaming
+    responses are measured when their last chunk has been sent, so queries
+    made while streaming are counted too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request, response, response.streaming_content, started, queries,
+            )
+        else:
+            self.record(request, response, started, queries, len(response.content))
+        return response
+
+    def measure_stream(self, request, response, content, started, queries):
+        size = 0
+        try:
+            with connection.execute_wrapper(queries):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.record(request, response, started, queries, size)
+
+    def record(self, request, response, started, queries, size):
+        view = view_name(request)
+        labels = {'view': view, 'method': request.method}
+        registry.inc('ansaa_http_requests_total', {**labels, 'status': str(response.status_code)})
+        registry.observe('ansaa_http_request_duration_seconds', labels, time.perf_counter() - started)
+        registry.observe('ansaa_http_response_size_bytes', labels, size)
+        registry.observe('ansaa_db_queries_per_request', labels, queries.count)
+        registry.inc('ansaa_db_query_duration_seconds_total', labels, queries.duration)
+        registry.flush()
+
+
+def _file_pid(name):
+    """
+    The PID a worker file was written by, or None for other files.
+    """
+    if not name.startswith('metrics-') or name == ARCHIVE_FILE:
+        return None
+    pid = name[len('metrics-'):].split('.')[0].split('-')[0]
+    return int(pid) if pid.isdigit() and int(pid) > 0 else None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read(path, counters, histograms):
+    """
+    Add the metrics in the file at `path` to `counters` and `histograms`.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    for metric, labels, value in data.get('counters', []):
+        key = (metric, tuple(tuple(pair) for pair in labels))
+        counters[key] = counters.get(key, 0) + value
+    for metric, labels, counts, total, count in data.get('histograms', []):
+        key = (metric, tuple(tuple(pair) for pair in labels))
+        if key in histograms:
+            old_counts, old_total, old_count = histograms[key]
+            counts = [a + b for a, b in zip(old_counts, counts)]
+            total += old_total
+            count += old_count
+        histograms[key] = (counts, total, count)
+
+
+def prune(own_path=None):
+    """
+    Fold the files of exited workers into the archive file and delete them.
+    A file is stale when its PID is no longer running, or when it has this
+    process's PID but is not `own_path`. Returns the number of files removed.
+    """
+    directory = settings.METRICS_DIR
+    own_name = os.path.basename(own_path) if own_path else None
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    stale = [
+        name for name in names
+        if (pid := _file_pid(name)) is not None and name != own_name
+        and (pid == os.getpid() or not _alive(pid))
+    ]
+    if not stale:
+        return 0
+
+    try:
+        with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+            # Only one worker folds a file into the archive
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stale = [name for name in stale if os.path.exists(os.path.join(directory, name))]
+            counters, histograms = {}, {}
+            archive = os.path.join(directory, ARCHIVE_FILE)
+            _read(archive, counters, histograms)
+            for name in stale:
+                if name.endswith('.json'):
+                    _read(os.path.join(directory, name), counters, histograms)
+            with open(f'{archive}.tmp', 'w') as f:
+                json.dump(_serialize(counters, histograms), f)
+            os.replace(f'{archive}.tmp', archive)
+            for name in stale:
+                os.remove(os.path.join(directory, name))
+    except OSError:
+        return 0
+    return len(stale)
+
+
+def collect():
+    """
+    Sum the archive and the metric files of all running workers, with this
+    process's current values in place of its own file.
+    """
+    registry.flush(force=True)
+    prune(registry.path())
+    counters = {}
+    histograms = {}
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        if name.startswith('metrics-') and name.endswith('.json'):
+            _read(os.path.join(settings.METRICS_DIR, name), counters, histograms)
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def render(counters, histograms):
+    lines = []
+    for metric, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        if kind == 'counter':
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f'{metric}{_format_labels(labels)} {value}')
+            continue
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            if name != metric:
+                continue
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f'{metric}_bucket{_format_labels(labels + (("le", str(bound)),))} {bucket_count}')
+            lines.append(f'{metric}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Scrapers must send METRICS_TOKEN as a bearer
+    token; without a token only signed-in staff can read it.
+    """
+    token = settings.METRICS_TOKEN
+    scraper = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    if not (scraper or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render(*collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
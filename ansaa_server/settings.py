@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'authentication',
     'phonenumber_field',
     'rest_framework',
@@ -52,6 +54,14 @@ INSTALLED_APPS = [
     'django_crontab',
 ]
 
+CRONJOBS = [
+    ('5 0 * * *', 'report.cron.take_daily_snapshot'),
+    ('30 * * * *', 'media_asset.cron.purge_idempotency_records'),
+    ('*/10 * * * *', 'media_asset.cron.reprice_pending_assets'),
+    ('*/10 * * * *', 'media_asset.cron.render_pending_qr_codes'),
+    ('15 * * * *', 'media_asset.cron.sync_oasis_changes'),
+]
+
 SPECTACULAR_SETTINGS = {
     'TITLE': "ANSAA API's",
     'DESCRIPTION': 'The ultimate goal of the app is to assist the Anambra State government in compiling comprehensive data on all billboards within the state and generating actionable insights for state improvement initiatives',
@@ -61,7 +71,20 @@ SPECTACULAR_SETTINGS = {
 }
 
 API_KEY = "Ansa-oasis-key"
+
+# Oasis tax service integration
+OASIS_NOTIFICATION_URL = os.environ.get('OASIS_NOTIFICATION_URL', 'https://taxapp.services.an.gov.ng/api/external/asset/notification')
+OASIS_TIMEOUT = float(os.environ.get('OASIS_TIMEOUT', 30))
+OASIS_HTTP_POOL_SIZE = int(os.environ.get('OASIS_HTTP_POOL_SIZE', 10))
+OASIS_OUTBOX_BATCH_SIZE = int(os.environ.get('OASIS_OUTBOX_BATCH_SIZE', 100))
+OASIS_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OASIS_OUTBOX_MAX_ATTEMPTS', 8))
+OASIS_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('OASIS_OUTBOX_BACKOFF_SECONDS', 30))
+OASIS_OUTBOX_MAX_BACKOFF_SECONDS = int(os.environ.get('OASIS_OUTBOX_MAX_BACKOFF_SECONDS', 6 * 60 * 60))
+# How long a reconciliation run may go without finishing a chunk before
+# another run can take over
+OASIS_SYNC_LEASE_SECONDS = int(os.environ.get('OASIS_SYNC_LEASE_SECONDS', 60 * 60))
 MIDDLEWARE = [
+    'ansaa_server.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -117,6 +140,40 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        'KEY_PREFIX': 'ansaa',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
+    # Version stamps and idempotency replies. This cache is never culled, so
+    # a burst of report snapshots in the default cache cannot evict a stamp.
+    # Keep large values such as report CSVs out of it.
+    'state': {
+        'BACKEND': os.environ.get('STATE_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('STATE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'state')),
+        'KEY_PREFIX': 'ansaa',
+        'OPTIONS': {
+            'MAX_ENTRIES': sys.maxsize,
+        },
+    },
+}
+
+# Report snapshots are served from the cache until the data changes.
+REPORT_CACHE_TIMEOUT = int(os.environ.get('REPORT_CACHE_TIMEOUT', 6 * 60 * 60))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+# Request metrics, served at /metrics. Each worker writes its own file in
+# METRICS_DIR and the endpoint sums them all.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+# Bearer token for scrapers. Without it, only staff users can read /metrics.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -166,6 +223,26 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles_build', 'static')
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media_cdn')
+# Render billboard QR codes on a background thread after commit.
+QR_RENDER_ASYNC = os.environ.get('QR_RENDER_ASYNC', 'True') == 'True'
+
+# Let the reprice_pending_assets cron job reprice billboards after a
+# dimension band or the rate per square foot changes. When off, run
+# `manage.py reprice_assets` instead.
+PRICING_AUTO_REPRICE = os.environ.get('PRICING_AUTO_REPRICE', 'True') == 'True'
+
+# Largest number of assets accepted by one bulk upload.
+ASSET_BULK_MAX_ITEMS = int(os.environ.get('ASSET_BULK_MAX_ITEMS', 500))
+
+# Uploads within this many metres of a billboard with the same sign type and
+# company are rejected as duplicates unless allow_duplicate is sent.
+DUPLICATE_RADIUS_M = float(os.environ.get('DUPLICATE_RADIUS_M', 10))
+
+# How long responses to requests sent with an Idempotency-Key are kept for
+# replay, and how long a request may hold its key before a retry may take
+# it over.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
 TEMP = os.path.join(BASE_DIR, 'media_cdn/temp')
 
 AUTH_USER_MODEL = "authentication.AnsaaUser"
@@ -180,6 +257,13 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
+# Keyset pagination for asset listings
+ASSET_PAGE_SIZE = int(os.environ.get('ASSET_PAGE_SIZE', 50))
+ASSET_MAX_PAGE_SIZE = int(os.environ.get('ASSET_MAX_PAGE_SIZE', 200))
+
+# Incremental change feed (`asset/assets-list/?since=`)
+CHANGE_FEED_PAGE_SIZE = int(os.environ.get('CHANGE_FEED_PAGE_SIZE', 500))
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=5),
@@ -0,0 +1,99 @@
+"""
+Shared helpers for the API test suites.
+"""
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from authentication.models import AnsaaUser
+from media_asset.models import AssetChange, Billboards, Zones
+from media_asset.seed import seed_billboards
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'state': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'state'},
+}
+TEST_SETTINGS = {
+    'CACHES': TEST_CACHES,
+    'QR_RENDER_ASYNC': False,
+    'METRICS_ENABLED': False,
+}
+
+
+def create_user(number, **fields):
+    # Saved directly rather than through create_user(), which emails the new user
+    user = AnsaaUser(
+        email=f'user{number}@example.com',
+        phone_number=f'+23480300000{number:02d}',
+        fullname=f'User {number}',
+        **fields,
+    )
+    user.set_password('password')
+    user.save()
+    return user
+
+
+class SeededDataMixin:
+    """
+    Test settings, three users (the last one staff), five sub zones and
+    `asset_count` seeded billboards for each of the first two users, with
+    the first user signed in. Mix in before APITestCase.
+    """
+    asset_count = 30
+
+    @classmethod
+    def setUpClass(cls):
+        overrides = override_settings(**TEST_SETTINGS)
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.other_user = create_user(2)
+        cls.admin = create_user(3, is_staff=True)
+        cls.sub_zones = Zones.objects.bulk_create([Zones(name=f'Sub zone {number}') for number in range(5)])
+        seed_billboards(cls.asset_count, [cls.user], cls.sub_zones, seed=1)
+        seed_billboards(cls.asset_count, [cls.other_user], cls.sub_zones, seed=2)
+        AssetChange.objects.bulk_create(
+            AssetChange(
+                billboard_id=billboard.pk, user_id=billboard.user_id,
+                unique_id=billboard.unique_id, action=AssetChange.ACTION_UPSERT,
+            )
+            for billboard in Billboards.objects.order_by('pk')
+        )
+
+    def setUp(self):
+        super().setUp()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        self.client.force_authenticate(self.user)
+
+
+class QueryBudgetTestCase(SeededDataMixin, APITestCase):
+    """
+    Asserts how many SQL queries an endpoint may run against the seeded
+    dataset. The dataset is large enough that a query per row would blow any
+    budget, so an N+1 regression fails with the offending SQL in the
+    message.
+    """
+
+    def assertQueryBudget(self, budget, url, data=None, **extra):
+        """
+        GET `url` and assert that it ran at most `budget` queries, counting
+        the queries of a streamed body too. Returns the response.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{url} ran {len(context)} queries, budget is {budget}:\n{queries}',
+        )
+        return response
@@ -0,0 +1,51 @@
+"""
+Data version stamps shared by every worker through the "state" cache.
+
+A stamp is an opaque token per namespace (e.g. "billboards" or
+"billboards:user:42"). Writers bump it after commit; readers fold the
+current stamps into cache keys or ETags, so anything derived from older
+data is simply never looked up again. A stamp that is evicted from the
+cache is re-created with a fresh token, which only ever invalidates, but
+the state cache is never culled, so stamps are not evicted to make room.
+"""
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+KEY_PREFIX = 'version:'
+
+# Small values that must not be evicted: stamps and idempotency replies
+state_cache = ConnectionProxy(caches, 'state')
+
+
+def _key(namespace):
+    return f'{KEY_PREFIX}{namespace}'
+
+
+def get_versions(*namespaces):
+    """
+    Return the current stamp for each namespace, in order.
+    """
+    keys = [_key(namespace) for namespace in namespaces]
+    found = state_cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            state_cache.add(key, uuid.uuid4().hex, timeout=None)
+        found.update(state_cache.get_many(missing))
+    return [found.get(key, '') for key in keys]
+
+
+def get_version(namespace):
+    return get_versions(namespace)[0]
+
+
+def bump_version(*namespaces):
+    """
+    Move the given namespaces to new stamps once the current transaction
+    commits, so no reader can pair a new stamp with uncommitted data.
+    """
+    stamps = {_key(namespace): uuid.uuid4().hex for namespace in namespaces}
+    transaction.on_commit(lambda: state_cache.set_many(stamps, timeout=None))
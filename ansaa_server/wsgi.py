@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ansaa_server.settings')
 
 application = get_wsgi_application()
+
+# Load the reference data registry before the first request
+from media_asset.registry import warm  # noqa: E402
+
+warm()
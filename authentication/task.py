@@ -6,6 +6,7 @@ from django.core.mail import send_mail
 from django.template import loader
 from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
+from ansaa_server.metrics import outbound
 
 
 class EmailThread(threading.Thread):
@@ -16,7 +17,8 @@ class EmailThread(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        self.email_message.send()
+        with outbound('smtp'):
+            self.email_message.send()
 
 
 # def generate_otp():
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from . models import Billboards, Zones, Dimensions, AmountPerSqFt
+from . models import Billboards, Zones, Dimensions, AmountPerSqFt, OasisOutbox
+from .oasis import requeue_dead_letters
+from . import search
 from django.forms import TextInput, Textarea, CharField
 from django import forms
 from django.db import models
@@ -7,11 +9,15 @@ from django.db import models
 
 
 class BillboardsAdmin(admin.ModelAdmin):
-    search_fields = ('user','company_name','asset_lga','dimension', 'actual_size', 'unique_id', 'asin')
+    search_fields = search.SEARCH_FIELDS
     list_filter = ('company_name', 'status','vacancy','business_type','date')
     ordering = ('-vacancy',)
     list_display = ('user','unique_id','company_name','price','date')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed full-text and trigram search instead of icontains scans
+        return search.matching(queryset, search_term), False
+
 class ZonesAdmin(admin.ModelAdmin):
     list_display = ('id','name')
     ordering = ('name',)
@@ -19,8 +25,21 @@ class ZonesAdmin(admin.ModelAdmin):
 class DimensionsAdmin(admin.ModelAdmin):
     list_display = (f'id','name', 'category','min_width', 'max_width', 'zone','price')
     ordering = ('name',)
+
+class OasisOutboxAdmin(admin.ModelAdmin):
+    list_display = ('unique_id', 'status', 'attempts', 'response_status', 'next_attempt_at', 'created_at', 'delivered_at')
+    list_filter = ('status',)
+    search_fields = ('unique_id',)
+    readonly_fields = ('billboard', 'unique_id', 'payload', 'attempts', 'last_error', 'response_status', 'created_at', 'delivered_at')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected dead-lettered notifications')
+    def requeue(self, request, queryset):
+        requeued = requeue_dead_letters(queryset)
+        self.message_user(request, f'{requeued} notification(s) requeued.')
     
 admin.site.register(Billboards, BillboardsAdmin)
 admin.site.register(Zones, ZonesAdmin)
 admin.site.register(Dimensions, DimensionsAdmin)
 admin.site.register(AmountPerSqFt)
+admin.site.register(OasisOutbox, OasisOutboxAdmin)
@@ -0,0 +1,54 @@
+"""
+Creating many billboards in one request.
+
+`create_billboards` inserts a validated batch with one `bulk_create` and
+does the per-billboard bookkeeping that `Billboards.save` and its signal
+receivers would otherwise do row by row (pricing, geohash, Oasis outbox,
+change feed, version stamps, QR renders, rollups and target counts) once
+for the whole batch.
+"""
+from django.db import transaction
+
+from ansaa_server.versioning import bump_version
+from . import geo
+from .models import AssetChange, Billboards, OasisOutbox, assign_unique_ids, random_unique_id
+from .pricing import get_index
+from .qr import schedule_qr_render
+from .signals import billboards_bulk_created
+
+
+def create_billboards(user, items):
+    """
+    Create a billboard for `user` from each dict of validated data in
+    `items`. Returns the saved billboards, in order.
+    """
+    index = get_index()
+    billboards = []
+    for data in items:
+        billboard = Billboards(user=user, **data)
+        price = index.price(billboard.sign_type, billboard.zone, billboard.length, billboard.breadth)
+        if price is not None:
+            billboard.price = price
+        billboard.unique_id = random_unique_id()
+        billboard.geohash = geo.encode(billboard.latitude, billboard.longitude)
+        billboards.append(billboard)
+    if not billboards:
+        return billboards
+
+    with transaction.atomic():
+        assign_unique_ids(billboards)
+        for billboard in billboards:
+            billboard.qr_pending = True
+        Billboards.objects.bulk_create(billboards)
+        for billboard in billboards:
+            billboard.remember_loaded_values()
+        OasisOutbox.objects.bulk_create([
+            OasisOutbox(billboard=billboard, unique_id=billboard.unique_id, payload=billboard.oasis_payload())
+            for billboard in billboards
+        ])
+        AssetChange.record_many(billboards, AssetChange.ACTION_UPSERT)
+        billboards_bulk_created.send(sender=Billboards, billboards=billboards)
+        bump_version('billboards', f'billboards:user:{user.pk}')
+        for billboard in billboards:
+            transaction.on_commit(lambda pk=billboard.pk: schedule_qr_render(pk))
+    return billboards
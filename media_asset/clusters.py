@@ -0,0 +1,143 @@
+"""
+Pre-aggregated billboard clusters for the map views.
+
+Billboards are counted in a pyramid of grids. Level k divides the world
+into 2^k x 2^k cells, matching the Z-order geohash in media_asset/geo.py.
+Each ClusterCell row holds the count and the coordinate sums of the
+billboards in one cell. The rows are adjusted incrementally as billboards
+are created, moved and deleted. A map request therefore reads only the
+cells in view at the level that suits its zoom, and never scans the
+billboards table.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from ansaa_server.db import increment_many
+from . import geo
+from .models import Billboards, ClusterCell
+
+MIN_LEVEL = 2
+MAX_LEVEL = 16  # cells of roughly 600 x 300 m
+# Map zoom z shows 2^z tiles of 256px across the world; level z + 2 gives
+# clusters about 64px apart
+ZOOM_OFFSET = 2
+MAX_CELLS = 4096
+
+
+def level_for_zoom(zoom):
+    return max(MIN_LEVEL, min(MAX_LEVEL, zoom + ZOOM_OFFSET))
+
+
+def _position(values):
+    """
+    (latitude, longitude) from a dict of attnames or a model instance, or
+    None when the billboard has no coordinates.
+    """
+    get = values.get if isinstance(values, dict) else lambda attname: getattr(values, attname)
+    latitude, longitude = get('latitude'), get('longitude')
+    if latitude is None or longitude is None:
+        return None
+    return float(latitude), float(longitude)
+
+
+def cluster_deltas(old, new):
+    """
+    Changes per cluster cell, as [count, sum_latitude, sum_longitude], when
+    a billboard moves from `old` to `new` (either may be None for a create
+    or delete).
+    """
+    old, new = _position(old) if old else None, _position(new) if new else None
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    if old == new:
+        return deltas
+    for sign, position in ((-1, old), (1, new)):
+        if position is None:
+            continue
+        latitude, longitude = position
+        for level in range(MIN_LEVEL, MAX_LEVEL + 1):
+            cell = deltas[(level, *geo.cell(latitude, longitude, level))]
+            cell[0] += sign
+            cell[1] += sign * latitude
+            cell[2] += sign * longitude
+    return deltas
+
+
+def sum_deltas(all_deltas):
+    total = defaultdict(lambda: [0, 0.0, 0.0])
+    for deltas in all_deltas:
+        for key, (count, sum_latitude, sum_longitude) in deltas.items():
+            cell = total[key]
+            cell[0] += count
+            cell[1] += sum_latitude
+            cell[2] += sum_longitude
+    return total
+
+
+def apply_cluster_deltas(deltas):
+    increment_many(ClusterCell, ['level', 'x', 'y'], [
+        {
+            'level': level, 'x': x, 'y': y,
+            'asset_count': count, 'sum_latitude': sum_latitude, 'sum_longitude': sum_longitude,
+        }
+        for (level, x, y), (count, sum_latitude, sum_longitude) in deltas.items()
+        if count or sum_latitude or sum_longitude
+    ])
+
+
+def rebuild_clusters():
+    """
+    Recompute every cluster cell from the billboards table, with one
+    grouped query per level over the geohash column. Returns the number
+    of cells written.
+    """
+    cells = []
+    for level in range(MIN_LEVEL, MAX_LEVEL + 1):
+        rows = (
+            Billboards.objects
+            .filter(geohash__isnull=False)
+            .order_by()
+            .annotate(cell=F('geohash') / (1 << 2 * (geo.BITS - level)))
+            .values('cell')
+            .annotate(asset_count=Count('id'), sum_latitude=Sum('latitude'), sum_longitude=Sum('longitude'))
+        )
+        for row in rows:
+            x, y = geo.decode_cell(row['cell'])
+            cells.append(ClusterCell(
+                level=level, x=x, y=y, asset_count=row['asset_count'],
+                sum_latitude=float(row['sum_latitude']), sum_longitude=float(row['sum_longitude']),
+            ))
+
+    with transaction.atomic():
+        ClusterCell.objects.all().delete()
+        ClusterCell.objects.bulk_create(cells, batch_size=2000)
+    return len(cells)
+
+
+def query_clusters(min_lat, min_lng, max_lat, max_lng, level):
+    """
+    Clusters with at least one billboard in the box at `level`, or at a
+    coarser level if the box would span more than MAX_CELLS cells.
+    Returns (level used, clusters).
+    """
+    while True:
+        min_x, min_y = geo.cell(min_lat, min_lng, level)
+        max_x, max_y = geo.cell(max_lat, max_lng, level)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= MAX_CELLS or level == MIN_LEVEL:
+            break
+        level -= 1
+
+    cells = ClusterCell.objects.filter(
+        level=level, x__range=(min_x, max_x), y__range=(min_y, max_y), asset_count__gt=0,
+    ).values_list('x', 'y', 'asset_count', 'sum_latitude', 'sum_longitude')
+    return level, [
+        {
+            'id': f'{level}/{x}/{y}',
+            'count': count,
+            'latitude': round(sum_latitude / count, 6),
+            'longitude': round(sum_longitude / count, 6),
+            'bounds': [round(value, 6) for value in geo.cell_bounds(x, y, level)],
+        }
+        for x, y, count, sum_latitude, sum_longitude in cells
+    ]
@@ -0,0 +1,67 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ansaa_server.versioning import state_cache
+from .models import IdempotencyRecord, RepriceRequest
+
+logger = logging.getLogger(__name__)
+
+
+def purge_idempotency_records():
+    """
+    Delete idempotency records older than IDEMPOTENCY_KEY_TTL, with their
+    cached replies. The state cache is never culled, so expired replies are
+    removed here.
+    """
+    from .decorator import idempotency_cache_key
+
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    expired = IdempotencyRecord.objects.filter(created_at__lt=cutoff)
+    state_cache.delete_many([idempotency_cache_key(scope, key) for scope, key in expired.values_list('scope', 'key')])
+    deleted, _ = expired.delete()
+    logger.info(f"Purged {deleted} expired idempotency record(s)")
+
+
+def reprice_pending_assets():
+    """
+    Reprice every billboard if a price band or the rate changed since the
+    last run.
+    """
+    from .pricing import reprice_assets
+
+    request = RepriceRequest.objects.first()
+    if request is None or not settings.PRICING_AUTO_REPRICE:
+        return
+    stats = reprice_assets()
+    # A change made during the run leaves a newer request for the next run
+    RepriceRequest.objects.filter(requested_at__lte=request.requested_at).delete()
+    logger.info(f"Repriced {stats['changed']} of {stats['checked']} billboards")
+
+
+def render_pending_qr_codes():
+    """
+    Render QR codes that were queued but never rendered, e.g. because the
+    worker holding them was restarted.
+    """
+    from .qr import render_pending
+
+    stats = render_pending()
+    if stats['checked']:
+        logger.info(f"Rendered {stats['rendered']} of {stats['checked']} pending QR codes")
+
+
+def sync_oasis_changes():
+    """
+    Push billboards whose Oasis payload changed since Oasis last
+    acknowledged it, e.g. after an edit.
+    """
+    from .oasis import sync_changed
+
+    stats = sync_changed()
+    if stats['overlapped']:
+        logger.info("Oasis sync skipped: the previous run is still going")
+        return
+    logger.info(f"Oasis sync: {stats['sent']} sent, {stats['failed']} failed, {stats['skipped']} unchanged")
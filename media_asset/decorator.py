@@ -1,13 +1,130 @@
+import hashlib
+import json
+from datetime import timedelta
+
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
 from functools import wraps
 
+from ansaa_server.versioning import state_cache
+
 def apikey_required(view_func):
     @wraps(view_func)
     def wrapped_view(request, *args, **kwargs):
-        api_key = request.headers.get('X-API-KEY')
+        # When decorating a view method the first argument is the view itself.
+        http_request = getattr(request, 'request', request)
+        api_key = http_request.headers.get('X-API-KEY')
         if api_key != settings.API_KEY:
             return Response({"detail": "Invalid or missing API key."}, status=status.HTTP_403_FORBIDDEN)
         return view_func(request, *args, **kwargs)
     return wrapped_view
+
+
+def idempotency_cache_key(scope, key):
+    return 'idempotency:' + hashlib.sha256(f'{scope}\n{key}'.encode()).hexdigest()
+
+
+def _claim_idempotency_key(scope, key, path, fingerprint):
+    """
+    Insert an in-progress record for the key. Returns (record, created).
+    An expired record, or an in-progress one whose request evidently died,
+    is replaced.
+    """
+    from .models import IdempotencyRecord
+
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(scope=scope, key=key, path=path, fingerprint=fingerprint), True
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+            if record is None:
+                continue
+            expired = record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+            abandoned = (
+                record.state == IdempotencyRecord.STATE_IN_PROGRESS
+                and record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+            )
+            if not (expired or abandoned):
+                return record, False
+            IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+    return record, False
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {"detail": "This Idempotency-Key was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(stored['body'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """
+    Make a DRF view's write method safe to retry with an Idempotency-Key
+    header. The first response under a key is stored (for
+    IDEMPOTENCY_KEY_TTL seconds) and replayed for every retry of the same
+    request, from the cache when possible, so a retry costs a cache read
+    instead of another write. A retry that arrives while the first request
+    is still running gets 409 Conflict. Requests without the header are
+    handled as before. Server errors are not stored, so they can be retried.
+    """
+    @wraps(view_func)
+    def wrapped_view(view, request, *args, **kwargs):
+        from .models import IdempotencyRecord
+
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_func(view, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"detail": "Idempotency-Key is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = f'user:{request.user.pk}' if request.user.is_authenticated else 'apikey'
+        fingerprint = hashlib.sha256(
+            request.method.encode() + b' ' + request.get_full_path().encode() + b'\n' + request.body
+        ).hexdigest()
+        cache_key = idempotency_cache_key(scope, key)
+
+        stored = state_cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        record, created = _claim_idempotency_key(scope, key, request.path, fingerprint)
+        if not created:
+            if record is None or record.state != IdempotencyRecord.STATE_COMPLETED:
+                response = Response(
+                    {"detail": "A request with this Idempotency-Key is still being processed."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+                response['Retry-After'] = '1'
+                return response
+            stored = {'fingerprint': record.fingerprint, 'status': record.status_code, 'body': record.response_body}
+            state_cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+            return _replay(stored, fingerprint)
+
+        try:
+            response = view_func(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        body = json.loads(json.dumps(getattr(response, 'data', None), cls=JSONEncoder))
+        record.state = IdempotencyRecord.STATE_COMPLETED
+        record.status_code = response.status_code
+        record.response_body = body
+        record.completed_at = timezone.now()
+        record.save(update_fields=['state', 'status_code', 'response_body', 'completed_at'])
+        state_cache.set(cache_key, {'fingerprint': fingerprint, 'status': response.status_code, 'body': body}, settings.IDEMPOTENCY_KEY_TTL)
+        return response
+    return wrapped_view
@@ -0,0 +1,214 @@
+"""
+Detection of billboards registered more than once.
+
+Two billboards are taken to be the same physical board when they are within
+DUPLICATE_RADIUS_M metres of each other and have the same sign type and
+company name. Company names are compared ignoring case, spacing and
+punctuation. At upload, a billboard without a sign type is matched on
+location and company alone.
+"""
+import math
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import geo
+from .models import Billboards
+
+
+def normalize_company(name):
+    return re.sub(r'[^0-9a-z]+', '', (name or '').casefold())
+
+
+def _key(item):
+    return item.get('sign_type') or None, normalize_company(item.get('company_name'))
+
+
+def _same_board(key, other_key):
+    # An upload without a sign type is matched on location and company alone
+    return key[1] == other_key[1] and (not key[0] or not other_key[0] or key[0] == other_key[0])
+
+
+def _position(item):
+    latitude, longitude = item.get('latitude'), item.get('longitude')
+    if latitude is None or longitude is None:
+        return None
+    return float(latitude), float(longitude)
+
+
+def find_duplicates(items, radius=None, chunk_size=100):
+    """
+    For each item (a dict with latitude, longitude, sign_type and
+    company_name, e.g. validated upload data) the unique ids of existing
+    billboards it would duplicate, nearest first. One query per
+    `chunk_size` items, over the geohash index.
+    """
+    radius = settings.DUPLICATE_RADIUS_M if radius is None else radius
+    results = [[] for _ in items]
+    checked = [
+        (position, item, _position(item)) for position, item in enumerate(items)
+        if _position(item) and _key(item)[1]
+    ]
+    for start in range(0, len(checked), chunk_size):
+        chunk = checked[start:start + chunk_size]
+        lookup = Q()
+        for _, item, (latitude, longitude) in chunk:
+            nearby = geo.cover_q(*geo.radius_bbox(latitude, longitude, radius))
+            sign_type = _key(item)[0]
+            lookup |= (nearby & Q(sign_type__in=[sign_type, ''])) if sign_type else nearby
+        candidates = defaultdict(list)
+        rows = Billboards.objects.filter(lookup).order_by().values_list(
+            'unique_id', 'sign_type', 'company_name', 'latitude', 'longitude',
+        )
+        for unique_id, sign_type, company, latitude, longitude in rows:
+            candidates[normalize_company(company)].append((unique_id, sign_type, latitude, longitude))
+
+        for position, item, (latitude, longitude) in chunk:
+            key, matches = _key(item), []
+            for unique_id, sign_type, other_latitude, other_longitude in candidates.get(key[1], ()):
+                if not _same_board(key, (sign_type or None, key[1])):
+                    continue
+                distance = geo.haversine(latitude, longitude, other_latitude, other_longitude)
+                if distance <= radius:
+                    matches.append((distance, unique_id))
+            results[position] = [unique_id for _, unique_id in sorted(matches)]
+    return results
+
+
+def find_batch_duplicates(items, radius=None):
+    """
+    For each item, the index of an earlier item in the same list that it
+    duplicates, or None.
+    """
+    radius = settings.DUPLICATE_RADIUS_M if radius is None else radius
+    results = [None] * len(items)
+    seen = defaultdict(list)
+    for position, item in enumerate(items):
+        point, key = _position(item), _key(item)
+        if not point or not key[1]:
+            continue
+        for other_position, other_key, other_point in seen[key[1]]:
+            if _same_board(key, other_key) and geo.haversine(*point, *other_point) <= radius:
+                results[position] = other_position
+                break
+        seen[key[1]].append((position, key, point))
+    return results
+
+
+class UnionFind:
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.setdefault(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_duplicate_clusters(radius=None, queryset=None):
+    """
+    Groups of billboards that are duplicates of each other, directly or
+    through a chain of duplicates, as lists of primary keys, oldest first.
+
+    Billboards are processed one sign type at a time. Each one is bucketed
+    into a grid cell at least `radius` wide, keyed by company. It is then
+    compared only with billboards in its own and the 8 neighbouring
+    buckets, so the run is close to linear in the number of billboards.
+    Matching pairs are merged with union-find.
+    """
+    radius = settings.DUPLICATE_RADIUS_M if radius is None else radius
+    if queryset is None:
+        queryset = Billboards.objects.all()
+    queryset = queryset.filter(latitude__isnull=False, longitude__isnull=False).order_by()
+
+    groups = UnionFind()
+    cell_lat = math.degrees(radius / geo.EARTH_RADIUS_M)
+    for sign_type in queryset.values_list('sign_type', flat=True).distinct():
+        rows = list(
+            queryset.filter(sign_type=sign_type)
+            .values_list('pk', 'company_name', 'latitude', 'longitude')
+        )
+        if not rows:
+            continue
+        # Wide enough in longitude at the latitude furthest from the equator
+        widest = max(abs(float(latitude)) for _, _, latitude, _ in rows)
+        cell_lng = cell_lat / max(math.cos(math.radians(min(widest + cell_lat, 89.9))), 1e-9)
+
+        buckets = defaultdict(list)
+        for pk, company, latitude, longitude in rows:
+            company = normalize_company(company)
+            if not company:
+                continue
+            latitude, longitude = float(latitude), float(longitude)
+            key = (company, math.floor(latitude / cell_lat), math.floor(longitude / cell_lng))
+            buckets[key].append((pk, latitude, longitude))
+
+        for (company, y, x), members in buckets.items():
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    neighbours = buckets.get((company, y + dy, x + dx))
+                    if not neighbours:
+                        continue
+                    for pk, latitude, longitude in members:
+                        for other_pk, other_latitude, other_longitude in neighbours:
+                            if other_pk <= pk:
+                                continue
+                            if geo.haversine(latitude, longitude, other_latitude, other_longitude) <= radius:
+                                groups.union(pk, other_pk)
+
+    clusters = defaultdict(list)
+    for pk in list(groups.parent):
+        clusters[groups.find(pk)].append(pk)
+    return sorted(sorted(members) for members in clusters.values() if len(members) > 1)
+
+
+def duplicate_error(unique_ids):
+    return {
+        'non_field_errors': [
+            f'A {settings.DUPLICATE_RADIUS_M:g} m match for this sign type and company is already registered. '
+            'Send allow_duplicate=true to upload it anyway.'
+        ],
+        'duplicate_of': unique_ids,
+    }
+
+
+def check_upload(serializers, positions):
+    """
+    Duplicate checks for a batch of validated CreateBillboardSerializer
+    instances created with context {'batch': True}, at `positions` in the
+    upload. Returns the validation errors for each serializer, or None when
+    it is not a duplicate of an existing billboard or of an earlier one in
+    the batch.
+    """
+    items = [serializer.validated_data for serializer in serializers]
+    checked = [serializer.needs_duplicate_check for serializer in serializers]
+    existing = find_duplicates([item if check else {} for item, check in zip(items, checked)])
+    earlier = find_batch_duplicates(items)
+
+    errors = []
+    for check, unique_ids, index in zip(checked, existing, earlier):
+        if not check:
+            errors.append(None)
+        elif unique_ids:
+            errors.append(duplicate_error(unique_ids))
+        elif index is not None:
+            errors.append({
+                'non_field_errors': [
+                    f'Duplicates item {positions[index]} of this upload. Send allow_duplicate=true to upload it anyway.'
+                ],
+                'duplicate_of_index': [positions[index]],
+            })
+        else:
+            errors.append(None)
+    return errors
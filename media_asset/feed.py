@@ -0,0 +1,76 @@
+"""
+Incremental change feed over AssetChange.
+
+An auto-increment id is taken when a row is inserted, but the row only
+becomes visible when its transaction commits, which for a bulk upload or a
+repricing batch can be long after rows with higher ids were read. The feed
+therefore pages on `seq` instead, which is handed out in id order to the
+committed entries that do not have one yet, at the start of every read,
+from a counter that only goes up. An entry that commits late gets a position after every
+cursor already handed out, so it is never jumped over.
+"""
+from django.db import transaction
+
+from .models import AssetChange, Billboards, ChangeFeedSequence
+
+
+def assign_sequence():
+    """
+    Give every committed entry without a feed position the next positions,
+    in id order. Runs in its own transaction with the ChangeFeedSequence row
+    locked, so two readers never hand out positions concurrently. Returns
+    the last position handed out.
+    """
+    with transaction.atomic():
+        sequence, _ = ChangeFeedSequence.objects.select_for_update().get_or_create(pk=1)
+        pending = list(AssetChange.objects.filter(seq__isnull=True).order_by('id').only('pk'))
+        if not pending:
+            return sequence.last_seq
+        for position, change in enumerate(pending, start=sequence.last_seq + 1):
+            change.seq = position
+        AssetChange.objects.bulk_update(pending, ['seq'], batch_size=1000)
+        sequence.last_seq = pending[-1].seq
+        sequence.save(update_fields=['last_seq'])
+        return sequence.last_seq
+
+
+def head_cursor():
+    """
+    Cursor at the current end of the change log.
+    """
+    return assign_sequence()
+
+
+def read_changes(since, limit, billboards=None, user_id=None):
+    """
+    Read up to `limit` changes after the `since` cursor.
+
+    Returns (upserted billboards, tombstones, next cursor, has_more).
+    Upserts are loaded from `billboards` (all billboards by default), so a
+    caller can narrow what it exposes; a changed billboard that `billboards`
+    no longer includes is sent as a tombstone, so the caller drops it.
+    """
+    assign_sequence()
+    changes = AssetChange.objects.filter(seq__gt=since)
+    if user_id is not None:
+        changes = changes.filter(user_id=user_id)
+    changes = list(changes.order_by('seq')[:limit + 1])
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = changes[-1].seq if changes else since
+
+    upserts = [change for change in changes if change.action == AssetChange.ACTION_UPSERT]
+    tombstones = [
+        {'unique_id': change.unique_id, 'deleted_at': change.created_at}
+        for change in changes if change.action == AssetChange.ACTION_DELETE
+    ]
+    if billboards is None:
+        billboards = Billboards.objects.all()
+    upserted = list(billboards.filter(pk__in=[change.billboard_id for change in upserts])) if upserts else []
+    found = {billboard.pk for billboard in upserted}
+    tombstones += [
+        {'unique_id': change.unique_id, 'deleted_at': change.created_at}
+        for change in upserts if change.billboard_id not in found
+    ]
+    return upserted, tombstones, cursor, has_more
@@ -0,0 +1,173 @@
+"""
+Spatial lookups over billboard coordinates without PostGIS.
+
+Each billboard stores an integer geohash of its position: a Z-order (Morton)
+code that interleaves the bits of its longitude and latitude cells on a
+2^26 x 2^26 grid, about 0.6 m across at the equator. Every coarser grid
+cell is then one contiguous range of codes, so a B-tree index on the
+column answers "billboards in these cells" with a few range scans. Searches
+cover the area with a handful of cells, read the candidates' coordinates
+through the index, and filter them exactly with the haversine distance.
+"""
+import heapq
+import math
+
+from django.db.models import Q
+
+BITS = 26
+EARTH_RADIUS_M = 6371008.8
+MAX_COVER_CELLS = 16
+
+
+def _spread(value):
+    """
+    Spread the low 26 bits of `value` to the even bit positions.
+    """
+    result = 0
+    for bit in range(BITS):
+        result |= ((value >> bit) & 1) << (2 * bit)
+    return result
+
+
+def _cell_x(longitude, level):
+    return min(int((float(longitude) + 180) / 360 * (1 << level)), (1 << level) - 1)
+
+
+def _cell_y(latitude, level):
+    return min(int((float(latitude) + 90) / 180 * (1 << level)), (1 << level) - 1)
+
+
+def cell(latitude, longitude, level):
+    """
+    (x, y) of the grid cell containing a position, on the 2^level x
+    2^level grid.
+    """
+    return _cell_x(longitude, level), _cell_y(latitude, level)
+
+
+def cell_bounds(x, y, level):
+    """
+    (min_lat, min_lng, max_lat, max_lng) of a grid cell.
+    """
+    width, height = 360 / (1 << level), 180 / (1 << level)
+    return (y * height - 90, x * width - 180, (y + 1) * height - 90, (x + 1) * width - 180)
+
+
+def _interleave(x, y):
+    return _spread(x) | (_spread(y) << 1)
+
+
+def _compact(value):
+    """
+    Inverse of _spread: gather the even bits of `value`.
+    """
+    result = 0
+    for bit in range(BITS):
+        result |= ((value >> (2 * bit)) & 1) << bit
+    return result
+
+
+def decode_cell(code):
+    """
+    (x, y) of a grid cell from its Z-order code at that cell's level.
+    """
+    return _compact(code), _compact(code >> 1)
+
+
+def encode(latitude, longitude):
+    """
+    Geohash of a position, or None if either coordinate is missing.
+    """
+    if latitude is None or longitude is None:
+        return None
+    return _interleave(_cell_x(longitude, BITS), _cell_y(latitude, BITS))
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in metres.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(latitude, longitude, radius):
+    """
+    (min_lat, min_lng, max_lat, max_lng) of a box enclosing the circle of
+    `radius` metres around a point.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    dlat = math.degrees(radius / EARTH_RADIUS_M)
+    cos_lat = math.cos(math.radians(latitude))
+    dlng = 180.0 if cos_lat < 1e-9 else min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, latitude - dlat), max(-180.0, longitude - dlng),
+        min(90.0, latitude + dlat), min(180.0, longitude + dlng),
+    )
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash ranges [start, end) that together contain every position in the
+    box, from the finest grid that covers it with at most `max_cells`
+    cells. Adjacent cells are merged into one range.
+    """
+    for level in range(BITS, -1, -1):
+        xs = range(_cell_x(min_lng, level), _cell_x(max_lng, level) + 1)
+        ys = range(_cell_y(min_lat, level), _cell_y(max_lat, level) + 1)
+        if len(xs) * len(ys) <= max_cells:
+            break
+
+    shift = 2 * (BITS - level)
+    starts = sorted(_interleave(x, y) for x in xs for y in ys)
+    ranges = []
+    for start in starts:
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + 1
+        else:
+            ranges.append([start, start + 1])
+    return [(start << shift, end << shift) for start, end in ranges]
+
+
+def cover_q(min_lat, min_lng, max_lat, max_lng):
+    """
+    Filter for billboards inside the box: the covering geohash ranges,
+    which use the index, plus the exact coordinate bounds.
+    """
+    in_cells = Q()
+    for start, end in cover(min_lat, min_lng, max_lat, max_lng):
+        in_cells |= Q(geohash__gte=start, geohash__lt=end)
+    return in_cells & Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng))
+
+
+def search(queryset, min_lat, min_lng, max_lat, max_lng, centre=None, radius=None, limit=100):
+    """
+    Billboards of `queryset` inside the box, and within `radius` metres of
+    `centre` (a (lat, lng) pair, the middle of the box by default) when a
+    radius is given, nearest first.
+
+    Returns ([(billboard, distance in metres)], number of matches). Only
+    the ids and coordinates of the candidates are read to rank them; the
+    full rows are loaded for the `limit` nearest.
+    """
+    if centre is None:
+        centre = ((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+    candidates = (
+        queryset.filter(cover_q(min_lat, min_lng, max_lat, max_lng))
+        .order_by()
+        .values_list('pk', 'latitude', 'longitude')
+    )
+
+    matches = []
+    for pk, latitude, longitude in candidates.iterator(chunk_size=5000):
+        distance = haversine(centre[0], centre[1], latitude, longitude)
+        if radius is None or distance <= radius:
+            matches.append((distance, pk))
+
+    nearest = heapq.nsmallest(limit, matches)
+    billboards = queryset.select_related('sub_zone').in_bulk([pk for _, pk in nearest])
+    return [(billboards[pk], distance) for distance, pk in nearest if pk in billboards], len(matches)
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import AnsaaUser
+from media_asset.models import Billboards, Zones
+from media_asset.qr import render_qr_png
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-save latency of Billboards.save() with the previous inline '
+        'QR render against the current hash-checked, deferred render. Runs '
+        'inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            user = AnsaaUser.objects.filter(is_superuser=True).first() or AnsaaUser.objects.first()
+            if user is None:
+                self.stderr.write('Create at least one user before running the benchmark.')
+                return
+            sub_zone, _ = Zones.objects.get_or_create(name='Benchmark zone')
+            billboard = Billboards.objects.create(
+                user=user, sub_zone=sub_zone, sign_type=Billboards.UNIPOLES,
+                zone=Billboards.ZONE_NORMAL, company_name='Benchmark Ltd', asin='BENCH',
+                sign_format=Billboards.PORTRAIT, no_of_faces=Billboards.SINGLE,
+                illumination_type=Billboards.NONE, length=10, breadth=5,
+            )
+            written = []
+
+            def inline_render_save():
+                # What every save did before: render, encode and write the
+                # PNG before touching the database.
+                png = render_qr_png(billboard.qr_payload())
+                billboard.qr_code.save(f'{billboard.unique_id}_qr.png', ContentFile(png), save=False)
+                written.append(billboard.qr_code.name)
+                billboard.save()
+
+            def unchanged_save():
+                billboard.save()
+
+            def changed_save():
+                billboard.description = f'Edit {time.perf_counter_ns()}'
+                billboard.company_name = f'Benchmark Ltd {time.perf_counter_ns()}'
+                billboard.save()
+
+            results = {
+                'inline render (before)': self.measure(inline_render_save, iterations),
+                'unchanged QR data (after)': self.measure(unchanged_save, iterations),
+                'changed QR data (after)': self.measure(changed_save, iterations),
+            }
+            transaction.set_rollback(True)
+
+        for name in written:
+            billboard.qr_code.storage.delete(name)
+
+        self.stdout.write(f'{"scenario":<28}{"mean ms":>10}{"p50 ms":>10}{"p95 ms":>10}')
+        for label, timings in results.items():
+            self.stdout.write(
+                f'{label:<28}{statistics.mean(timings):>10.2f}{statistics.median(timings):>10.2f}'
+                f'{statistics.quantiles(timings, n=20)[-1]:>10.2f}'
+            )
+
+    def measure(self, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,89 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from authentication.models import AnsaaUser
+from media_asset.models import Billboards, Zones
+from media_asset.seed import seed_billboards
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the hot Billboards queries (list, search, report, count, weekly '
+        'target, Oasis listing and payment lookup) and print their query plans. '
+        'Run it before and after migrating to compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many random billboards first.')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--plans', action='store_true', help='Print query plans.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            users = list(AnsaaUser.objects.all()[:50])
+            if not users:
+                self.stderr.write('Create at least one user before seeding.')
+                return
+            sub_zones = list(Zones.objects.all())
+            started = time.monotonic()
+            seed_billboards(options['seed'], users, sub_zones)
+            self.stdout.write(f"Seeded {options['seed']} billboards in {time.monotonic() - started:.1f}s")
+
+        # Benchmark against the user with the most billboards
+        busiest = (
+            Billboards.objects.order_by().values('user')
+            .annotate(n=Count('id')).order_by('-n').first()
+        )
+        if busiest is None:
+            self.stderr.write('No billboards to query; use --seed.')
+            return
+        user_id = busiest['user']
+        sample = Billboards.objects.filter(user_id=user_id).values_list('unique_id', flat=True).first()
+        now = timezone.now()
+        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        queries = {
+            'list (user, newest 50)': Billboards.objects.filter(user_id=user_id).order_by('-date', '-id')[:50],
+            'search (user, vacancy, sign type)': Billboards.objects.filter(
+                user_id=user_id, vacancy=Billboards.VACANCY_VACANT, sign_type=Billboards.UNIPOLES,
+            ).order_by('-date', '-id')[:50],
+            'report count (user, month, vacancy)': Billboards.objects.filter(
+                user_id=user_id, date__gte=month_start, vacancy=Billboards.VACANCY_OCCUPIED,
+            ),
+            'report count (all, week)': Billboards.objects.filter(date__gte=week_start),
+            'weekly target count (user, week)': Billboards.objects.filter(
+                user_id=user_id, date__range=[week_start, week_start + timedelta(days=6)],
+            ),
+            'oasis listing (completed, newest 50)': Billboards.objects.filter(
+                status=Billboards.STATUS_COMPLETED,
+            ).order_by('-date', '-id')[:50],
+            'payment lookup (unique_id)': Billboards.objects.filter(unique_id=sample),
+        }
+        counted = {'report count (user, month, vacancy)', 'report count (all, week)', 'weekly target count (user, week)'}
+
+        self.stdout.write(f'{connection.vendor}, {Billboards.objects.count()} billboards, user {user_id}\n')
+        self.stdout.write(f'{"query":<40}{"median ms":>12}{"p95 ms":>10}')
+        for label, queryset in queries.items():
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                # .all() clones the queryset so no result cache is reused
+                if label in counted:
+                    queryset.all().count()
+                else:
+                    list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            self.stdout.write(f'{label:<40}{statistics.median(timings):>12.2f}{p95:>10.2f}')
+
+            if options['plans']:
+                analyze = {'analyze': True} if connection.vendor == 'postgresql' else {}
+                self.stdout.write(queryset.explain(**analyze) + '\n')
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from media_asset.oasis import drain_outbox, requeue_dead_letters
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending Oasis notifications from the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OASIS_OUTBOX_BATCH_SIZE,
+                            help='Number of notifications claimed per batch.')
+        parser.add_argument('--max-attempts', type=int, default=settings.OASIS_OUTBOX_MAX_ATTEMPTS,
+                            help='Attempts before a notification is dead-lettered.')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Concurrent requests per batch over the pooled session.')
+        parser.add_argument('--idle-sleep', type=float, default=5.0,
+                            help='Seconds to wait when the outbox is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain everything that is due, then exit.')
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help='Move dead-lettered notifications back to pending before draining.')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            requeued = requeue_dead_letters()
+            self.stdout.write(f'Requeued {requeued} dead-lettered notification(s).')
+
+        totals = {'claimed': 0, 'delivered': 0, 'retried': 0, 'dead': 0}
+        started = time.monotonic()
+        try:
+            while True:
+                stats = drain_outbox(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    concurrency=options['concurrency'],
+                )
+                for key, value in stats.items():
+                    totals[key] += value
+
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"Batch: {stats['delivered']} delivered, {stats['retried']} retried, {stats['dead']} dead-lettered"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['idle_sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.monotonic() - started
+        rate = totals['claimed'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['delivered']} delivered, {totals['retried']} retried, "
+            f"{totals['dead']} dead-lettered in {elapsed:.1f}s ({rate:.1f} notifications/s)"
+        ))
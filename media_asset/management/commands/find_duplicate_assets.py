@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+
+from media_asset.duplicates import find_duplicate_clusters
+from media_asset.models import Billboards
+
+
+class Command(BaseCommand):
+    help = (
+        'List groups of billboards that look like the same physical board '
+        'registered more than once: same sign type and company, within '
+        '--radius metres of each other.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--radius', type=float, default=None,
+                            help='Distance in metres (default DUPLICATE_RADIUS_M).')
+        parser.add_argument('--csv', default=None,
+                            help='Also write the groups to this CSV file, one row per billboard.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        clusters = find_duplicate_clusters(radius=options['radius'])
+
+        billboards = Billboards.objects.select_related('user').in_bulk(
+            [pk for cluster in clusters for pk in cluster]
+        )
+        rows = []
+        for number, cluster in enumerate(clusters, 1):
+            self.stdout.write(f'Group {number}:')
+            for pk in cluster:
+                billboard = billboards[pk]
+                rows.append([
+                    number, billboard.unique_id, billboard.sign_type, billboard.company_name,
+                    billboard.latitude, billboard.longitude, billboard.user.email, billboard.date.isoformat(),
+                ])
+                self.stdout.write(
+                    f'  {billboard.unique_id}  {billboard.company_name}  '
+                    f'({billboard.latitude}, {billboard.longitude})  {billboard.user.email}  {billboard.date:%Y-%m-%d}'
+                )
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['group', 'unique_id', 'sign_type', 'company_name', 'latitude', 'longitude', 'user', 'date'])
+                writer.writerows(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(clusters)} duplicate group(s), {len(rows)} billboard(s), '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from media_asset.clusters import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the map cluster cells from the billboards table.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cells = rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {cells} cluster cell(s) in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ansaa_server.versioning import bump_version
+from media_asset.models import Billboards
+from media_asset.qr import qr_hash, store_qr
+
+
+class Command(BaseCommand):
+    help = 'Render missing or stale billboard QR codes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--adopt-existing', action='store_true',
+                            help='Record the hash of billboards that already have a QR image instead of re-rendering them.')
+
+    def handle(self, *args, **options):
+        rendered = adopted = checked = 0
+        last_pk = 0
+        queryset = Billboards.objects.select_related('sub_zone').order_by('pk')
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            checked += len(chunk)
+
+            # Rendered from the loaded rows, with one stamp bump per chunk
+            users = set()
+            for billboard in chunk:
+                if options['adopt_existing'] and billboard.qr_code and not billboard.qr_hash:
+                    Billboards.objects.filter(pk=billboard.pk).update(qr_hash=qr_hash(billboard.qr_payload()))
+                    adopted += 1
+                elif store_qr(billboard):
+                    users.add(billboard.user_id)
+                    rendered += 1
+            if users:
+                bump_version('billboards', *(f'billboards:user:{user_id}' for user_id in users))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} checked: {rendered} rendered, {adopted} adopted'
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from media_asset.models import Billboards, RepriceRequest
+from media_asset.pricing import reprice_assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute billboard prices from the dimension bands and the rate per '
+        'square foot, writing only the prices that changed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Billboards read and updated per batch.')
+        parser.add_argument('--zone', choices=list(Billboards.ZONE_CHOICES),
+                            help='Only reprice billboards in this zone.')
+        parser.add_argument('--sign-type', choices=list(Billboards.SIGN_TYPE),
+                            help='Only reprice billboards of this sign type.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many prices would change without writing them.')
+
+    def handle(self, *args, **options):
+        queryset = Billboards.objects.all()
+        if options['zone']:
+            queryset = queryset.filter(zone=options['zone'])
+        if options['sign_type']:
+            queryset = queryset.filter(sign_type=options['sign_type'])
+
+        started = time.monotonic()
+        requested_before = timezone.now()
+        stats = reprice_assets(
+            queryset,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        if not (options['dry_run'] or options['zone'] or options['sign_type']):
+            # Every billboard is up to date, so the cron job has nothing left to do
+            RepriceRequest.objects.filter(requested_at__lte=requested_before).delete()
+        changed_label = 'would change' if options['dry_run'] else 'repriced'
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['checked']} billboards checked, {stats['changed']} {changed_label} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
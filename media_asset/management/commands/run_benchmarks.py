@@ -0,0 +1,165 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ansa_target.models import Target
+from ansa_target.serializers import TargetSerializer
+from authentication.models import AnsaaUser
+from media_asset.models import Billboards, Zones
+from media_asset.qr import render_qr_png
+from media_asset.serializers import AssetSerializer, AssetsDetailsSerializer
+from report.utils import count_billboards, generate_csv_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the microbenchmark suite against the current database and write '
+        'the timings as JSON. Everything runs in a transaction that is rolled '
+        'back. Use seed_dataset first for a realistic dataset, and --compare '
+        'to see the change against an earlier run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per benchmark.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed runs per benchmark.')
+        parser.add_argument('--only', nargs='*', default=None, help='Benchmark names to run.')
+        parser.add_argument('--output', default=None, help='JSON file to write (default benchmarks/<timestamp>.json).')
+        parser.add_argument('--compare', default=None, help='Earlier JSON result to compare medians with.')
+
+    def handle(self, *args, **options):
+        if not Billboards.objects.exists():
+            raise CommandError('No billboards to benchmark against; run seed_dataset first.')
+
+        results = {}
+        with transaction.atomic():
+            for name, (func, items) in self.benchmarks().items():
+                if options['only'] and name not in options['only']:
+                    continue
+                self.stdout.write(f'{name}...')
+                results[name] = self.measure(func, items, options['runs'], options['warmup'])
+            transaction.set_rollback(True)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'git_commit': self.git_commit(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'machine': platform.machine(),
+            },
+            'dataset': {
+                'billboards': Billboards.objects.count(),
+                'users': AnsaaUser.objects.count(),
+                'sub_zones': Zones.objects.count(),
+            },
+            'results': results,
+        }
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f).get('results', {})
+
+        self.stdout.write(f'\n{"benchmark":<32}{"median ms":>12}{"p95 ms":>10}{"items/s":>12}{"vs base":>10}')
+        for name, result in results.items():
+            change = ''
+            if name in baseline and baseline[name]['median_ms']:
+                change = f"{(result['median_ms'] / baseline[name]['median_ms'] - 1) * 100:+.0f}%"
+            items_per_second = f"{result['items_per_second']:.0f}" if result['items_per_second'] else ''
+            self.stdout.write(
+                f"{name:<32}{result['median_ms']:>12.2f}{result['p95_ms']:>10.2f}{items_per_second:>12}{change:>10}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'\nWrote {output}'))
+
+    def benchmarks(self):
+        """
+        Name -> (callable, items processed per call, or None).
+        """
+        busiest = (
+            Billboards.objects.order_by().values('user')
+            .annotate(n=Count('id')).order_by('-n').first()
+        )
+        user = AnsaaUser.objects.get(pk=busiest['user'])
+        superuser = AnsaaUser.objects.filter(is_superuser=True).first()
+        sub_zone = Zones.objects.first()
+
+        billboard = Billboards.objects.create(
+            user=user, sub_zone=sub_zone, sign_type=Billboards.UNIPOLES,
+            zone=Billboards.ZONE_NORMAL, company_name='Benchmark Ltd', asin='BENCH',
+            sign_format=Billboards.PORTRAIT, no_of_faces=Billboards.SINGLE,
+            illumination_type=Billboards.NONE, length=10, breadth=5,
+        )
+        page = list(Billboards.objects.select_related('sub_zone').order_by('-date', '-id')[:200])
+        now = timezone.now()
+        target, _ = Target.objects.get_or_create(user=user, year=now.year, month=now.month, defaults={'target': 50})
+
+        def create_billboard():
+            Billboards.objects.create(
+                user=user, sub_zone=sub_zone, sign_type=Billboards.UNIPOLES,
+                zone=Billboards.ZONE_NORMAL, company_name='Benchmark Ltd', asin='BENCH',
+                length=10, breadth=5,
+            )
+
+        def update_billboard():
+            billboard.company_name = f'Benchmark Ltd {time.perf_counter_ns()}'
+            billboard.save()
+
+        benchmarks = {
+            'billboard_save_create': (create_billboard, None),
+            'billboard_save_update': (update_billboard, None),
+            'qr_render': (lambda: render_qr_png(billboard.qr_payload()), None),
+            'serialize_asset_list': (lambda: AssetSerializer(page, many=True).data, len(page)),
+            'serialize_oasis_details': (lambda: AssetsDetailsSerializer(page, many=True).data, len(page)),
+            'csv_report_user_year': (lambda: generate_csv_report(user, 'year'), None),
+            'count_billboards_user_week': (lambda: count_billboards(user, 'week').count(), None),
+            'target_weekly_count': (lambda: TargetSerializer().get_weekly_count(target), None),
+        }
+        if superuser is not None:
+            benchmarks['csv_report_all_month'] = (lambda: generate_csv_report(superuser, 'month'), None)
+            benchmarks['count_billboards_all_year'] = (lambda: count_billboards(superuser, 'year', 'Vacant').count(), None)
+        return benchmarks
+
+    def measure(self, func, items, runs, warmup):
+        for _ in range(warmup):
+            func()
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        return {
+            'runs': runs,
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(median, 3),
+            'p95_ms': round(statistics.quantiles(timings, n=20)[-1], 3) if runs > 1 else round(timings[0], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'items_per_second': round(items / (median / 1000), 1) if items and median else None,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,78 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for the Oasis notification API, to test outbox '
+        'throughput and failure handling offline. Point OASIS_NOTIFICATION_URL '
+        'at http://<host>:<port>/api/external/asset/notification.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Seconds to wait before answering each request.')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Fraction of requests (0-1) answered with --failure-status.')
+        parser.add_argument('--failure-status', type=int, default=503,
+                            help='Status code returned for failed requests.')
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        failure_rate = options['failure_rate']
+        failure_status = options['failure_status']
+        counts = {'received': 0, 'failed': 0}
+        lock = threading.Lock()
+        stdout = self.stdout
+
+        class OasisStubHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                time.sleep(latency)
+
+                failed = random.random() < failure_rate
+                with lock:
+                    counts['received'] += 1
+                    counts['failed'] += int(failed)
+                    if counts['received'] % 100 == 0:
+                        stdout.write(f"{counts['received']} received, {counts['failed']} failed")
+
+                if failed:
+                    status, reply = failure_status, {'status': 'error', 'message': 'Simulated failure'}
+                else:
+                    try:
+                        unique_id = json.loads(body or b'{}').get('UniqueID', '')
+                    except ValueError:
+                        status, reply = 400, {'status': 'error', 'message': 'Invalid JSON'}
+                    else:
+                        status, reply = 200, {'status': 'success', 'UniqueID': unique_id}
+
+                content = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), OasisStubHandler)
+        self.stdout.write(f"Oasis stub listening on http://{options['host']}:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Stopped: {counts['received']} received, {counts['failed']} failed")
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ansa_target.counters import rebuild_counters
+from authentication.models import AnsaaUser
+from media_asset.clusters import rebuild_clusters
+from media_asset.seed import seed_billboards, seed_pricing, seed_users, seed_zones
+from report.rollups import rebuild_rollups
+from report.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a synthetic dataset for benchmarking: field '
+        'agents, Anambra sub zones, pricing and billboards spread over the '
+        'state. Billboards are bulk inserted, so no QR codes are rendered and '
+        'nothing is sent to Oasis. Not for production databases.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Field agents to create.')
+        parser.add_argument('--billboards', type=int, default=100000, help='Billboards to insert.')
+        parser.add_argument('--days', type=int, default=365, help='Spread billboard dates over this many days.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for repeatable datasets.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        users = seed_users(options['users']) if options['users'] else []
+        users = users or list(AnsaaUser.objects.filter(is_superuser=False)[:options['users'] or 50])
+        if not users:
+            self.stderr.write('No users to own the billboards; pass --users.')
+            return
+        sub_zones = seed_zones()
+        seed_pricing()
+        self.stdout.write(f'{len(users)} users, {len(sub_zones)} sub zones ready')
+
+        def progress(total):
+            self.stdout.write(f'{total} billboards inserted ({time.monotonic() - started:.0f}s)')
+
+        seed_billboards(
+            options['billboards'], users, sub_zones,
+            batch_size=options['batch_size'], days=options['days'], seed=options['seed'],
+            record_changes=True, progress=progress,
+        )
+
+        # Derived tables that the bulk insert bypassed
+        rebuild_rollups()
+        rebuild_clusters()
+        rebuild_counters()
+        take_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - started:.1f}s'))
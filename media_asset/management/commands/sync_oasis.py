@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from media_asset.models import Billboards
+from media_asset.oasis import sync_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile all billboards with Oasis, pushing only the assets whose '
+        'payload changed since Oasis last acknowledged them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Billboards read and compared per chunk.')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Concurrent requests over the pooled session.')
+        parser.add_argument('--status', choices=list(Billboards.STATUS_CHOICES),
+                            help='Only reconcile billboards with this status.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be sent without calling Oasis.')
+
+    def handle(self, *args, **options):
+        queryset = Billboards.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+
+        started = time.monotonic()
+        stats = sync_changed(
+            queryset,
+            chunk_size=options['chunk_size'],
+            concurrency=options['concurrency'],
+            dry_run=options['dry_run'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.monotonic() - started
+        if stats['overlapped']:
+            self.stdout.write(self.style.WARNING('Another Oasis sync is running; nothing was done.'))
+            return
+
+        sent_label = 'would be sent' if options['dry_run'] else 'sent'
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['checked']} checked in {elapsed:.1f}s: {stats['skipped']} skipped, {stats['adopted']} adopted, "
+            f"{stats['sent']} {sent_label}, {stats['failed']} failed"
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0021_oasisoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OasisSyncState',
+            fields=[
+                ('billboard', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='oasis_sync_state', serialize=False, to='media_asset.billboards')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('acknowledged_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Oasis sync state',
+                'verbose_name_plural': 'Oasis sync states',
+            },
+        ),
+    ]
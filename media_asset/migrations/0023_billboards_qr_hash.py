@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0022_oasissyncstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billboards',
+            name='qr_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
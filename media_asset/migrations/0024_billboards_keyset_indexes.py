@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0023_billboards_qr_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='billboards',
+            options={'ordering': ['-date', '-id'], 'verbose_name': 'Billboard', 'verbose_name_plural': 'Billboards'},
+        ),
+        migrations.AddIndex(
+            model_name='billboards',
+            index=models.Index(fields=['-date', '-id'], name='billboards_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billboards',
+            index=models.Index(fields=['user', '-date', '-id'], name='billboards_user_date_id_idx'),
+        ),
+    ]
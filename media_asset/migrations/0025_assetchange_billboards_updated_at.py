@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0024_billboards_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billboards',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='AssetChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billboard_id', models.BigIntegerField(db_index=True)),
+                ('user_id', models.BigIntegerField()),
+                ('unique_id', models.CharField(max_length=10)),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Asset change',
+                'verbose_name_plural': 'Asset changes',
+                'indexes': [models.Index(fields=['user_id', 'id'], name='assetchange_user_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def seed_change_log(apps, schema_editor):
+    """
+    Start the change log with one entry per existing billboard, oldest
+    first, so a feed read from cursor 0 replays the whole inventory.
+    """
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    AssetChange = apps.get_model('media_asset', 'AssetChange')
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Billboards.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'user_id', 'unique_id', 'updated_at')[:2000]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        AssetChange.objects.bulk_create([
+            AssetChange(billboard_id=pk, user_id=user_id, unique_id=unique_id, action='upsert', created_at=updated_at)
+            for pk, user_id, unique_id, updated_at in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0025_assetchange_billboards_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
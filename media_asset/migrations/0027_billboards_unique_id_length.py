@@ -0,0 +1,55 @@
+import uuid
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_unique_ids(apps, schema_editor):
+    """
+    Three hex digits gave only 4096 possible ids, so some billboards share
+    one. Keep it on the oldest billboard and give the others a fresh id.
+    """
+    Billboards = apps.get_model('media_asset', 'Billboards')
+
+    duplicated = (
+        Billboards.objects.order_by()
+        .values('unique_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('unique_id', flat=True)
+    )
+    taken = set()
+    for unique_id in list(duplicated):
+        for billboard in Billboards.objects.filter(unique_id=unique_id).order_by('pk')[1:]:
+            while True:
+                new_id = f'BOARD {uuid.uuid4().hex[:8]}'.upper()
+                if new_id not in taken and not Billboards.objects.filter(unique_id=new_id).exists():
+                    break
+            taken.add(new_id)
+            Billboards.objects.filter(pk=billboard.pk).update(unique_id=new_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0026_seed_assetchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billboards',
+            name='unique_id',
+            field=models.CharField(editable=False, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='oasisoutbox',
+            name='unique_id',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='assetchange',
+            name='unique_id',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.RunPython(deduplicate_unique_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+INDEXES = [
+    models.Index(fields=['user', 'vacancy'], name='billboards_user_vacancy_idx'),
+    models.Index(fields=['user', 'sign_type'], name='billboards_user_sign_type_idx'),
+    models.Index(condition=models.Q(('status', 'completed')), fields=['-date', '-id'], name='billboards_completed_date_idx'),
+]
+
+
+def unique_id_field(model, unique):
+    field = models.CharField(editable=False, max_length=20, unique=unique)
+    field.set_attributes_from_name('unique_id')
+    field.model = model
+    return field
+
+
+def add_indexes(apps, schema_editor):
+    """
+    Make unique_id unique and add the hot query indexes. On PostgreSQL the
+    indexes are built concurrently, and the unique constraint is attached
+    to a concurrently built index; other databases get plain DDL.
+    """
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.alter_field(Billboards, unique_id_field(Billboards, False), unique_id_field(Billboards, True))
+        for index in INDEXES:
+            schema_editor.add_index(Billboards, index)
+        return
+
+    schema_editor.execute(
+        'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS media_asset_billboards_unique_id_key '
+        'ON media_asset_billboards (unique_id)'
+    )
+    schema_editor.execute(
+        'ALTER TABLE media_asset_billboards ADD CONSTRAINT media_asset_billboards_unique_id_key '
+        'UNIQUE USING INDEX media_asset_billboards_unique_id_key'
+    )
+    for index in INDEXES:
+        schema_editor.add_index(Billboards, index, concurrently=True)
+
+
+def drop_indexes(apps, schema_editor):
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    if schema_editor.connection.vendor != 'postgresql':
+        for index in INDEXES:
+            schema_editor.remove_index(Billboards, index)
+        schema_editor.alter_field(Billboards, unique_id_field(Billboards, True), unique_id_field(Billboards, False))
+        return
+
+    for index in INDEXES:
+        schema_editor.remove_index(Billboards, index, concurrently=True)
+    schema_editor.execute(
+        'ALTER TABLE media_asset_billboards DROP CONSTRAINT IF EXISTS media_asset_billboards_unique_id_key'
+    )
+
+
+class Migration(migrations.Migration):
+    # Indexes are built with CREATE INDEX CONCURRENTLY so the billboards
+    # table stays writable while they build; that cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('media_asset', '0027_billboards_unique_id_length'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='billboards',
+                    name='unique_id',
+                    field=models.CharField(editable=False, max_length=20, unique=True),
+                ),
+            ] + [
+                migrations.AddIndex(model_name='billboards', index=index)
+                for index in INDEXES
+            ],
+        ),
+    ]
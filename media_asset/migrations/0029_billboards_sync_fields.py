@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0028_billboards_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billboards',
+            name='client_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='billboards',
+            name='row_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='billboards',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('user', 'client_id'), name='billboards_user_client_id_uniq'),
+        ),
+    ]
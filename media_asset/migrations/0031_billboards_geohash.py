@@ -0,0 +1,85 @@
+from django.db import migrations, models, transaction
+
+# A frozen copy of media_asset.geo.encode as of this migration, so later
+# changes to that module cannot change what the backfill computes.
+BITS = 26
+
+
+def _spread(value):
+    result = 0
+    for bit in range(BITS):
+        result |= ((value >> bit) & 1) << (2 * bit)
+    return result
+
+
+def encode(latitude, longitude):
+    x = min(int((float(longitude) + 180) / 360 * (1 << BITS)), (1 << BITS) - 1)
+    y = min(int((float(latitude) + 90) / 180 * (1 << BITS)), (1 << BITS) - 1)
+    return _spread(x) | (_spread(y) << 1)
+
+
+def backfill_geohash(apps, schema_editor):
+    """
+    Compute the geohash of every billboard with coordinates, one committed
+    batch at a time so the table is never locked for long.
+    """
+    Billboards = apps.get_model('media_asset', 'Billboards')
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Billboards.objects.filter(pk__gt=last_pk, latitude__isnull=False, longitude__isnull=False)
+            .order_by('pk')
+            .values_list('pk', 'latitude', 'longitude')[:2000]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        with transaction.atomic():
+            Billboards.objects.bulk_update(
+                [Billboards(pk=pk, geohash=encode(latitude, longitude)) for pk, latitude, longitude in rows],
+                ['geohash'],
+            )
+
+
+INDEX = models.Index(condition=models.Q(('geohash__isnull', False)), fields=['geohash'], name='billboards_geohash_idx')
+
+
+def add_index(apps, schema_editor):
+    # Built concurrently on PostgreSQL; other databases get a plain index
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(Billboards, INDEX)
+    else:
+        schema_editor.add_index(Billboards, INDEX, concurrently=True)
+
+
+def drop_index(apps, schema_editor):
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(Billboards, INDEX)
+    else:
+        schema_editor.remove_index(Billboards, INDEX, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch and the index is built with CREATE
+    # INDEX CONCURRENTLY, so neither runs inside one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('media_asset', '0030_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billboards',
+            name='geohash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_index, drop_index)],
+            state_operations=[migrations.AddIndex(model_name='billboards', index=INDEX)],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0031_billboards_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('x', models.PositiveIntegerField()),
+                ('y', models.PositiveIntegerField()),
+                ('asset_count', models.IntegerField(default=0)),
+                ('sum_latitude', models.FloatField(default=0)),
+                ('sum_longitude', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Cluster cell',
+                'verbose_name_plural': 'Cluster cells',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clustercell',
+            constraint=models.UniqueConstraint(fields=('level', 'x', 'y'), name='unique_cluster_cell'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, transaction
+
+# Kept in step with media_asset/search.py: the same text search
+# configuration, and company name, unique id and ASIN weighted above the
+# street address, which is weighted above the LGA.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION billboards_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.company_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.unique_id, '') || ' ' || coalesce(NEW.asin, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.asset_street_address, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.asset_lga, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS billboards_search_vector_trigger ON media_asset_billboards;
+CREATE TRIGGER billboards_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF company_name, unique_id, asin, asset_street_address, asset_lga
+    ON media_asset_billboards
+    FOR EACH ROW EXECUTE FUNCTION billboards_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS billboards_search_vector_trigger ON media_asset_billboards;
+DROP FUNCTION IF EXISTS billboards_search_vector_update();
+"""
+
+INDEXES = [
+    ('billboards_search_vector_idx', 'USING gin (search_vector)'),
+    ('billboards_company_trgm_idx', 'USING gin (company_name gin_trgm_ops)'),
+    ('billboards_address_trgm_idx', 'USING gin (asset_street_address gin_trgm_ops)'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Install the trigger, fill in the search vector of existing billboards
+    one committed batch at a time, then build the GIN indexes concurrently.
+    PostgreSQL only; other databases fall back to substring matching.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER)
+
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    last_pk = 0
+    while True:
+        pks = list(Billboards.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:5000])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        with transaction.atomic():
+            # Touching a watched column fires the trigger
+            schema_editor.execute(
+                'UPDATE media_asset_billboards SET company_name = company_name WHERE id >= %s AND id <= %s',
+                [pks[0], pks[-1]],
+            )
+
+    for name, definition in INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON media_asset_billboards {definition}')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch and the indexes are built with CREATE
+    # INDEX CONCURRENTLY, so neither runs inside one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('media_asset', '0032_clustercell'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='billboards',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
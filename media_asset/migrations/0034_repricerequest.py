@@ -0,0 +1,21 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0033_billboards_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepriceRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
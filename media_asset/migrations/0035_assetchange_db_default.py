@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:48
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0034_repricerequest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assetchange',
+            name='created_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now()),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:55
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def keep_existing_cursors(apps, schema_editor):
+    # Cursors already handed out are ids, so existing entries keep their id
+    # as their position and new ones are numbered after the highest id.
+    AssetChange = apps.get_model('media_asset', 'AssetChange')
+    ChangeFeedSequence = apps.get_model('media_asset', 'ChangeFeedSequence')
+    AssetChange.objects.update(seq=F('id'))
+    last_seq = AssetChange.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeFeedSequence.objects.update_or_create(pk=1, defaults={'last_seq': last_seq})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0035_assetchange_db_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Change feed sequence',
+                'verbose_name_plural': 'Change feed sequence',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='assetchange',
+            name='assetchange_user_seq_idx',
+        ),
+        migrations.AddField(
+            model_name='assetchange',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(keep_existing_cursors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='assetchange',
+            index=models.Index(fields=['user_id', 'seq'], name='assetchange_user_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetchange',
+            index=models.Index(condition=models.Q(('seq__isnull', True)), fields=['id'], name='assetchange_unsequenced_idx'),
+        ),
+    ]
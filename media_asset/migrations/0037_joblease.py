@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0036_assetchange_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('holder', models.UUIDField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:02
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def flag_missing_images(apps, schema_editor):
+    # Renders queued before the flag existed are not recorded anywhere, so
+    # billboards still without an image are handed to the cron job
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    Billboards.objects.filter(Q(qr_code__isnull=True) | Q(qr_code='')).update(qr_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_asset', '0037_joblease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billboards',
+            name='qr_pending',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(flag_missing_images, migrations.RunPython.noop),
+    ]
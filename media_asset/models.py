@@ -1,16 +1,22 @@
-import requests
 import logging
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models.functions import Now
 from authentication.models import AnsaaUser
 from phonenumber_field.modelfields import PhoneNumberField
 from django.utils.translation import gettext_lazy as _
+import random
 import uuid
 from django.utils import timezone
-import qrcode
-from io import BytesIO
-from django.core.files.base import ContentFile
+from datetime import timedelta
 from decimal import Decimal
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ansaa_server.versioning import bump_version
+from . import geo
+from .qr import qr_hash, schedule_qr_render
+from .signals import billboards_bulk_created
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +43,42 @@ class UserZone(models.Model):
         return f"{self.user.fullname}'s Zone: {self.zone.name}"   
 
 
+def generate_unique_id():
+    """
+    Return an unused billboard id such as 'BOARD 3F9A1C07'.
+    """
+    while True:
+        unique_id = f'BOARD {uuid.uuid4().hex[:8]}'.upper()
+        if not Billboards.objects.filter(unique_id=unique_id).exists():
+            return unique_id
+
+
+def random_unique_id(rng=random):
+    return f'BOARD {rng.getrandbits(32):08X}'
+
+
+def assign_unique_ids(billboards, rng=random):
+    """
+    Give each billboard an id not used by another billboard in the list or
+    in the database, with one query per round instead of one per billboard.
+    8 hex digits collide often enough at a few hundred thousand rows that
+    bulk inserts must check.
+    """
+    while True:
+        seen = set()
+        duplicates = []
+        for billboard in billboards:
+            if billboard.unique_id in seen:
+                duplicates.append(billboard)
+            seen.add(billboard.unique_id)
+        taken = set(Billboards.objects.filter(unique_id__in=seen).values_list('unique_id', flat=True))
+        duplicates += [billboard for billboard in billboards if billboard.unique_id in taken]
+        if not duplicates:
+            return
+        for billboard in duplicates:
+            billboard.unique_id = random_unique_id(rng)
+
+
 class Billboards(models.Model):
 
     STATUS_PENDING = 'pending'
@@ -194,7 +236,7 @@ class Billboards(models.Model):
         NOT_PAID: _('Not_paid'),
     }
 
-    unique_id = models.CharField(max_length=10, editable=False)
+    unique_id = models.CharField(max_length=20, unique=True, editable=False)
 
     signage_type = models.CharField(max_length=50, choices=SIGNAGE_TYPE, blank=True)
     sign_type = models.CharField(max_length=50, choices=SIGN_TYPE, blank=True)
@@ -234,67 +276,121 @@ class Billboards(models.Model):
 
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    # Z-order cell of the coordinates for nearby searches, see media_asset/geo.py
+    geohash = models.BigIntegerField(blank=True, null=True, editable=False)
+    # Full-text search document, maintained by a database trigger on
+    # PostgreSQL (see media_asset/search.py and migration 0033)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     date = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    qr_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Set in the same transaction as a change that needs a new QR image, and
+    # cleared once it is rendered, so a render lost with its worker is picked
+    # up by the `render_pending_qr_codes` cron job
+    qr_pending = models.BooleanField(default=False, db_index=True, editable=False)
+    # Offline sync: the id the field app gave the billboard before it reached
+    # the server, and a counter bumped on every write for conflict detection
+    client_id = models.UUIDField(blank=True, null=True, editable=False)
+    row_version = models.PositiveIntegerField(default=1, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_values(self):
+        """
+        Field values (by attname) as last read from or written to the
+        database; empty for a billboard that has not been saved yet.
+        Signal receivers use this to compute deltas in post_save.
+        """
+        return getattr(self, '_loaded_values', {})
 
     def save(self, *args, **kwargs):
         if not self.unique_id:  # Generate unique_id only if not already set
-            unique_id_prefix = 'BOARD '
-            unique_id_suffix = uuid.uuid4().hex[:3]
-            self.unique_id = f'{unique_id_prefix}{unique_id_suffix}'.upper()
+            self.unique_id = generate_unique_id()
 
         is_new = self.pk is None
-        # Generate QR code
-        qr_data = f'Asset Name: {self.unique_id}\n' \
-                  f'Sign Type: {self.sign_type}\n' \
-                  f'Zone: {self.zone}\n' \
-                  f'Company Name: {self.company_name}\n' \
-                  f'Price: {self.price}\n' \
-                  f'City: {self.asset_lga}\n' \
-                  f'Address: {self.asset_street_address}\n' \
-                  f'Sub Zone: {self.sub_zone}\n' \
-                  f'Sign Format: {self.sign_format}\n' \
-                  f'Number of Faces: {self.no_of_faces}\n' \
-                  f'Dimension: {self.dimension}\n' \
-                  f'Actual Dimension: {self.actual_size}'
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        file_name = f'{self.unique_id}_qr.png'
-        self.qr_code.save(file_name, ContentFile(buffer.getvalue()), save=False)
-
-        super().save(*args, **kwargs)
         if is_new:
-            self.send_to_oasis()
+            # Price new billboards from the dimension bands and rate
+            from .pricing import quote
+            price = quote(self)
+            if price is not None:
+                self.price = price
+        else:
+            self.row_version += 1
+        self.geohash = geo.encode(self.latitude, self.longitude)
+
+        # The QR code is only re-rendered when the data it encodes changes,
+        # and the render itself happens after commit, off the request path.
+        needs_qr = qr_hash(self.qr_payload()) != self.qr_hash or not self.qr_code
+        if needs_qr:
+            self.qr_pending = True
+
+        # The Oasis notification is written to the outbox in the same
+        # transaction as the billboard, and delivered later by the
+        # `drain_oasis_outbox` worker instead of blocking the request.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                OasisOutbox.objects.create(
+                    billboard=self,
+                    unique_id=self.unique_id,
+                    payload=self.oasis_payload(),
+                )
+            if needs_qr:
+                billboard_id = self.pk
+                transaction.on_commit(lambda: schedule_qr_render(billboard_id))
+
+        self.remember_loaded_values()
+
+    def remember_loaded_values(self):
+        """
+        Record the current field values as the ones in the database, after
+        the billboard has been written.
+        """
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
 
-    def send_to_oasis(self):
-        oasis_url = "https://taxapp.services.an.gov.ng/api/external/asset/notification"
-        
+    def qr_payload(self):
+        """
+        Text encoded in the billboard's QR code.
+        """
+        return f'Asset Name: {self.unique_id}\n' \
+               f'Sign Type: {self.sign_type}\n' \
+               f'Zone: {self.zone}\n' \
+               f'Company Name: {self.company_name}\n' \
+               f'Price: {self.price}\n' \
+               f'City: {self.asset_lga}\n' \
+               f'Address: {self.asset_street_address}\n' \
+               f'Sub Zone: {self.sub_zone}\n' \
+               f'Sign Format: {self.sign_format}\n' \
+               f'Number of Faces: {self.no_of_faces}\n' \
+               f'Dimension: {self.dimension}\n' \
+               f'Actual Dimension: {self.actual_size}'
+
+    def oasis_payload(self):
+        """
+        Build the asset notification payload in the format expected by Oasis.
+        """
         def to_serializable(value):
             if isinstance(value, Decimal):
                 return float(value)
             if value is None:
                 return ""
             return value
-        
-        # Calculate asset area properly
+
         asset_area = ""
-        if self.length and self.breadth:
-            asset_area = str(float(self.length) * float(self.breadth))
-        
-        # Prepare payload according to the correct format
-        payload = {
+        if self.length is not None and self.breadth is not None:
+            asset_area = str(to_serializable(self.length * self.breadth))
+
+        return {
             "SignageType": self.signage_type or "",
             "SignType": self.sign_type or "",
             "SignFormat": self.sign_format or "",
@@ -304,7 +400,7 @@ class Billboards(models.Model):
             "Breadth": to_serializable(self.breadth),
             "OverallHeight": to_serializable(self.length),
             "AssetLGA": self.asset_lga or "",
-            "AssetArea": str(to_serializable(self.length * self.breadth)),
+            "AssetArea": asset_area,
             "AssetStreetAddress": self.asset_street_address or "",
             "Longitude": to_serializable(self.longitude),
             "Latitude": to_serializable(self.latitude),
@@ -320,50 +416,106 @@ class Billboards(models.Model):
             "BusinessCategory": self.business_category or "",
             "ActualSize": to_serializable(self.actual_size),
         }
-        
-        headers = {"Content-Type": "application/json"}
-        
-        try:
-            print(f"Sending data to Oasis API: {oasis_url}")
-            print(f"Payload: {payload}")
-            
-            response = requests.post(oasis_url, json=payload, headers=headers, timeout=30)
-            
-            # Print the raw response for debugging
-            print(f"Oasis API response status: {response.status_code}")
-            print(f"Oasis API response content: {response.text}")
-            
-            response.raise_for_status()
-            
-            # Try to parse JSON, but handle cases where response might be empty
-            if response.text.strip():
-                try:
-                    response_json = response.json()
-                    print(f"Successfully sent data to Oasis API: {response_json}")
-                except requests.exceptions.JSONDecodeError:
-                    print("Oasis API returned non-JSON response (may be expected)")
-            else:
-                print("Oasis API returned empty response (likely success)")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request error sending data to Oasis API: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Error response content: {e.response.text}")
-                
-        except Exception as e:
-            print(f"Unexpected error sending data to Oasis API: {e}")
+
+    def send_to_oasis(self):
+        """
+        Send this billboard to Oasis immediately, bypassing the outbox.
+        Raises `OasisDeliveryError` when the request fails.
+        """
+        from .oasis import post_notification
+        return post_notification(self.oasis_payload())
 
 
     class Meta:
-        ordering = ['-status']
+        ordering = ['-date', '-id']
         verbose_name = _('Billboard')
         verbose_name_plural = _('Billboards')
+        indexes = [
+            # Keyset pagination, report date ranges and weekly counts
+            models.Index(fields=['-date', '-id'], name='billboards_date_id_idx'),
+            models.Index(fields=['user', '-date', '-id'], name='billboards_user_date_id_idx'),
+            # Search and report filters within a user's assets
+            models.Index(fields=['user', 'vacancy'], name='billboards_user_vacancy_idx'),
+            models.Index(fields=['user', 'sign_type'], name='billboards_user_sign_type_idx'),
+            # The Oasis listing only ever reads completed assets
+            models.Index(
+                fields=['-date', '-id'],
+                condition=models.Q(status='completed'),
+                name='billboards_completed_date_idx',
+            ),
+            # Nearby and bounding-box searches
+            models.Index(
+                fields=['geohash'],
+                condition=models.Q(geohash__isnull=False),
+                name='billboards_geohash_idx',
+            ),
+            # The GIN indexes for free-text search are PostgreSQL only and
+            # are created by migration 0033
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'client_id'],
+                condition=models.Q(client_id__isnull=False),
+                name='billboards_user_client_id_uniq',
+            ),
+        ]
 
 
     def __str__(self):
         return self.unique_id
 
 
+@receiver([post_save, post_delete], sender=Billboards)
+def bump_billboards_version(sender, instance, **kwargs):
+    """
+    Invalidate anything cached from billboard data, globally and for the owner.
+    """
+    bump_version('billboards', f'billboards:user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Billboards)
+def record_billboard_change(sender, instance, **kwargs):
+    AssetChange.record(instance, AssetChange.ACTION_UPSERT)
+
+
+@receiver(post_delete, sender=Billboards)
+def record_billboard_deletion(sender, instance, **kwargs):
+    AssetChange.record(instance, AssetChange.ACTION_DELETE)
+
+
+@receiver(post_save, sender=Billboards)
+def update_cluster_cells(sender, instance, created, **kwargs):
+    """
+    Move the billboard between map cluster cells when its coordinates change.
+    """
+    from .clusters import apply_cluster_deltas, cluster_deltas
+
+    old = None if created else instance.loaded_values()
+    if not created and not old:
+        # Saved without being loaded, so there is nothing to compare with
+        return
+    apply_cluster_deltas(cluster_deltas(old, instance))
+
+
+@receiver(post_delete, sender=Billboards)
+def remove_from_cluster_cells(sender, instance, **kwargs):
+    from .clusters import apply_cluster_deltas, cluster_deltas
+
+    apply_cluster_deltas(cluster_deltas(instance.loaded_values() or instance, None))
+
+
+@receiver(billboards_bulk_created, sender=Billboards)
+def add_bulk_create_to_cluster_cells(sender, billboards, **kwargs):
+    from .clusters import apply_cluster_deltas, cluster_deltas, sum_deltas
+
+    apply_cluster_deltas(sum_deltas(cluster_deltas(None, billboard) for billboard in billboards))
+
+
+@receiver([post_save, post_delete], sender=Zones)
+def bump_zones_version(sender, instance, **kwargs):
+    bump_version('zones')
+
+
 class Dimensions(models.Model):
     
     # Define constants for categories
@@ -418,3 +570,267 @@ class AmountPerSqFt(models.Model):
 
     def __str__(self):
         return f"NGN {self.amount_per_sq_ft} per sq ft"
+
+
+@receiver([post_save, post_delete], sender=Dimensions)
+def bump_dimensions_version(sender, instance, **kwargs):
+    bump_version('dimensions')
+
+
+@receiver([post_save, post_delete], sender=AmountPerSqFt)
+def bump_rates_version(sender, instance, **kwargs):
+    bump_version('rates')
+
+
+@receiver([post_save, post_delete], sender=Dimensions)
+@receiver([post_save, post_delete], sender=AmountPerSqFt)
+def reprice_on_pricing_change(sender, instance, **kwargs):
+    """
+    Mark billboard prices as out of date. The reprice_pending_assets cron
+    job reprices them, outside the request.
+    """
+    RepriceRequest.objects.update_or_create(pk=1, defaults={'requested_at': timezone.now()})
+
+
+class RepriceRequest(models.Model):
+    """
+    Present when a price band or the rate has changed since billboards were
+    last repriced. There is at most one row; media_asset.cron clears it
+    after repricing.
+    """
+    requested_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Reprice requested at {self.requested_at}'
+
+
+class JobLease(models.Model):
+    """
+    A named lease that stops a periodic job from overlapping itself. The
+    holder renews it as it goes; a holder that dies loses it once it
+    expires.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    holder = models.UUIDField(blank=True, null=True)
+    expires_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.name} until {self.expires_at}'
+
+    @classmethod
+    def claim(cls, name, seconds):
+        """
+        Take the lease for `seconds` if nobody holds it. Returns the holder
+        token, or None when another run holds it.
+        """
+        cls.objects.get_or_create(name=name)
+        now = timezone.now()
+        with transaction.atomic():
+            lease = cls.objects.select_for_update(skip_locked=True).filter(name=name, expires_at__lte=now).first()
+            if lease is None:
+                return None
+            lease.holder = uuid.uuid4()
+            lease.expires_at = now + timedelta(seconds=seconds)
+            lease.save(update_fields=['holder', 'expires_at'])
+        return lease.holder
+
+    @classmethod
+    def renew(cls, name, holder, seconds):
+        """
+        Extend the lease. Returns False if `holder` no longer holds it.
+        """
+        expires_at = timezone.now() + timedelta(seconds=seconds)
+        return bool(cls.objects.filter(name=name, holder=holder).update(expires_at=expires_at))
+
+    @classmethod
+    def release(cls, name, holder):
+        cls.objects.filter(name=name, holder=holder).update(holder=None, expires_at=timezone.now())
+
+
+
+class OasisOutbox(models.Model):
+    """
+    Pending asset notification for Oasis, written in the same transaction
+    as the billboard it describes.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_DEAD = 'dead'
+
+    STATUS_CHOICES = {
+        STATUS_PENDING: _('Pending'),
+        STATUS_DELIVERED: _('Delivered'),
+        STATUS_DEAD: _('Dead letter'),
+    }
+
+    billboard = models.ForeignKey(Billboards, on_delete=models.SET_NULL, blank=True, null=True, related_name='oasis_notifications')
+    unique_id = models.CharField(max_length=20)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = _('Oasis notification')
+        verbose_name_plural = _('Oasis notifications')
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.unique_id} ({self.status})'
+
+
+class OasisSyncState(models.Model):
+    """
+    Fingerprint of the last payload Oasis acknowledged for a billboard.
+    """
+    billboard = models.OneToOneField(Billboards, on_delete=models.CASCADE, primary_key=True, related_name='oasis_sync_state')
+    fingerprint = models.CharField(max_length=64)
+    acknowledged_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('Oasis sync state')
+        verbose_name_plural = _('Oasis sync states')
+
+    def __str__(self):
+        return f'{self.billboard_id}: {self.fingerprint[:12]}'
+
+
+
+class AssetChange(models.Model):
+    """
+    Change log behind the incremental asset feed. Each write replaces the
+    billboard's previous entry with a new one, so the table holds one row per
+    live billboard plus one tombstone per deleted billboard. `seq` is the
+    feed position. It is only given to entries after they commit (see
+    media_asset/feed.py), so reading everything after a cursor costs time
+    proportional to what changed and never skips a slow transaction.
+    """
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+
+    ACTION_CHOICES = {
+        ACTION_UPSERT: _('Created or updated'),
+        ACTION_DELETE: _('Deleted'),
+    }
+
+    billboard_id = models.BigIntegerField(db_index=True)
+    user_id = models.BigIntegerField()
+    unique_id = models.CharField(max_length=20)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(db_default=Now())
+    seq = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        verbose_name = _('Asset change')
+        verbose_name_plural = _('Asset changes')
+        indexes = [
+            models.Index(fields=['user_id', 'seq'], name='assetchange_user_seq_idx'),
+            models.Index(fields=['id'], condition=models.Q(seq__isnull=True), name='assetchange_unsequenced_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.pk} {self.action} {self.unique_id}'
+
+    @classmethod
+    def record(cls, billboard, action):
+        cls.objects.filter(billboard_id=billboard.pk).delete()
+        return cls.objects.create(
+            billboard_id=billboard.pk,
+            user_id=billboard.user_id,
+            unique_id=billboard.unique_id,
+            action=action,
+        )
+
+    @classmethod
+    def record_many(cls, billboards, action):
+        """
+        Record the same action for many billboards with one delete and one
+        insert, for bulk writes that fire no signals.
+        """
+        cls.objects.filter(billboard_id__in=[billboard.pk for billboard in billboards]).delete()
+        return cls.objects.bulk_create([
+            cls(billboard_id=billboard.pk, user_id=billboard.user_id, unique_id=billboard.unique_id, action=action)
+            for billboard in billboards
+        ])
+
+
+class ChangeFeedSequence(models.Model):
+    """
+    The last change feed position handed out, in a single row. Locking it
+    serialises readers that hand out positions.
+    """
+    last_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Change feed sequence')
+        verbose_name_plural = _('Change feed sequence')
+
+    def __str__(self):
+        return str(self.last_seq)
+
+
+class ClusterCell(models.Model):
+    """
+    Number of billboards in one cell of the map clustering grid, and the
+    sums of their coordinates for the cluster's centroid. Every billboard
+    is counted once per level; see media_asset/clusters.py.
+    """
+    level = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    asset_count = models.IntegerField(default=0)
+    sum_latitude = models.FloatField(default=0)
+    sum_longitude = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = _('Cluster cell')
+        verbose_name_plural = _('Cluster cells')
+        constraints = [
+            models.UniqueConstraint(fields=['level', 'x', 'y'], name='unique_cluster_cell'),
+        ]
+
+    def __str__(self):
+        return f'{self.level}/{self.x}/{self.y}: {self.asset_count}'
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Response to a write request sent with an Idempotency-Key header, kept
+    so a retry of the same request gets the same response instead of
+    repeating the write. The row is inserted before the request runs, so
+    concurrent duplicates collide on the unique constraint.
+    """
+    STATE_IN_PROGRESS = 'in_progress'
+    STATE_COMPLETED = 'completed'
+
+    STATE_CHOICES = {
+        STATE_IN_PROGRESS: _('In progress'),
+        STATE_COMPLETED: _('Completed'),
+    }
+
+    scope = models.CharField(max_length=64)  # 'user:<id>', or 'apikey' for the Oasis endpoints
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_IN_PROGRESS)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _('Idempotency record')
+        verbose_name_plural = _('Idempotency records')
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.key} ({self.state})'
@@ -0,0 +1,312 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ansaa_server.metrics import outbound
+from .models import Billboards, JobLease, OasisOutbox, OasisSyncState
+
+logger = logging.getLogger(__name__)
+
+# Responses that are worth retrying; any other 4xx is treated as permanent.
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+SYNC_LEASE = 'oasis-sync'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class OasisDeliveryError(Exception):
+    """
+    Raised when Oasis does not acknowledge a notification.
+    """
+    def __init__(self, message, status_code=None, retryable=True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+def get_session():
+    """
+    Return the process-wide keep-alive HTTP session, so notifications reuse
+    pooled connections to Oasis instead of opening one per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.OASIS_HTTP_POOL_SIZE,
+                max_retries=0,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({"Content-Type": "application/json"})
+            _session = session
+    return _session
+
+
+def post_notification(payload, session=None):
+    """
+    POST a single asset notification to Oasis and return the response.
+    """
+    session = session or get_session()
+    with outbound('oasis'):
+        try:
+            response = session.post(
+                settings.OASIS_NOTIFICATION_URL,
+                json=payload,
+                timeout=settings.OASIS_TIMEOUT,
+            )
+        except requests.exceptions.RequestException as e:
+            raise OasisDeliveryError(f"Request error sending data to Oasis API: {e}") from e
+
+        if response.status_code >= 400:
+            retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES
+            raise OasisDeliveryError(
+                f"Oasis API returned {response.status_code}: {response.text[:500]}",
+                status_code=response.status_code,
+                retryable=retryable,
+            )
+    return response
+
+
+def payload_fingerprint(payload):
+    """
+    Stable SHA-256 of a notification payload, independent of key order.
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def record_acknowledged(fingerprints):
+    """
+    Store the acknowledged fingerprint for each billboard id in
+    `fingerprints` (a dict of billboard id to fingerprint).
+    """
+    if not fingerprints:
+        return
+    now = timezone.now()
+    OasisSyncState.objects.bulk_create(
+        [
+            OasisSyncState(billboard_id=billboard_id, fingerprint=fingerprint, acknowledged_at=now)
+            for billboard_id, fingerprint in fingerprints.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['billboard'],
+        update_fields=['fingerprint', 'acknowledged_at'],
+    )
+
+
+def backoff_delay(attempts):
+    """
+    Exponential backoff with jitter for a notification that has failed
+    `attempts` times.
+    """
+    base = settings.OASIS_OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    delay = min(base, settings.OASIS_OUTBOX_MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_batch(batch_size):
+    """
+    Lock a batch of due notifications and lease them to this worker by
+    pushing their next attempt past the request timeout. Rows leased by a
+    worker that dies become due again once the lease expires.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.OASIS_TIMEOUT * 2 + 60)
+
+    with transaction.atomic():
+        entries = list(
+            OasisOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OasisOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if entries:
+            OasisOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(next_attempt_at=lease_until)
+    return entries
+
+
+def _deliver(entry):
+    try:
+        response = post_notification(entry.payload)
+    except OasisDeliveryError as e:
+        return entry, None, e
+    return entry, response, None
+
+
+def drain_outbox(batch_size=None, max_attempts=None, concurrency=4):
+    """
+    Deliver one batch of due notifications. Returns a dict with the number
+    of rows delivered, rescheduled and dead-lettered.
+    """
+    batch_size = batch_size or settings.OASIS_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OASIS_OUTBOX_MAX_ATTEMPTS
+    stats = {'claimed': 0, 'delivered': 0, 'retried': 0, 'dead': 0}
+
+    entries = claim_batch(batch_size)
+    stats['claimed'] = len(entries)
+    if not entries:
+        return stats
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        results = list(executor.map(_deliver, entries))
+
+    now = timezone.now()
+    acknowledged = {}
+    for entry, response, error in results:
+        entry.attempts += 1
+        if error is None:
+            entry.status = OasisOutbox.STATUS_DELIVERED
+            entry.delivered_at = now
+            entry.response_status = response.status_code
+            entry.last_error = ''
+            if entry.billboard_id:
+                acknowledged[entry.billboard_id] = payload_fingerprint(entry.payload)
+            stats['delivered'] += 1
+            continue
+
+        entry.response_status = error.status_code
+        entry.last_error = str(error)
+        if not error.retryable or entry.attempts >= max_attempts:
+            entry.status = OasisOutbox.STATUS_DEAD
+            stats['dead'] += 1
+            logger.error(f"Oasis notification for {entry.unique_id} dead-lettered after {entry.attempts} attempt(s): {error}")
+        else:
+            entry.next_attempt_at = now + backoff_delay(entry.attempts)
+            stats['retried'] += 1
+            logger.warning(f"Oasis notification for {entry.unique_id} failed (attempt {entry.attempts}): {error}")
+
+    OasisOutbox.objects.bulk_update(
+        entries,
+        ['status', 'attempts', 'next_attempt_at', 'last_error', 'response_status', 'delivered_at'],
+    )
+    record_acknowledged(acknowledged)
+    return stats
+
+
+def requeue_dead_letters(queryset=None):
+    """
+    Put dead-lettered notifications back in the queue for another round of
+    attempts. Returns the number of rows requeued.
+    """
+    queryset = queryset if queryset is not None else OasisOutbox.objects.all()
+    return queryset.filter(status=OasisOutbox.STATUS_DEAD).update(
+        status=OasisOutbox.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def _send(item):
+    billboard_id, payload, fingerprint = item
+    try:
+        post_notification(payload)
+    except OasisDeliveryError as e:
+        return billboard_id, fingerprint, e
+    return billboard_id, fingerprint, None
+
+
+def sync_changed(queryset=None, chunk_size=500, concurrency=4, dry_run=False, stdout=None):
+    """
+    Reconcile billboards with Oasis: rebuild each payload, compare its
+    fingerprint with the last acknowledged one and push only the rows that
+    changed. Billboards are read in primary-key chunks so memory stays
+    bounded on large tables. Billboards still waiting in the outbox are left
+    to the outbox worker.
+
+    A billboard with no acknowledged fingerprint that never went through the
+    outbox was pushed inline, before fingerprints were kept, so its current
+    payload is recorded as acknowledged ("adopted") instead of being sent
+    again.
+
+    Only one run at a time: a run holds the "oasis-sync" JobLease, renewed
+    every chunk, and a run that cannot take it does nothing.
+
+    Returns a dict with the number of rows skipped, adopted, sent and
+    failed, and `overlapped` when another run held the lease.
+    """
+    if queryset is None:
+        queryset = Billboards.objects.all()
+    queryset = queryset.exclude(
+        oasis_notifications__status=OasisOutbox.STATUS_PENDING
+    ).annotate(
+        has_outbox=Exists(OasisOutbox.objects.filter(billboard=OuterRef('pk')))
+    ).order_by('pk')
+
+    stats = {'checked': 0, 'skipped': 0, 'adopted': 0, 'sent': 0, 'failed': 0, 'overlapped': False}
+    holder = None
+    if not dry_run:
+        holder = JobLease.claim(SYNC_LEASE, settings.OASIS_SYNC_LEASE_SECONDS)
+        if holder is None:
+            stats['overlapped'] = True
+            return stats
+    try:
+        _sync_chunks(queryset, chunk_size, concurrency, dry_run, stdout, stats, holder)
+    finally:
+        if holder is not None:
+            JobLease.release(SYNC_LEASE, holder)
+    return stats
+
+
+def _sync_chunks(queryset, chunk_size, concurrency, dry_run, stdout, stats, holder):
+    last_pk = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        while True:
+            if holder is not None and not JobLease.renew(SYNC_LEASE, holder, settings.OASIS_SYNC_LEASE_SECONDS):
+                logger.warning("Oasis sync lease expired; stopping so the next run can take over")
+                break
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            known = dict(
+                OasisSyncState.objects
+                .filter(billboard_id__in=[billboard.pk for billboard in chunk])
+                .values_list('billboard_id', 'fingerprint')
+            )
+            changed, adopted = [], {}
+            for billboard in chunk:
+                payload = billboard.oasis_payload()
+                fingerprint = payload_fingerprint(payload)
+                if known.get(billboard.pk) == fingerprint:
+                    stats['skipped'] += 1
+                elif billboard.pk not in known and not billboard.has_outbox:
+                    adopted[billboard.pk] = fingerprint
+                else:
+                    changed.append((billboard.pk, payload, fingerprint))
+            stats['checked'] += len(chunk)
+            stats['adopted'] += len(adopted)
+
+            if dry_run:
+                stats['sent'] += len(changed)
+            else:
+                acknowledged = dict(adopted)
+                for billboard_id, fingerprint, error in executor.map(_send, changed):
+                    if error is None:
+                        acknowledged[billboard_id] = fingerprint
+                        stats['sent'] += 1
+                    else:
+                        stats['failed'] += 1
+                        logger.warning(f"Oasis sync failed for billboard {billboard_id}: {error}")
+                record_acknowledged(acknowledged)
+
+            if stdout is not None:
+                stdout.write(
+                    f"{stats['checked']} checked: {stats['skipped']} skipped, {stats['adopted']} adopted, "
+                    f"{stats['sent']} sent, {stats['failed']} failed"
+                )
@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the (date, id) key, newest first.
+
+    A cursor records the key of the last row of a page, and the next page
+    is a range read on the (date, id) index that starts just after it.
+    Every page costs the same as the first. Rows inserted while a client
+    pages through can never shift later pages, so nothing is duplicated
+    or skipped.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = settings.ASSET_PAGE_SIZE
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, settings.ASSET_MAX_PAGE_SIZE))
+
+    def encode_cursor(self, row, reverse):
+        position = {'d': row.date.isoformat(), 'i': row.pk, 'r': int(reverse)}
+        return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return datetime.fromisoformat(position['d']), int(position['i']), bool(position.get('r'))
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor:
+            date, pk, _ = cursor
+            if reverse:
+                queryset = queryset.filter(Q(date__gt=date) | Q(date=date, pk__gt=pk), date__gte=date)
+            else:
+                queryset = queryset.filter(Q(date__lt=date) | Q(date=date, pk__lt=pk), date__lte=date)
+
+        ordering = ('date', 'pk') if reverse else ('-date', '-pk')
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+                if has_more:
+                    self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+            else:
+                if has_more:
+                    self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+                if cursor:
+                    self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from the `next` or `previous` link.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Results per page (at most {settings.ASSET_MAX_PAGE_SIZE}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
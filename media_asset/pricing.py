@@ -0,0 +1,192 @@
+"""
+Billboard pricing from the Dimensions price bands and the rate per square
+foot.
+
+A billboard's area (length x breadth, in metres) is looked up in the m²
+bands for its category and zone. The category comes from its sign type. If
+no band covers the area, the price is the area in square feet times the
+AmountPerSqFt rate. The bands are compiled into a sorted index per
+(category, zone), so each lookup is a binary search. The index is rebuilt
+only when the dimensions or rates registry reloads.
+"""
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ansaa_server.versioning import bump_version
+from . import registry
+from .models import AssetChange, Billboards, Dimensions
+from .qr import render_billboard_qr
+from .signals import billboards_bulk_updated
+
+# Billboards.sign_type -> Dimensions.category
+SIGN_TYPE_CATEGORY = {
+    Billboards.WALLDRAPES: Dimensions.WALL_SIGNS,
+    Billboards.WALL_CANOPY_ROOF_SIGNS: Dimensions.WALL_SIGNS,
+    Billboards.NEON_SIGNS: Dimensions.WALL_SIGNS,
+    Billboards.PROJECTING_SIGNS: Dimensions.PROJECTING_SIGNS,
+    Billboards._48_SHEETS: Dimensions.BILLBOARD_DESIGNATION,
+    Billboards._96_SHEETS: Dimensions.BILLBOARD_DESIGNATION,
+    Billboards.BRIDGE_PANEL: Dimensions.BILLBOARD_DESIGNATION,
+    Billboards.OVERHEAD_GANTRIES: Dimensions.BILLBOARD_DESIGNATION,
+    Billboards.UNIPOLES: Dimensions.FREE_STANDING_SIGNS,
+    Billboards.LAMP_POSTS: Dimensions.FREE_STANDING_SIGNS,
+    Billboards.LED_SCREENS_FILLING_STATIONS: Dimensions.FREE_STANDING_SIGNS,
+}
+
+CENT = Decimal('0.01')
+# The bands are in square metres and the rate is per square foot
+SQ_FT_PER_SQ_M = Decimal('10.7639104')
+
+
+class BandIndex:
+    """
+    Price bands of one (category, zone), sorted by lower bound. A band
+    covers min_width <= area <= max_width. Where bands overlap or share a
+    boundary, the band with the higher lower bound wins.
+    """
+    def __init__(self, bands):
+        bands = sorted(bands, key=lambda band: (band.min_width, band.pk))
+        self.lower = [band.min_width for band in bands]
+        self.upper = [band.max_width for band in bands]
+        self.prices = [band.price for band in bands]
+        # Largest upper bound among bands[0..i], to stop the backward scan early
+        self.reach = []
+        for upper in self.upper:
+            self.reach.append(max(upper, self.reach[-1]) if self.reach else upper)
+
+    def lookup(self, area):
+        i = bisect_right(self.lower, area) - 1
+        while i >= 0 and self.reach[i] >= area:
+            if self.upper[i] >= area:
+                return self.prices[i]
+            i -= 1
+        return None
+
+
+class PriceIndex:
+
+    def __init__(self, dimensions, rates):
+        grouped = defaultdict(list)
+        for band in dimensions:
+            grouped[(band.category or None, band.zone or None)].append(band)
+        self.bands = {key: BandIndex(bands) for key, bands in grouped.items()}
+        self.rate = rates[0].amount_per_sq_ft if rates else None
+
+    def band_price(self, category, zone, area):
+        # Bands without a category or zone apply to every category or zone
+        for key in ((category, zone), (category, None), (None, zone), (None, None)):
+            index = self.bands.get(key)
+            if index is not None:
+                price = index.lookup(area)
+                if price is not None:
+                    return price
+        return None
+
+    def price(self, sign_type, zone, length, breadth):
+        """
+        Price for a billboard, or None when it cannot be computed (no size,
+        or no matching band and no rate).
+        """
+        if length is None or breadth is None:
+            return None
+        area = Decimal(length) * Decimal(breadth)
+        price = self.band_price(SIGN_TYPE_CATEGORY.get(sign_type), zone or None, float(area))
+        if price is None and self.rate is not None:
+            price = area * SQ_FT_PER_SQ_M * self.rate
+        return None if price is None else Decimal(price).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The price index for the current bands and rate.
+    """
+    global _index, _index_key
+    dimensions, rates = registry.dimensions.all(), registry.rates.all()
+    key = (registry.dimensions.version, registry.rates.version)
+    with _index_lock:
+        if key != _index_key:
+            _index, _index_key = PriceIndex(dimensions, rates), key
+        return _index
+
+
+def quote(billboard):
+    return get_index().price(billboard.sign_type, billboard.zone, billboard.length, billboard.breadth)
+
+
+REPRICE_FIELDS = (
+    'pk', 'user_id', 'unique_id', 'length', 'breadth', 'price',
+    'zone', 'sub_zone_id', 'sign_type', 'vacancy', 'payment_status', 'asset_lga',
+)
+
+
+def reprice_assets(queryset=None, batch_size=2000, dry_run=False, stdout=None, render_qr=None):
+    """
+    Recompute the price of every billboard in `queryset` (all by default)
+    and write the ones that changed, one bulk update per batch. Each batch
+    also records the change feed, notifies rollups, bumps version stamps
+    and, after it commits, re-renders the QR codes with `render_qr`,
+    because the QR code shows the price. The default renders inline, so
+    nothing is left on a background queue when the process exits.
+
+    Returns a dict with the number of rows checked and changed.
+    """
+    index = get_index()
+    render_qr = render_qr or render_billboard_qr
+    if queryset is None:
+        queryset = Billboards.objects.all()
+    queryset = queryset.order_by('pk')
+    stats = {'checked': 0, 'changed': 0}
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update()
+                .filter(pk__gt=last_pk)
+                .values(*REPRICE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1]['pk']
+            stats['checked'] += len(rows)
+
+            changes = []
+            for row in rows:
+                price = index.price(row['sign_type'], row['zone'], row['length'], row['breadth'])
+                if price is not None and price != row['price']:
+                    changes.append((row, {**row, 'price': price}))
+            stats['changed'] += len(changes)
+            if dry_run or not changes:
+                continue
+
+            now = timezone.now()
+            Billboards.objects.bulk_update(
+                [
+                    Billboards(pk=new['pk'], price=new['price'], updated_at=now, row_version=F('row_version') + 1)
+                    for _, new in changes
+                ],
+                ['price', 'updated_at', 'row_version'],
+            )
+            AssetChange.record_many(
+                [Billboards(pk=new['pk'], user_id=new['user_id'], unique_id=new['unique_id']) for _, new in changes],
+                AssetChange.ACTION_UPSERT,
+            )
+            billboards_bulk_updated.send(sender=Billboards, changes=changes)
+            bump_version('billboards', *{f"billboards:user:{new['user_id']}" for _, new in changes})
+            for _, new in changes:
+                transaction.on_commit(lambda pk=new['pk']: render_qr(pk))
+
+        if stdout is not None:
+            stdout.write(f"{stats['checked']} checked, {stats['changed']} repriced")
+    return stats
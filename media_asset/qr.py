@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import queue
+import threading
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from ansaa_server.versioning import bump_version
+
+logger = logging.getLogger(__name__)
+
+_jobs = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def qr_hash(data):
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def render_qr_png(data):
+    """
+    Encode `data` as a QR code and return the PNG bytes.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def store_qr(billboard):
+    """
+    Render and store the QR code of a loaded billboard, with its sub zone,
+    if its encoded data changed since the last render, and clear its
+    pending flag. Returns True when a new image was written. The caller
+    bumps the version stamps.
+    """
+    from .models import Billboards
+
+    # An edit saved since the billboard was loaded bumped row_version and
+    # needs its own render, so its pending flag stays set
+    still_pending = ExpressionWrapper(Q(row_version__gt=billboard.row_version), output_field=BooleanField())
+    rows = Billboards.objects.filter(pk=billboard.pk)
+
+    data = billboard.qr_payload()
+    digest = qr_hash(data)
+    if digest == billboard.qr_hash and billboard.qr_code:
+        if billboard.qr_pending:
+            rows.update(qr_pending=still_pending)
+            billboard.qr_pending = False
+        return False
+
+    old_name = billboard.qr_code.name if billboard.qr_code else None
+    billboard.qr_code.save(f'{billboard.unique_id}_qr.png', ContentFile(render_qr_png(data)), save=False)
+    rows.update(qr_code=billboard.qr_code.name, qr_hash=digest, qr_pending=still_pending)
+    billboard.qr_hash = digest
+    billboard.qr_pending = False
+
+    if old_name and old_name != billboard.qr_code.name:
+        billboard.qr_code.storage.delete(old_name)
+    return True
+
+
+def render_billboard_qr(billboard_id):
+    """
+    Render and store the QR code for a billboard if its encoded data changed
+    since the last render. Returns True when a new image was written.
+    """
+    from .models import Billboards
+
+    billboard = Billboards.objects.select_related('sub_zone').filter(pk=billboard_id).first()
+    if billboard is None or not store_qr(billboard):
+        return False
+    bump_version('billboards', f'billboards:user:{billboard.user_id}')
+    return True
+
+
+def render_pending(chunk_size=500):
+    """
+    Render the QR codes of billboards still flagged as pending, e.g. because
+    the worker that had them queued was restarted. Returns the number of
+    billboards checked and rendered.
+    """
+    from .models import Billboards
+
+    checked = rendered = 0
+    last_pk = 0
+    queryset = Billboards.objects.select_related('sub_zone').filter(qr_pending=True).order_by('pk')
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        checked += len(chunk)
+
+        users = set()
+        for billboard in chunk:
+            try:
+                if store_qr(billboard):
+                    users.add(billboard.user_id)
+                    rendered += 1
+            except Exception:
+                logger.exception(f"QR render failed for billboard {billboard.pk}")
+        if users:
+            bump_version('billboards', *(f'billboards:user:{user_id}' for user_id in users))
+    return {'checked': checked, 'rendered': rendered}
+
+
+def _run_worker():
+    while True:
+        billboard_id = _jobs.get()
+        try:
+            render_billboard_qr(billboard_id)
+        except Exception:
+            logger.exception(f"QR render failed for billboard {billboard_id}")
+        finally:
+            close_old_connections()
+            _jobs.task_done()
+
+
+def schedule_qr_render(billboard_id):
+    """
+    Queue a QR render for a billboard. With QR_RENDER_ASYNC enabled the
+    render runs on a background thread, off the request path; otherwise it
+    runs immediately.
+    """
+    global _worker
+    if not settings.QR_RENDER_ASYNC:
+        render_billboard_qr(billboard_id)
+        return
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name='qr-render', daemon=True)
+            _worker.start()
+    _jobs.put(billboard_id)
@@ -0,0 +1,91 @@
+"""
+In-process copies of the reference tables (sub zones, dimensions and the
+rate per square foot).
+
+They change a few times a year but are read on almost every request. Each
+table is held in memory per worker and reloaded only when its version stamp
+(bumped on save and delete) no longer matches the one it was loaded under,
+so a change made through any worker or the admin is picked up by all of
+them on their next read.
+"""
+import threading
+
+from django.db import DatabaseError
+
+from ansaa_server.versioning import get_version
+from .models import AmountPerSqFt, Dimensions, Zones
+
+
+class ReferenceTable:
+    """
+    Rows of one table, reloaded when the `namespace` stamp changes.
+    """
+    def __init__(self, namespace, queryset):
+        self.namespace = namespace
+        self.queryset = queryset
+        self.lock = threading.Lock()
+        self.version = None
+        self.rows = []
+        self.index = {}
+
+    def build_index(self, rows):
+        return {}
+
+    def load(self):
+        version = get_version(self.namespace)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            rows = list(self.queryset.all())
+            self.rows, self.index = rows, self.build_index(rows)
+            self.version = version
+
+    def all(self):
+        self.load()
+        return self.rows
+
+
+class ZoneTable(ReferenceTable):
+
+    def build_index(self, rows):
+        by_name = {}
+        for zone in rows:
+            by_name.setdefault(zone.name, []).append(zone)
+        return {
+            'name': by_name,
+            'id': {zone.pk: zone for zone in rows},
+        }
+
+    def by_name(self, name):
+        """
+        Sub zones with this exact name (normally zero or one).
+        """
+        self.load()
+        return self.index['name'].get(name, [])
+
+    def ids_for_names(self, names):
+        self.load()
+        return [zone.pk for name in names for zone in self.index['name'].get(name, [])]
+
+    def names_by_id(self):
+        self.load()
+        return {pk: zone.name for pk, zone in self.index['id'].items()}
+
+
+zones = ZoneTable('zones', Zones.objects.order_by('pk'))
+dimensions = ReferenceTable('dimensions', Dimensions.objects.order_by('pk'))
+rates = ReferenceTable('rates', AmountPerSqFt.objects.order_by('pk'))
+
+
+def warm():
+    """
+    Load every table, e.g. when a worker starts. Errors are ignored so a
+    worker can still boot before migrations have run.
+    """
+    for table in (zones, dimensions, rates):
+        try:
+            table.load()
+        except DatabaseError:
+            pass
@@ -0,0 +1,115 @@
+"""
+Free-text search over billboards.
+
+On PostgreSQL every billboard has a `search_vector` over its company name,
+unique id, ASIN, street address and LGA. A trigger keeps it up to date on
+every insert and update, including bulk writes, and a GIN index covers it
+(migration 0033). Company names and street addresses also have trigram
+indexes, so a misspelt word still finds them.
+
+A billboard matches when every word of the query is the start of a word in
+its search vector, or when the query is similar to a word sequence in its
+company name or street address. Matches are ranked by text rank plus that
+similarity. Both conditions are answered from the indexes, so only the
+matching rows are read.
+
+Other databases fall back to case-insensitive substring matching, without
+ranking.
+"""
+import re
+from collections import Counter
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+# The text search configuration used by the trigger in migration 0033
+CONFIG = 'simple'
+SEARCH_FIELDS = ('company_name', 'unique_id', 'asin', 'asset_street_address', 'asset_lga')
+TRIGRAM_FIELDS = ('company_name', 'asset_street_address')
+MAX_TERMS = 8
+# Fields the asset search filters on and returns counts for
+FACET_FIELDS = ('sign_type', 'zone', 'vacancy', 'status', 'payment_status')
+
+
+def terms(text):
+    """
+    The words of a query, lower-cased, without punctuation.
+    """
+    return re.findall(r'\w+', (text or '').casefold())[:MAX_TERMS]
+
+
+def _uses_index(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _query(words):
+    # Prefix match on every word, so results appear while the user types
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=CONFIG)
+
+
+def matching(queryset, text):
+    """
+    The billboards of `queryset` that match `text`, unordered. All of them
+    when the query has no words.
+    """
+    words = terms(text)
+    if not words:
+        return queryset
+    if not _uses_index(queryset):
+        for word in words:
+            lookup = Q()
+            for field in SEARCH_FIELDS:
+                lookup |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(lookup)
+        return queryset
+
+    lookup = Q(search_vector=_query(words))
+    for field in TRIGRAM_FIELDS:
+        lookup |= Q(**{f'{field}__trigram_word_similar': ' '.join(words)})
+    return queryset.filter(lookup)
+
+
+def ranked(queryset, text):
+    """
+    The billboards of `queryset` that match `text`, best match first, with
+    the score in `rank` (PostgreSQL only). Elsewhere, newest first.
+    """
+    words = terms(text)
+    queryset = matching(queryset, text)
+    if not words or not _uses_index(queryset):
+        return queryset.order_by('-date', '-pk')
+
+    similarity = Greatest(*(TrigramWordSimilarity(' '.join(words), field) for field in TRIGRAM_FIELDS))
+    rank = SearchRank(F('search_vector'), _query(words)) + similarity
+    return queryset.annotate(rank=rank).order_by(F('rank').desc(nulls_last=True), '-pk')
+
+
+def facet_counts(queryset, selected):
+    """
+    For each of FACET_FIELDS, how many billboards of `queryset` have each
+    value, given the values `selected` for the other facets. A facet's own
+    selection is ignored, so its counts say how many results each option
+    would give instead.
+
+    One grouped query counts every combination of facet values; the facets
+    are summed from those groups in Python.
+    """
+    counts = {field: Counter() for field in FACET_FIELDS}
+    groups = queryset.order_by().values_list(*FACET_FIELDS).annotate(count=Count('pk'))
+    for *values, count in groups:
+        mismatched = [
+            field for field, value in zip(FACET_FIELDS, values)
+            if field in selected and value != selected[field]
+        ]
+        if len(mismatched) > 1:
+            continue
+        for field, value in zip(FACET_FIELDS, values):
+            # A group outside one facet's selection still counts towards that facet
+            if not mismatched or mismatched == [field]:
+                counts[field][value] += count
+    return {
+        field: [{'value': value, 'count': count} for value, count in sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))]
+        for field, counter in counts.items()
+    }
@@ -0,0 +1,143 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from ansaa_server.versioning import bump_version
+from authentication.models import AnsaaUser
+from . import geo
+from .models import AmountPerSqFt, AssetChange, Billboards, Dimensions, Zones, assign_unique_ids, random_unique_id
+
+# Rough bounding box of Anambra State
+LATITUDE_RANGE = (5.70, 6.80)
+LONGITUDE_RANGE = (6.60, 7.30)
+
+SUB_ZONE_NAMES = [
+    'Awka', 'Onitsha', 'Nnewi', 'Ekwulobia', 'Ihiala', 'Aguata', 'Otuocha', 'Nkpor',
+    'Obosi', 'Ogidi', 'Abagana', 'Nteje', 'Umunze', 'Ozubulu', 'Oba', 'Atani',
+]
+
+
+def random_billboard(user, sub_zones, now, days=365, rng=random):
+    length = Decimal(rng.randint(10, 400)) / 10
+    breadth = Decimal(rng.randint(10, 200)) / 10
+    billboard = Billboards(
+        unique_id=random_unique_id(rng),
+        user=user,
+        sub_zone=rng.choice(sub_zones) if sub_zones else None,
+        signage_type=rng.choice(list(Billboards.SIGNAGE_TYPE)),
+        sign_type=rng.choice(list(Billboards.SIGN_TYPE)),
+        zone=rng.choice(list(Billboards.ZONE_CHOICES)),
+        status=rng.choice([Billboards.STATUS_COMPLETED] * 4 + [Billboards.STATUS_PENDING]),
+        vacancy=rng.choice(list(Billboards.VACANCY_CHOICES)),
+        sign_format=rng.choice(list(Billboards.SIGN_FORMAT)),
+        no_of_faces=rng.choice(list(Billboards.NO_OF_FACE)),
+        illumination_type=rng.choice(list(Billboards.ILLUMINATION_TYPE)),
+        length=length,
+        breadth=breadth,
+        dimension=f'{length}x{breadth}',
+        actual_size=str(length * breadth),
+        price=Decimal(rng.randint(5, 500)) * 1000,
+        payment_status=rng.choice(list(Billboards.PAYMENT_CHOICES)),
+        asset_street_address=f'{rng.randint(1, 300)} Market Road',
+        asset_lga=rng.choice(['Awka South', 'Awka North', 'Onitsha North', 'Onitsha South', 'Nnewi North', 'Idemili North', 'Ekwusigo', 'Ogbaru']),
+        company_name=f'Company {rng.randint(1, 5000)}',
+        asin=f'ASIN{rng.randint(100000, 999999)}',
+        business_type=Billboards.COMMERCIAL_BUSINESS,
+        business_category=rng.choice(list(Billboards.BUSINESS_CATEGORY)),
+        latitude=Decimal(f'{rng.uniform(*LATITUDE_RANGE):.6f}'),
+        longitude=Decimal(f'{rng.uniform(*LONGITUDE_RANGE):.6f}'),
+        date=now - timedelta(seconds=rng.randint(0, days * 24 * 60 * 60)),
+    )
+    billboard.geohash = geo.encode(billboard.latitude, billboard.longitude)
+    return billboard
+
+
+def seed_billboards(count, users, sub_zones, batch_size=5000, days=365, seed=None,
+                    record_changes=False, progress=None):
+    """
+    Insert `count` random billboards with bulk_create. Model save() and
+    signals do not run, so no QR codes, Oasis notifications or counters are
+    produced. With `record_changes` each batch is also added to the change
+    feed. `progress` is called with the running total after each batch.
+    Returns the number of rows inserted.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    inserted = 0
+    while inserted < count:
+        size = min(batch_size, count - inserted)
+        with transaction.atomic():
+            billboards = [random_billboard(rng.choice(users), sub_zones, now, days, rng) for _ in range(size)]
+            assign_unique_ids(billboards, rng)
+            billboards = Billboards.objects.bulk_create(billboards, batch_size=batch_size)
+            if record_changes:
+                AssetChange.objects.bulk_create(
+                    [
+                        AssetChange(
+                            billboard_id=billboard.pk, user_id=billboard.user_id,
+                            unique_id=billboard.unique_id, action=AssetChange.ACTION_UPSERT,
+                        )
+                        for billboard in billboards
+                    ],
+                    batch_size=batch_size,
+                )
+        inserted += size
+        if progress is not None:
+            progress(inserted)
+    return inserted
+
+
+def seed_users(count, password='password'):
+    """
+    Create `count` field agents (with their default tasks), sharing one
+    pre-hashed password. Returns the new users.
+    """
+    hashed = make_password(password)
+    start = AnsaaUser.objects.count()
+    users = []
+    for number in range(start, start + count):
+        # save() rather than create_user(), which emails every new user
+        user = AnsaaUser(
+            email=f'agent{number}@example.com',
+            phone_number=f'+234810{number:07d}',
+            fullname=f'Field Agent {number}',
+            password=hashed,
+        )
+        user.save()
+        users.append(user)
+    return users
+
+
+def seed_zones():
+    """
+    Make sure the Anambra sub zones exist. Returns all sub zones.
+    """
+    existing = set(Zones.objects.values_list('name', flat=True))
+    if Zones.objects.bulk_create([Zones(name=name) for name in SUB_ZONE_NAMES if name not in existing]):
+        bump_version('zones')
+    return list(Zones.objects.all())
+
+
+def seed_pricing():
+    """
+    Create a dimension price band per category and zone, and the rate per
+    square foot, unless pricing has already been configured.
+    """
+    if not Dimensions.objects.exists():
+        bands = [(0, 10, 15000), (10, 30, 40000), (30, 60, 90000), (60, 200, 200000)]
+        Dimensions.objects.bulk_create(
+            Dimensions(
+                name=f'{category_label} {low}-{high}m²', min_width=low, max_width=high, unit='m2',
+                category=category, zone=zone, price=Decimal(price) * (2 if zone == Dimensions.ZONE_RESTRICTED else 1),
+            )
+            for category, category_label in Dimensions.CATEGORY_CHOICES
+            for zone, _ in Dimensions.ZONE_CHOICES
+            for low, high, price in bands
+        )
+        bump_version('dimensions')
+    if not AmountPerSqFt.objects.exists():
+        AmountPerSqFt.objects.create(amount_per_sq_ft=Decimal('150.00'))
@@ -1,6 +1,29 @@
 from .models import UserZone, Billboards, Zones, Dimensions, AmountPerSqFt
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from . import registry
+from .duplicates import duplicate_error, find_duplicates
+
+
+class ZoneNameField(serializers.SlugRelatedField):
+    """
+    Sub zone by name, resolved from the in-process registry instead of a
+    query per write.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Zones.objects.all())
+        super().__init__(slug_field='name', **kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            matches = registry.zones.by_name(data)
+        except TypeError:
+            self.fail('invalid')
+        if not matches:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        if len(matches) > 1:
+            self.fail('invalid')
+        return matches[0]
 
 class AmountPerSqFtSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,17 +42,16 @@ class UserZoneSerializer(serializers.ModelSerializer):
 
 
 class CreateBillboardSerializer(serializers.ModelSerializer):
-    sub_zone = serializers.SlugRelatedField(
-        queryset=Zones.objects.all(),
-        slug_field='name'
-    )
+    sub_zone = ZoneNameField()
+    allow_duplicate = serializers.BooleanField(write_only=True, required=False, default=False)
 
     class Meta:
         model = Billboards
         fields = ['sign_type', 'signage_type', 'sign_format', 'no_of_faces', 'illumination_type', 'zone', 'status', 
                   'sub_zone', 'description', 'vacancy', 'dimension', 'actual_size', 'length', 'breadth', 'price', 
                   'payment_status', 'image1', 'image2', 'image3', 'asset_street_address', 'asset_lga', 'state', 
-                  'country', 'asin', 'company_name', 'company_phone', 'business_type', 'business_category', 'longitude', 'latitude']
+                  'country', 'asin', 'company_name', 'company_phone', 'business_type', 'business_category', 'longitude', 'latitude',
+                  'allow_duplicate']
 
     def validate(self, data):
         validated_data = data.copy()
@@ -37,6 +59,14 @@ class CreateBillboardSerializer(serializers.ModelSerializer):
         required_fields = ['zone', 'image1', 'sign_type', 'sub_zone', 'business_category', 'business_type']
         validated_data['status'] = 'completed' if all(validated_data.get(field) for field in required_fields) else 'pending'
 
+        # Reject a second registration of the same physical board. Batch
+        # uploads check all their items at once with duplicates.check_upload.
+        self.needs_duplicate_check = not validated_data.pop('allow_duplicate', False)
+        if self.needs_duplicate_check and not self.context.get('batch'):
+            duplicates = find_duplicates([validated_data])[0]
+            if duplicates:
+                raise ValidationError(duplicate_error(duplicates), code='duplicate')
+
         return validated_data
 
     def create(self, validated_data):
@@ -45,6 +75,46 @@ class CreateBillboardSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         return super().update(instance, validated_data)
 
+class BulkCreateResultSerializer(serializers.Serializer):
+    """
+    Outcome of one item of a bulk upload (documentation only).
+    """
+    index = serializers.IntegerField()
+    status = serializers.IntegerField()
+    id = serializers.IntegerField(required=False)
+    unique_id = serializers.CharField(required=False)
+    data = CreateBillboardSerializer(required=False)
+    errors = serializers.DictField(required=False)
+
+class SyncCreateSerializer(CreateBillboardSerializer):
+    client_id = serializers.UUIDField()
+
+    class Meta(CreateBillboardSerializer.Meta):
+        fields = CreateBillboardSerializer.Meta.fields + ['client_id']
+
+
+class SyncUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    client_id = serializers.UUIDField(required=False)
+    row_version = serializers.IntegerField(min_value=1)
+    fields = serializers.DictField()
+
+    def validate(self, data):
+        if not data.get('id') and not data.get('client_id'):
+            raise ValidationError('Either id or client_id is required.')
+        unknown = set(data['fields']) - (set(CreateBillboardSerializer.Meta.fields) - {'allow_duplicate'})
+        if unknown:
+            raise ValidationError({'fields': [f'{name} cannot be changed.' for name in sorted(unknown)]})
+        return data
+
+
+class SyncRequestSerializer(serializers.Serializer):
+    cursor = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    creates = serializers.ListField(child=serializers.DictField(), default=list)
+    updates = SyncUpdateSerializer(many=True, default=list)
+
+
 class DimensionsSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -52,14 +122,11 @@ class DimensionsSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'min_width', 'max_width', 'zone', 'price']
 
 class AssetSerializer(serializers.ModelSerializer):
-    sub_zone = serializers.SlugRelatedField(
-        queryset=Zones.objects.all(),
-        slug_field='name'
-    )
+    sub_zone = ZoneNameField()
     
     class Meta:
         model = Billboards
-        fields = '__all__'
+        exclude = ['search_vector']
 
 
 class PaymentUpdateSerializer(serializers.ModelSerializer):
@@ -74,14 +141,11 @@ class PaymentUpdateSerializer(serializers.ModelSerializer):
 
 
 class AssetsDetailsSerializer(serializers.ModelSerializer):
-    sub_zone = serializers.SlugRelatedField(
-        queryset=Zones.objects.all(),
-        slug_field='name'
-    )
+    sub_zone = ZoneNameField()
 
     class Meta:
         model = Billboards
-        fields = ['signage_type', 'sign_type', 'sign_format', 'no_of_faces', 'illumination_type', 'length', 'breadth', 'zone', 'status', 'sub_zone', 'description',
+        fields = ['unique_id', 'signage_type', 'sign_type', 'sign_format', 'no_of_faces', 'illumination_type', 'length', 'breadth', 'zone', 'status', 'sub_zone', 'description',
                   'vacancy', 'status', 'dimension', 'actual_size', 'price', 'payment_status', 'payment_date', 'image1',
                   'image2', 'image3', 'asset_street_address', 'asset_lga', 'state', 'country',
-                   'asin', 'business_type', 'company_name', 'company_phone', 'business_category', 'longitude', 'latitude']   
\ No newline at end of file
+                   'asin', 'business_type', 'company_name', 'company_phone', 'business_category', 'longitude', 'latitude', 'updated_at']   
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent after billboards are changed with bulk_update, which fires no
+# post_save. `changes` is a list of (old, new) dicts of field values.
+billboards_bulk_updated = Signal()
+
+# Sent after billboards are inserted with bulk_create, which fires no
+# post_save. `billboards` is the list of saved instances.
+billboards_bulk_created = Signal()
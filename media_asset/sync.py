@@ -0,0 +1,134 @@
+"""
+Offline sync for the field app.
+
+A sync request carries the assets the app created or edited while offline,
+and the cursor from its previous sync. The writes are applied first, then
+the user's changes after the cursor are read from the change feed, so a
+reconnect transfers what changed instead of the whole asset list.
+
+Assets created offline carry a client-generated UUID (`client_id`), which
+makes creates safe to resend: a create whose client id is already known
+returns the existing asset. Edits carry the `row_version` the app last saw;
+an edit made against an older version is a conflict and is returned with
+the server's copy instead of being applied.
+"""
+import uuid
+
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import status
+
+from .bulk import create_billboards
+from .duplicates import check_upload
+from .models import Billboards
+from .serializers import AssetSerializer, SyncCreateSerializer
+
+
+def _summary(billboard, status_code, **extra):
+    return {
+        'status': status_code,
+        'id': billboard.pk,
+        'client_id': billboard.client_id,
+        'unique_id': billboard.unique_id,
+        'row_version': billboard.row_version,
+        **extra,
+    }
+
+
+def _client_id(item):
+    try:
+        return uuid.UUID(str(item['client_id']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def apply_creates(user, items):
+    """
+    Create the assets in `items` that the server has not seen yet. Returns
+    one result per item, in order.
+    """
+    results = [None] * len(items)
+    client_ids = {_client_id(item) for item in items if isinstance(item, dict)} - {None}
+    existing = {
+        billboard.client_id: billboard
+        for billboard in Billboards.objects.filter(user=user, client_id__in=client_ids)
+        .only('pk', 'client_id', 'unique_id', 'row_version')
+    }
+
+    valid, seen = [], set()
+    for position, item in enumerate(items):
+        client_id = _client_id(item) if isinstance(item, dict) else None
+        if client_id in existing:
+            # Already created by an earlier sync whose response was lost
+            results[position] = _summary(existing[client_id], status.HTTP_200_OK)
+            continue
+        serializer = SyncCreateSerializer(data=item, context={'batch': True})
+        if not serializer.is_valid():
+            results[position] = {'status': status.HTTP_400_BAD_REQUEST, 'client_id': client_id, 'errors': serializer.errors}
+        elif client_id in seen:
+            errors = {'client_id': ['Duplicate client_id in this request.']}
+            results[position] = {'status': status.HTTP_400_BAD_REQUEST, 'client_id': client_id, 'errors': errors}
+        else:
+            seen.add(client_id)
+            valid.append((position, serializer))
+
+    duplicate_errors = check_upload([serializer for _, serializer in valid], [position for position, _ in valid])
+    pending = []
+    for (position, serializer), errors in zip(valid, duplicate_errors):
+        if errors:
+            client_id = serializer.validated_data['client_id']
+            results[position] = {'status': status.HTTP_400_BAD_REQUEST, 'client_id': client_id, 'errors': errors}
+        else:
+            pending.append((position, serializer.validated_data))
+
+    for (position, _), billboard in zip(pending, create_billboards(user, [data for _, data in pending])):
+        results[position] = _summary(billboard, status.HTTP_201_CREATED)
+    return results
+
+
+def apply_updates(user, items):
+    """
+    Apply edits to the user's assets. Each item names the asset by `id` or
+    `client_id` and gives the `row_version` it was based on and the
+    changed `fields`. Returns one result per item, in order.
+    """
+    lookup = Q(pk__in=[item['id'] for item in items if item.get('id')])
+    lookup |= Q(client_id__in=[item['client_id'] for item in items if item.get('client_id')])
+
+    results = []
+    with transaction.atomic():
+        # Locked so a concurrent edit cannot slip in between the version check and the write
+        billboards = list(
+            Billboards.objects.select_for_update(of=('self',))
+            .filter(lookup, user=user).select_related('sub_zone')
+        )
+        by_id = {billboard.pk: billboard for billboard in billboards}
+        by_client_id = {billboard.client_id: billboard for billboard in billboards if billboard.client_id}
+
+        for item in items:
+            billboard = by_id.get(item.get('id')) or by_client_id.get(item.get('client_id'))
+            if billboard is None:
+                results.append({'status': status.HTTP_404_NOT_FOUND, 'id': item.get('id'), 'client_id': item.get('client_id')})
+                continue
+            if billboard.row_version != item['row_version']:
+                results.append(_summary(billboard, status.HTTP_409_CONFLICT, server=AssetSerializer(billboard).data))
+                continue
+            serializer = AssetSerializer(billboard, data=item['fields'], partial=True)
+            if serializer.is_valid():
+                serializer.save()
+                results.append(_summary(billboard, status.HTTP_200_OK))
+            else:
+                results.append(_summary(billboard, status.HTTP_400_BAD_REQUEST, errors=serializer.errors))
+    return results
+
+
+def apply_sync(user, creates, updates):
+    """
+    Apply a sync request's writes. Raises IntegrityError when a concurrent
+    sync created one of the same client ids first; the app should retry.
+    """
+    with transaction.atomic():
+        created = apply_creates(user, creates) if creates else []
+        updated = apply_updates(user, updates) if updates else []
+    return created, updated
+
@@ -1,3 +1,639 @@
-from django.test import TestCase
+import uuid
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from ansa_target.models import Target
+from ansaa_server.testing import QueryBudgetTestCase, SeededDataMixin
+from ansaa_server.versioning import state_cache
+from report.models import AssetRollup
+from . import clusters, cron, duplicates, feed, geo, oasis, pricing, qr, registry, search
+from .bulk import create_billboards
+from .decorator import idempotency_cache_key
+from .models import AmountPerSqFt, AssetChange, Billboards, ClusterCell, Dimensions, IdempotencyRecord, JobLease, OasisOutbox, OasisSyncState, RepriceRequest, Zones
+from .serializers import ZoneNameField
+
+
+class AssetQueryBudgetTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        AmountPerSqFt.objects.create(amount_per_sq_ft=10)
+        Dimensions.objects.bulk_create(
+            Dimensions(name=f'Dimension {number}', min_width=number, max_width=number + 1, unit='m2', price=1000)
+            for number in range(10)
+        )
+
+    def test_list_assets(self):
+        response = self.assertQueryBudget(1, '/api/asset/list-assets/')
+        self.assertEqual(len(response.data['results']), self.asset_count)
+
+    def test_asset_detail(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        self.assertQueryBudget(1, f'/api/asset/{billboard.pk}/')
+
+    def test_search(self):
+        response = self.assertQueryBudget(1, '/api/asset/search/', {'status': Billboards.STATUS_COMPLETED})
+        self.assertTrue(response.data['results'])
+
+    def test_zones_dimensions_and_rates(self):
+        # One query to load each table into the registry, none after that
+        for url in ('/api/asset/zones/', '/api/asset/dimensions/', '/api/asset/amount-per-sq-ft/'):
+            self.assertQueryBudget(1, url)
+            self.assertQueryBudget(0, url)
+
+    def test_oasis_listing(self):
+        self.client.force_authenticate(None)
+        response = self.assertQueryBudget(1, '/api/asset/assets-list/', HTTP_X_API_KEY=settings.API_KEY)
+        self.assertTrue(response.data['results'])
+
+    def test_oasis_change_feed(self):
+        self.client.force_authenticate(None)
+        feed.assign_sequence()
+        # Locking the feed sequence costs a savepoint pair and two reads
+        response = self.assertQueryBudget(6, '/api/asset/assets-list/', {'since': 0}, HTTP_X_API_KEY=settings.API_KEY)
+        self.assertTrue(response.data['changes'])
+
+    def test_change_feed_serves_late_commits(self):
+        self.client.force_authenticate(None)
+        get_feed = lambda since: self.client.get('/api/asset/assets-list/', {'since': since}, HTTP_X_API_KEY=settings.API_KEY).data
+        cursor = get_feed('latest')['cursor']
+        # A long transaction took this id before the cursor was handed out,
+        # and only commits now
+        change = AssetChange.objects.filter(billboard_id__in=Billboards.objects.filter(status=Billboards.STATUS_COMPLETED).values('pk')).earliest('id')
+        change.delete()
+        AssetChange.objects.create(id=change.id, billboard_id=change.billboard_id, user_id=change.user_id, unique_id=change.unique_id, action=AssetChange.ACTION_UPSERT)
+        response = get_feed(cursor)
+        self.assertEqual([asset['unique_id'] for asset in response['changes']], [change.unique_id])
+        self.assertEqual(get_feed(response['cursor'])['changes'], [])
+
+    def test_change_feed_drops_billboards_leaving_listing(self):
+        self.client.force_authenticate(None)
+        get_feed = lambda since: self.client.get('/api/asset/assets-list/', {'since': since}, HTTP_X_API_KEY=settings.API_KEY).data
+        cursor = get_feed('latest')['cursor']
+        billboard = Billboards.objects.filter(status=Billboards.STATUS_COMPLETED).first()
+        billboard.status = Billboards.STATUS_PENDING
+        billboard.save()
+        response = get_feed(cursor)
+        self.assertEqual(response['changes'], [])
+        self.assertEqual([tombstone['unique_id'] for tombstone in response['deleted']], [billboard.unique_id])
+
+
+class RegistryTests(SeededDataMixin, APITestCase):
+
+    def test_sub_zone_resolved_from_registry(self):
+        field = ZoneNameField()
+        registry.zones.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(field.to_internal_value('Sub zone 1'), self.sub_zones[1])
+        with self.assertRaises(ValidationError):
+            field.to_internal_value('Nowhere')
+
+    def test_reloads_when_version_changes(self):
+        self.assertNotIn('Nowhere', [zone.name for zone in registry.zones.all()])
+        Zones.objects.create(name='Nowhere')
+        # TestCase never commits, so bump the stamp by hand
+        state_cache.delete('version:zones')
+        self.assertIn('Nowhere', [zone.name for zone in registry.zones.all()])
+
+
+class ConditionalGetTests(QueryBudgetTestCase):
+
+    def test_zones_not_modified(self):
+        etag = self.client.get('/api/asset/zones/')['ETag']
+        response = self.assertQueryBudget(0, '/api/asset/zones/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Zones.objects.create(name='Sub zone 9')
+        response = self.client.get('/api/asset/zones/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_asset_list_etag_is_per_user(self):
+        etag = self.client.get('/api/asset/list-assets/')['ETag']
+        self.assertEqual(self.client.get('/api/asset/list-assets/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/asset/list-assets/?page_size=5', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.force_authenticate(self.other_user)
+        self.assertEqual(self.client.get('/api/asset/list-assets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # A change to another user's billboards leaves this user's list valid
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            billboard = Billboards.objects.filter(user=self.other_user).first()
+            billboard.save()
+        self.assertEqual(self.client.get('/api/asset/list-assets/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            billboard = Billboards.objects.filter(user=self.user).first()
+            billboard.save()
+        self.assertEqual(self.client.get('/api/asset/list-assets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_asset_list_etag_follows_zone_names(self):
+        response = self.client.get('/api/asset/list-assets/')
+        etag = response['ETag']
+        sub_zone = Zones.objects.get(name=response.data['results'][0]['sub_zone'])
+        with self.captureOnCommitCallbacks(execute=True):
+            sub_zone.name = 'Renamed sub zone'
+            sub_zone.save()
+        response = self.client.get('/api/asset/list-assets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['sub_zone'], 'Renamed sub zone')
+
+
+class PricingTests(SeededDataMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        AmountPerSqFt.objects.create(amount_per_sq_ft=10)
+        Dimensions.objects.bulk_create([
+            Dimensions(name='Small', min_width=0, max_width=10, unit='m2', price=1000,
+                       category=Dimensions.FREE_STANDING_SIGNS, zone=Dimensions.ZONE_NORMAL),
+            Dimensions(name='Large', min_width=10, max_width=50, unit='m2', price=5000,
+                       category=Dimensions.FREE_STANDING_SIGNS, zone=Dimensions.ZONE_NORMAL),
+            Dimensions(name='Any wall sign', min_width=0, max_width=100, unit='m2', price=700,
+                       category=Dimensions.WALL_SIGNS),
+        ])
+
+    def price(self, sign_type, zone, length, breadth):
+        return pricing.get_index().price(sign_type, zone, Decimal(length), Decimal(breadth))
+
+    def test_band_lookup(self):
+        self.assertEqual(self.price(Billboards.UNIPOLES, Billboards.ZONE_NORMAL, 2, 3), Decimal('1000.00'))
+        # A shared boundary belongs to the higher band
+        self.assertEqual(self.price(Billboards.UNIPOLES, Billboards.ZONE_NORMAL, 2, 5), Decimal('5000.00'))
+        # A band without a zone applies to every zone
+        self.assertEqual(self.price(Billboards.NEON_SIGNS, Billboards.ZONE_RESTRICTED, 5, 5), Decimal('700.00'))
+
+    def test_rate_fallback(self):
+        # No band above 50m², and none at all for restricted unipoles. 6m² is 64.58 sq ft at NGN 10
+        self.assertEqual(self.price(Billboards.UNIPOLES, Billboards.ZONE_NORMAL, 10, 6), Decimal('6458.35'))
+        self.assertEqual(self.price(Billboards.UNIPOLES, Billboards.ZONE_RESTRICTED, 2, 3), Decimal('645.83'))
+        self.assertIsNone(pricing.get_index().price(Billboards.UNIPOLES, Billboards.ZONE_NORMAL, 2, None))
+
+    def test_priced_on_create(self):
+        billboard = Billboards.objects.create(
+            user=self.user, sign_type=Billboards.UNIPOLES, zone=Billboards.ZONE_NORMAL,
+            length=2, breadth=3, price=1,
+        )
+        self.assertEqual(billboard.price, Decimal('1000.00'))
+
+    def test_reprice(self):
+        billboards = Billboards.objects.filter(user=self.user)
+        stats = pricing.reprice_assets(billboards, batch_size=7)
+        self.assertEqual(stats['checked'], self.asset_count)
+        for billboard in billboards:
+            self.assertEqual(billboard.price, pricing.quote(billboard))
+        self.assertEqual(pricing.reprice_assets(billboards)['changed'], 0)
+
+    def test_pricing_change_reprices_from_cron(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        band = Dimensions.objects.get(name='Small')
+        band.price = 1234
+        band.save()
+        self.assertTrue(RepriceRequest.objects.exists())
+
+        with patch('media_asset.pricing.render_billboard_qr') as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                cron.reprice_pending_assets()
+        self.assertFalse(RepriceRequest.objects.exists())
+        self.assertTrue(render.called)
+        billboard.refresh_from_db()
+        self.assertEqual(billboard.price, pricing.quote(billboard))
+
+
+def asset_payload(number):
+    return {
+        'sign_type': Billboards.UNIPOLES, 'zone': Billboards.ZONE_NORMAL,
+        'sub_zone': 'Sub zone 1', 'company_name': f'Bulk {number}', 'asin': f'BULK{number}',
+        'business_type': Billboards.COMMERCIAL_BUSINESS, 'business_category': Billboards.COMMERCIAL_BANKS,
+        'sign_format': Billboards.PORTRAIT, 'no_of_faces': Billboards.SINGLE,
+        'illumination_type': Billboards.NONE, 'length': 2, 'breadth': 3,
+    }
+
+
+class RenderQRCodesTests(SeededDataMixin, APITestCase):
+
+    def test_one_query_per_render(self):
+        count = Billboards.objects.count()
+        with CaptureQueriesContext(connection) as context:
+            call_command('render_qr_codes', stdout=StringIO())
+        # Two chunk reads and one write per billboard, without refetching
+        self.assertEqual(len(context), count + 2)
+        self.assertFalse(Billboards.objects.filter(qr_hash='').exists())
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('render_qr_codes', stdout=StringIO())
+        self.assertEqual(len(context), 2)
+
+    def test_cron_renders_lost_jobs(self):
+        # The queued renders are lost, as when the worker is restarted
+        with patch('media_asset.models.schedule_qr_render'), patch('media_asset.bulk.schedule_qr_render'):
+            with self.captureOnCommitCallbacks(execute=True):
+                created = create_billboards(self.user, [dict(asset_payload(number), sub_zone=self.sub_zones[1]) for number in range(3)])
+                edited = Billboards.objects.filter(user=self.user).earliest('pk')
+                edited.company_name = 'Renamed company'
+                edited.save()
+        pending = Billboards.objects.filter(qr_pending=True)
+        self.assertCountEqual(pending.values_list('pk', flat=True), [billboard.pk for billboard in created] + [edited.pk])
+
+        cron.render_pending_qr_codes()
+        self.assertFalse(pending.exists())
+        edited.refresh_from_db()
+        self.assertEqual(edited.qr_hash, qr.qr_hash(edited.qr_payload()))
+
+
+class BulkCreateTests(SeededDataMixin, APITestCase):
+
+    def post(self, items):
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/asset/post-assets/bulk/', items, format='json')
+        return response, len(context)
+
+    def test_queries_do_not_grow_with_batch(self):
+        with patch('media_asset.bulk.schedule_qr_render') as render:
+            # The first batch also creates the month's target and completes the task
+            self.post([asset_payload(0)])
+            response, small = self.post([asset_payload(number) for number in range(2)])
+            self.assertEqual(response.status_code, 201, response.data)
+            response, large = self.post([asset_payload(number) for number in range(20)])
+            self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(render.call_count, 23)
+        self.assertEqual(large, small)
+
+        created = Billboards.objects.filter(company_name__startswith='Bulk')
+        self.assertEqual(created.count(), 23)
+        self.assertEqual(OasisOutbox.objects.filter(billboard__in=created).count(), 23)
+        self.assertEqual(AssetChange.objects.filter(billboard_id__in=created.values('pk')).count(), 23)
+        self.assertEqual(Target.objects.get(user=self.user).target_count, 23)
+        self.assertEqual(AssetRollup.objects.aggregate(total=Sum('asset_count'))['total'], 23)
+
+    def test_errors_reported_per_item(self):
+        items = [asset_payload(1), {**asset_payload(2), 'sign_type': 'Nope'}, asset_payload(3)]
+        response, _ = self.post(items)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data], [201, 400, 201])
+        self.assertIn('sign_type', response.data[1]['errors'])
+        self.assertEqual(Billboards.objects.filter(company_name__startswith='Bulk').count(), 2)
+
+
+class SyncTests(SeededDataMixin, APITestCase):
+
+    def sync(self, **body):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/asset/sync/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_creates_are_idempotent(self):
+        item = {**asset_payload(1), 'client_id': str(uuid.uuid4())}
+        first = self.sync(creates=[item])['created'][0]
+        self.assertEqual(first['status'], 201)
+        again = self.sync(creates=[item])['created'][0]
+        self.assertEqual((again['status'], again['id']), (200, first['id']))
+        self.assertEqual(Billboards.objects.filter(client_id=item['client_id']).count(), 1)
+
+    def test_stale_update_conflicts(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        edit = {'id': billboard.pk, 'row_version': billboard.row_version, 'fields': {'company_name': 'First'}}
+        self.assertEqual(self.sync(updates=[edit])['updated'][0]['row_version'], billboard.row_version + 1)
+
+        result = self.sync(updates=[{**edit, 'fields': {'company_name': 'Second'}}])['updated'][0]
+        self.assertEqual(result['status'], 409)
+        self.assertEqual(result['server']['company_name'], 'First')
+
+    def test_returns_changes_since_cursor(self):
+        cursor = self.sync()['cursor']
+        billboard = Billboards.objects.filter(user=self.user).first()
+        Billboards.objects.filter(user=self.other_user).first().save()
+        billboard.delete()
+        response = self.sync(cursor=cursor)
+        self.assertEqual(response['changes'], [])
+        self.assertEqual([tombstone['unique_id'] for tombstone in response['deleted']], [billboard.unique_id])
+
+
+class IdempotencyTests(SeededDataMixin, APITestCase):
+
+    def post(self, key, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/asset/post-assets/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_is_replayed(self):
+        first = self.post('retry-1', asset_payload(1))
+        self.assertEqual(first.status_code, 201, first.data)
+        with self.assertNumQueries(0):
+            retry = self.post('retry-1', asset_payload(1))
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Billboards.objects.filter(company_name='Bulk 1').count(), 1)
+
+        # Replayed from the database once the cache entry is gone
+        state_cache.clear()
+        self.assertEqual(self.post('retry-1', asset_payload(1)).data, first.data)
+        self.assertEqual(self.post('retry-1', asset_payload(2)).status_code, 422)
+
+    def test_concurrent_duplicate_conflicts(self):
+        IdempotencyRecord.objects.create(scope=f'user:{self.user.pk}', key='busy', path='/api/asset/post-assets/', fingerprint='')
+        response = self.post('busy', asset_payload(1))
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Billboards.objects.filter(company_name='Bulk 1').exists())
+
+    def test_purge_removes_cached_reply(self):
+        self.post('retry-1', asset_payload(1))
+        cache_key = idempotency_cache_key(f'user:{self.user.pk}', 'retry-1')
+        self.assertIsNotNone(state_cache.get(cache_key))
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL + 1))
+        cron.purge_idempotency_records()
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.assertIsNone(state_cache.get(cache_key))
+
+
+class NearbyTests(QueryBudgetTestCase):
+
+    def test_matches_exact_distance(self):
+        centre = (6.25, 6.95)
+        expected = sorted(
+            (geo.haversine(*centre, billboard.latitude, billboard.longitude), billboard.pk)
+            for billboard in Billboards.objects.filter(user=self.user)
+        )
+        radius = expected[len(expected) // 2][0]
+        response = self.assertQueryBudget(
+            2, '/api/asset/nearby/', {'lat': centre[0], 'lng': centre[1], 'radius': radius, 'limit': 5},
+        )
+        within = [pk for distance, pk in expected if distance <= radius]
+        self.assertEqual(response.data['count'], len(within))
+        self.assertEqual([result['id'] for result in response.data['results']], within[:5])
+
+    def test_bounding_box(self):
+        response = self.assertQueryBudget(2, '/api/asset/nearby/', {'bbox': '6.6,5.7,7.3,6.8', 'limit': 500})
+        self.assertEqual(response.data['count'], self.asset_count)
+        self.assertEqual(self.client.get('/api/asset/nearby/', {'lat': 'x'}).status_code, 400)
+
+
+class ClusterTests(QueryBudgetTestCase):
+
+    def cells(self):
+        return {
+            (cell.level, cell.x, cell.y): (cell.asset_count, cell.sum_latitude, cell.sum_longitude)
+            for cell in ClusterCell.objects.exclude(asset_count=0)
+        }
+
+    def test_incremental_matches_rebuild(self):
+        clusters.rebuild_clusters()
+        moved, deleted = Billboards.objects.filter(user=self.user)[:2]
+        moved.latitude, moved.longitude = Decimal('6.300000'), Decimal('7.100000')
+        moved.save()
+        deleted.delete()
+        with patch('media_asset.bulk.schedule_qr_render'):
+            self.client.post('/api/asset/post-assets/bulk/', [
+                {**asset_payload(number), 'latitude': '6.2', 'longitude': f'7.0{number}'} for number in range(3)
+            ], format='json')
+
+        incremental = self.cells()
+        clusters.rebuild_clusters()
+        rebuilt = self.cells()
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for key, (count, sum_latitude, sum_longitude) in rebuilt.items():
+            self.assertEqual(incremental[key][0], count)
+            self.assertAlmostEqual(incremental[key][1], sum_latitude, places=6)
+            self.assertAlmostEqual(incremental[key][2], sum_longitude, places=6)
+
+    def test_resave_after_bulk_create(self):
+        clusters.rebuild_clusters()
+        data = {**asset_payload(1), 'sub_zone': self.sub_zones[1], 'latitude': Decimal('6.2'), 'longitude': Decimal('7.0')}
+        with patch('media_asset.bulk.schedule_qr_render'):
+            billboard, = create_billboards(self.user, [data])
+        billboard.company_name = 'Renamed'
+        billboard.save()
+        incremental = self.cells()
+        clusters.rebuild_clusters()
+        self.assertEqual(
+            {key: value[0] for key, value in incremental.items()},
+            {key: value[0] for key, value in self.cells().items()},
+        )
+
+    def test_clusters_in_view(self):
+        clusters.rebuild_clusters()
+        response = self.assertQueryBudget(1, '/api/asset/clusters/', {'bbox': '6.6,5.7,7.3,6.8', 'zoom': 8})
+        self.assertEqual(sum(cluster['count'] for cluster in response.data['clusters']), 2 * self.asset_count)
+
+
+class DuplicateTests(SeededDataMixin, APITestCase):
+
+    def duplicate_of(self, billboard, **fields):
+        return {
+            **asset_payload(1), 'sign_type': billboard.sign_type, 'company_name': f' {billboard.company_name.upper()}.',
+            'latitude': str(billboard.latitude), 'longitude': str(billboard.longitude), **fields,
+        }
+
+    def test_upload_rejected_near_existing(self):
+        billboard = Billboards.objects.filter(user=self.other_user).first()
+        response = self.client.post('/api/asset/post-assets/', self.duplicate_of(billboard), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['duplicate_of'], [billboard.unique_id])
+
+        response = self.client.post('/api/asset/post-assets/', self.duplicate_of(billboard, allow_duplicate=True), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_upload_without_sign_type(self):
+        billboard = Billboards.objects.filter(user=self.other_user).first()
+        payload = self.duplicate_of(billboard)
+        del payload['sign_type']
+        response = self.client.post('/api/asset/post-assets/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['duplicate_of'], [billboard.unique_id])
+
+        payload['latitude'] = str(billboard.latitude + Decimal('0.01'))
+        response = self.client.post('/api/asset/post-assets/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_bulk_checks_existing_and_batch(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        near = {**asset_payload(2), 'latitude': '6.5', 'longitude': '7.5'}
+        with patch('media_asset.bulk.schedule_qr_render'):
+            response = self.client.post('/api/asset/post-assets/bulk/', [
+                self.duplicate_of(billboard), near, {**near, 'latitude': '6.50005'},
+            ], format='json')
+        self.assertEqual([result['status'] for result in response.data], [400, 201, 400])
+        self.assertEqual(response.data[0]['errors']['duplicate_of'], [billboard.unique_id])
+        self.assertEqual(response.data[2]['errors']['duplicate_of_index'], [1])
+
+    def test_clusters(self):
+        first, second = Billboards.objects.filter(user=self.user)[:2]
+        Billboards.objects.filter(pk=second.pk).update(
+            sign_type=first.sign_type, company_name=first.company_name.lower(),
+            latitude=first.latitude, longitude=first.longitude + Decimal('0.00005'),
+        )
+        self.assertIn(sorted([first.pk, second.pk]), duplicates.find_duplicate_clusters())
+
+
+class SearchTests(QueryBudgetTestCase):
+
+    def test_terms(self):
+        self.assertEqual(search.terms(' Shop-Rite,  AWKA '), ['shop', 'rite', 'awka'])
+        self.assertEqual(search.terms(None), [])
+
+    def test_search_view(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        Billboards.objects.filter(user=self.other_user).update(company_name=billboard.company_name)
+        query = f'{billboard.company_name.lower()} {billboard.unique_id.split()[1]}'
+        response = self.assertQueryBudget(2, '/api/asset/search/', {'q': query})
+        self.assertEqual([result['id'] for result in response.data['results']], [billboard.pk])
+        self.assertNotIn('search_vector', response.data['results'][0])
+
+        response = self.client.get('/api/asset/search/', {'q': 'market road', 'sign_type': billboard.sign_type})
+        expected = Billboards.objects.filter(user=self.user, sign_type=billboard.sign_type)
+        self.assertEqual(len(response.data['results']), min(expected.count(), settings.ASSET_PAGE_SIZE))
+
+    def test_facets(self):
+        selected = {'zone': Billboards.ZONE_NORMAL, 'vacancy': 'vacant'}
+        response = self.assertQueryBudget(3, '/api/asset/search/', {**selected, 'facets': 'true'})
+        assets = Billboards.objects.filter(user=self.user)
+        for field in search.FACET_FIELDS:
+            others = {name: value for name, value in selected.items() if name != field}
+            expected = assets.filter(**others).values(field).annotate(count=Count('pk'))
+            self.assertEqual(
+                {facet['value']: facet['count'] for facet in response.data['facets'][field]},
+                {row[field]: row['count'] for row in expected},
+            )
+        self.assertNotIn('facets', self.client.get('/api/asset/search/').data)
+
+
+@override_settings(OASIS_OUTBOX_MAX_ATTEMPTS=3, OASIS_OUTBOX_BACKOFF_SECONDS=60)
+class OasisOutboxTests(SeededDataMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.billboards = list(Billboards.objects.filter(user=self.user)[:3])
+        self.entries = OasisOutbox.objects.bulk_create([
+            OasisOutbox(billboard=billboard, unique_id=billboard.unique_id, payload=billboard.oasis_payload())
+            for billboard in self.billboards
+        ])
+
+    def drain(self, **post):
+        with patch('media_asset.oasis.post_notification', **post) as post_notification:
+            stats = oasis.drain_outbox(concurrency=1)
+        return stats, post_notification
+
+    def test_delivered(self):
+        stats, post_notification = self.drain(return_value=Mock(status_code=200))
+        self.assertEqual((stats['claimed'], stats['delivered']), (3, 3))
+        self.assertEqual(post_notification.call_count, 3)
+        self.assertEqual(OasisOutbox.objects.filter(status=OasisOutbox.STATUS_DELIVERED).count(), 3)
+        self.assertEqual(
+            OasisSyncState.objects.get(billboard=self.billboards[0]).fingerprint,
+            oasis.payload_fingerprint(self.billboards[0].oasis_payload()),
+        )
+        self.assertEqual(self.drain()[0]['claimed'], 0)
+
+    def test_retryable_error_backs_off(self):
+        before = timezone.now()
+        stats, _ = self.drain(side_effect=oasis.OasisDeliveryError('unavailable', status_code=503))
+        self.assertEqual(stats['retried'], 3)
+        for entry in OasisOutbox.objects.all():
+            self.assertEqual((entry.status, entry.attempts, entry.response_status), (OasisOutbox.STATUS_PENDING, 1, 503))
+            # The first retry waits between half and all of the base backoff
+            self.assertGreaterEqual(entry.next_attempt_at, before + timedelta(seconds=30))
+            self.assertLessEqual(entry.next_attempt_at, timezone.now() + timedelta(seconds=60))
+        # Nothing is due until the backoff has passed
+        self.assertEqual(self.drain()[0]['claimed'], 0)
+
+    def test_permanent_error_dead_letters(self):
+        stats, _ = self.drain(side_effect=oasis.OasisDeliveryError('bad request', status_code=400, retryable=False))
+        self.assertEqual(stats['dead'], 3)
+        self.assertEqual(set(OasisOutbox.objects.values_list('status', 'attempts')), {(OasisOutbox.STATUS_DEAD, 1)})
+
+    def test_max_attempts(self):
+        OasisOutbox.objects.filter(pk=self.entries[0].pk).update(attempts=2)
+        stats, _ = self.drain(side_effect=oasis.OasisDeliveryError('unavailable', status_code=503))
+        self.assertEqual((stats['dead'], stats['retried']), (1, 2))
+        self.assertEqual(OasisOutbox.objects.get(pk=self.entries[0].pk).status, OasisOutbox.STATUS_DEAD)
+
+    def test_lease_expires(self):
+        claimed = oasis.claim_batch(10)
+        self.assertEqual(len(claimed), 3)
+        # A worker that dies after claiming keeps the rows leased until the lease runs out
+        self.assertEqual(oasis.claim_batch(10), [])
+        lease_end = OasisOutbox.objects.get(pk=claimed[0].pk).next_attempt_at
+        with patch('media_asset.oasis.timezone.now', return_value=lease_end + timedelta(seconds=1)):
+            self.assertEqual(len(oasis.claim_batch(10)), 3)
+
+    def test_requeue_dead_letters(self):
+        OasisOutbox.objects.filter(pk=self.entries[0].pk).update(status=OasisOutbox.STATUS_DEAD, attempts=3)
+        self.assertEqual(oasis.requeue_dead_letters(), 1)
+        entry = OasisOutbox.objects.get(pk=self.entries[0].pk)
+        self.assertEqual((entry.status, entry.attempts), (OasisOutbox.STATUS_PENDING, 0))
+        stats, _ = self.drain(return_value=Mock(status_code=200))
+        self.assertEqual(stats['delivered'], 3)
+
+
+class OasisSyncTests(SeededDataMixin, APITestCase):
+
+    def sync(self):
+        with patch('media_asset.oasis.post_notification', return_value=Mock(status_code=200)) as post_notification:
+            stats = oasis.sync_changed(Billboards.objects.filter(user=self.user), chunk_size=7, concurrency=1)
+        return stats, post_notification
+
+    def test_sends_only_changed(self):
+        # Seeded billboards never went through the outbox, so they are adopted
+        stats, post_notification = self.sync()
+        self.assertEqual((stats['sent'], stats['adopted']), (0, self.asset_count))
+        post_notification.assert_not_called()
+        self.assertEqual(OasisSyncState.objects.count(), self.asset_count)
+
+        stats, post_notification = self.sync()
+        self.assertEqual((stats['sent'], stats['skipped']), (0, self.asset_count))
+        post_notification.assert_not_called()
+
+        billboard = Billboards.objects.filter(user=self.user).first()
+        billboard.company_name = 'Renamed'
+        billboard.save()
+        stats, post_notification = self.sync()
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(post_notification.call_args[0][0], billboard.oasis_payload())
+        self.assertEqual(
+            OasisSyncState.objects.get(billboard=billboard).fingerprint,
+            oasis.payload_fingerprint(billboard.oasis_payload()),
+        )
+
+    def test_skips_pending_outbox(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        OasisOutbox.objects.create(billboard=billboard, unique_id=billboard.unique_id, payload=billboard.oasis_payload())
+        stats, _ = self.sync()
+        self.assertEqual(stats['checked'], self.asset_count - 1)
+        self.assertFalse(OasisSyncState.objects.filter(billboard=billboard).exists())
+
+    def test_sends_dead_lettered(self):
+        billboard = Billboards.objects.filter(user=self.user).first()
+        OasisOutbox.objects.create(
+            billboard=billboard, unique_id=billboard.unique_id, payload=billboard.oasis_payload(), status=OasisOutbox.STATUS_DEAD,
+        )
+        stats, post_notification = self.sync()
+        self.assertEqual((stats['sent'], stats['adopted']), (1, self.asset_count - 1))
+        self.assertEqual(post_notification.call_args[0][0], billboard.oasis_payload())
+
+    def test_one_run_at_a_time(self):
+        holder = JobLease.claim(oasis.SYNC_LEASE, 60)
+        stats, post_notification = self.sync()
+        self.assertTrue(stats['overlapped'])
+        self.assertEqual(stats['checked'], 0)
+
+        JobLease.release(oasis.SYNC_LEASE, holder)
+        stats, _ = self.sync()
+        self.assertEqual(stats['checked'], self.asset_count)
+        self.assertIsNone(JobLease.objects.get(name=oasis.SYNC_LEASE).holder)
@@ -3,8 +3,12 @@ from . import views
 
 urlpatterns = [
     path('asset/post-assets/', views.CreateAssetAPIView.as_view(), name='post_assets'),
+    path('asset/post-assets/bulk/', views.BulkCreateAssetAPIView.as_view(), name='post_assets_bulk'),
+    path('asset/sync/', views.AssetSyncAPIView.as_view(), name='asset_sync'),
     path('asset/list-assets/', views.AssetListAPIView.as_view(), name="list_assets"),
     path('asset/<int:pk>/', views.AssetRetrieveUpdateAPIView.as_view(), name='update_retrieve_asset'),
+    path('asset/nearby/', views.NearbyAssetsAPIView.as_view(), name='asset_nearby'),
+    path('asset/clusters/', views.AssetClustersAPIView.as_view(), name='asset_clusters'),
     path('asset/search/', views.AssetSearchAPIView.as_view(), name='asset_search'),
     path('asset/zones/', views.ZonesListView.as_view(), name='zones-list'),
     path('asset/dimensions/', views.DimensionsListView.as_view(), name='dimensions-list'),
@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from . serializers import CreateBillboardSerializer, AssetSerializer, AmountPerSqFtSerializer, ZonesSerializer, DimensionsSerializer, PaymentUpdateSerializer, AssetsDetailsSerializer
+from . serializers import CreateBillboardSerializer, AssetSerializer, AmountPerSqFtSerializer, ZonesSerializer, DimensionsSerializer, PaymentUpdateSerializer, AssetsDetailsSerializer, BulkCreateResultSerializer, SyncRequestSerializer
 from rest_framework.generics import ListAPIView, DestroyAPIView
 from rest_framework import generics
 from rest_framework.generics import RetrieveUpdateAPIView
@@ -12,15 +12,28 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from authentication.models import AnsaaUser
 from todo.models import Task
 from .models import Billboards, Zones, Dimensions, AmountPerSqFt
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 import logging
 logger = logging.getLogger(__name__)
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from .decorator import apikey_required
+from .decorator import apikey_required, idempotent
+from .pagination import KeysetPagination
+from .bulk import create_billboards
+from .sync import apply_sync
+from .clusters import level_for_zoom, query_clusters
+from .duplicates import check_upload
+from .feed import head_cursor, read_changes
+from . import geo, registry, search
+from django.conf import settings
+from ansaa_server.etags import conditional_get
+
+NEARBY_MAX_RADIUS = 50000
+NEARBY_MAX_RESULTS = 500
 
 @extend_schema(
     request=AmountPerSqFtSerializer,
@@ -34,6 +47,13 @@ class AmountPerSqFtListView(ListAPIView):
     queryset = AmountPerSqFt.objects.all()
     serializer_class = AmountPerSqFtSerializer
 
+    @conditional_get(['rates'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return registry.rates.all()
+
 
 @extend_schema(
     request=CreateBillboardSerializer,
@@ -46,32 +66,236 @@ class CreateAssetAPIView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CreateBillboardSerializer
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = CreateBillboardSerializer(data=request.data)
-        user = request.user.id
 
         if serializer.is_valid():
-            serializer.save(user=request.user)                
+            serializer.save(user=request.user)
+            complete_upload_task(request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-            # Check the task status and update if necessary
-            try:
-                tasks = Task.objects.filter(user=user, title="Add a Media Asset")
+        logger.warning(f"Validation failed: {serializer.errors}")
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-                if tasks.exists():
-                    task = tasks.first()  # Or handle multiple tasks as needed
-                    if not task.is_completed:
-                        task.is_completed = True
-                        task.save()
-                else:
-                    logger.info(f"Task 'Add a Media Asset' for user {user} is already completed.")
 
-            except ObjectDoesNotExist:
-                logger.warning(f"Task 'Add a Media Asset' not found for user {user}")
+def complete_upload_task(user):
+    """
+    Mark the user's 'Add a Media Asset' task as completed.
+    """
+    task = Task.objects.filter(user=user, title="Add a Media Asset").first()
+    if task is None:
+        logger.warning(f"Task 'Add a Media Asset' not found for user {user.id}")
+    elif not task.is_completed:
+        task.is_completed = True
+        task.save()
 
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        logger.warning(f"Validation failed: {serializer.errors}")
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@extend_schema(
+    request=CreateBillboardSerializer(many=True),
+    responses={
+        status.HTTP_201_CREATED: BulkCreateResultSerializer(many=True),
+        status.HTTP_207_MULTI_STATUS: BulkCreateResultSerializer(many=True),
+        status.HTTP_400_BAD_REQUEST: BulkCreateResultSerializer(many=True),
+    },
+    description=(
+        'Upload several media assets at once. The body is a list of the payloads '
+        'accepted by post-assets. Every item is validated; the valid ones are '
+        'created together and the result for each item is returned in order. '
+        'The status is 201 when all items were created, 207 when only some were, '
+        'and 400 when none were.'
+    ),
+    tags=["Media Assets"],
+    summary='Upload media assets in bulk',
+)
+class BulkCreateAssetAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list of assets.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.ASSET_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': f'At most {settings.ASSET_BULK_MAX_ITEMS} assets can be uploaded at once.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = [None] * len(items)
+        valid = []
+        for position, item in enumerate(items):
+            serializer = CreateBillboardSerializer(data=item, context={'batch': True})
+            if serializer.is_valid():
+                valid.append((position, serializer))
+            else:
+                results[position] = {'index': position, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors}
+
+        duplicate_errors = check_upload([serializer for _, serializer in valid], [position for position, _ in valid])
+        for (position, _), errors in zip(valid, duplicate_errors):
+            if errors:
+                results[position] = {'index': position, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+        valid = [entry for entry, errors in zip(valid, duplicate_errors) if not errors]
+
+        billboards = create_billboards(request.user, [serializer.validated_data for _, serializer in valid])
+        for (position, serializer), billboard in zip(valid, billboards):
+            results[position] = {
+                'index': position,
+                'status': status.HTTP_201_CREATED,
+                'id': billboard.pk,
+                'unique_id': billboard.unique_id,
+                'data': CreateBillboardSerializer(billboard).data,
+            }
+
+        if billboards:
+            complete_upload_task(request.user)
+        else:
+            logger.warning(f"Bulk upload failed validation for all {len(items)} assets")
+
+        if len(billboards) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif billboards:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(results, status=response_status)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter('bbox', str, required=True, description='Visible area as min_lng,min_lat,max_lng,max_lat.'),
+        OpenApiParameter('zoom', int, required=True, description='Map zoom level (0-22).'),
+    ],
+    responses={status.HTTP_200_OK: dict},
+    description=(
+        'Billboard clusters in the visible map area. Each cluster has its count, the centroid of '
+        'its billboards and the bounds of its grid cell. Clusters come from a pre-aggregated grid '
+        'pyramid, so the cost depends on the cells in view, not on the number of billboards.'
+    ),
+    tags=["Media Assets"],
+    summary='Map clusters of media assets',
+)
+class AssetClustersAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @conditional_get(['billboards'])
+    def get(self, request, *args, **kwargs):
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(value) for value in request.query_params['bbox'].split(','))
+            zoom = int(request.query_params['zoom'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Give bbox=min_lng,min_lat,max_lng,max_lat and zoom.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180 and 0 <= zoom <= 22):
+            return Response({'error': 'Coordinates or zoom are out of range.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        level, clusters = query_clusters(min_lat, min_lng, max_lat, max_lng, level_for_zoom(zoom))
+        return Response({'level': level, 'clusters': clusters})
+
+
+@extend_schema(
+    request=SyncRequestSerializer,
+    responses={status.HTTP_200_OK: dict, status.HTTP_409_CONFLICT: dict},
+    description=(
+        'Offline sync for the field app. Applies the assets created (`creates`, each with a '
+        'client-generated `client_id`) and edited (`updates`, each with the `row_version` it was '
+        'based on) while offline, then returns the user\'s assets created, updated or deleted after '
+        '`cursor`, and the cursor to send next time. Resent creates return the existing asset, and '
+        'edits made against an outdated `row_version` are returned as conflicts with the server copy.'
+    ),
+    tags=["Media Assets"],
+    summary='Sync media assets',
+)
+class AssetSyncAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SyncRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if len(data['creates']) + len(data['updates']) > settings.ASSET_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': f'At most {settings.ASSET_BULK_MAX_ITEMS} creates and updates can be synced at once.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            created, updated = apply_sync(request.user, data['creates'], data['updates'])
+        except IntegrityError:
+            return Response(
+                {'detail': 'Another sync created some of these assets at the same time; retry.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if any(result['status'] == status.HTTP_201_CREATED for result in created):
+            complete_upload_task(request.user)
+
+        limit = min(data.get('limit') or settings.CHANGE_FEED_PAGE_SIZE, settings.CHANGE_FEED_PAGE_SIZE)
+        upserted, tombstones, cursor, has_more = read_changes(
+            data['cursor'], limit,
+            billboards=Billboards.objects.filter(user=request.user).select_related('sub_zone'),
+            user_id=request.user.pk,
+        )
+        return Response({
+            'created': created,
+            'updated': updated,
+            'cursor': str(cursor),
+            'has_more': has_more,
+            'changes': AssetSerializer(upserted, many=True).data,
+            'deleted': tombstones,
+        })
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter('lat', float, description='Latitude of the centre point.'),
+        OpenApiParameter('lng', float, description='Longitude of the centre point.'),
+        OpenApiParameter('radius', float, description=f'Search radius in metres (default 1000, at most {NEARBY_MAX_RADIUS}).'),
+        OpenApiParameter('bbox', str, description='Bounding box as min_lng,min_lat,max_lng,max_lat, instead of lat/lng/radius.'),
+        OpenApiParameter('limit', int, description=f'Number of results (default 100, at most {NEARBY_MAX_RESULTS}).'),
+    ],
+    responses={status.HTTP_200_OK: dict},
+    description=(
+        'Media assets within a radius of a point, or inside a bounding box, nearest first. Each '
+        'result has a `distance` in metres from the point (or from the centre of the box). Admins '
+        'search every asset; other users search their own.'
+    ),
+    tags=["Media Assets"],
+    summary='Find nearby media assets',
+)
+class NearbyAssetsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            limit = max(1, min(int(params.get('limit') or 100), NEARBY_MAX_RESULTS))
+            if params.get('bbox'):
+                min_lng, min_lat, max_lng, max_lat = (float(value) for value in params['bbox'].split(','))
+                centre, radius = None, None
+            else:
+                centre = (float(params['lat']), float(params['lng']))
+                radius = float(params.get('radius') or 1000)
+                min_lat, min_lng, max_lat, max_lng = geo.radius_bbox(*centre, radius)
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'Give lat, lng and an optional radius, or bbox=min_lng,min_lat,max_lng,max_lat.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if radius is not None and not 0 < radius <= NEARBY_MAX_RADIUS:
+            return Response({'error': f'radius must be between 0 and {NEARBY_MAX_RADIUS} metres.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+            return Response({'error': 'Coordinates are out of range.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        assets = Billboards.objects.all()
+        if not request.user.is_superuser:
+            assets = assets.filter(user=request.user)
+        results, count = geo.search(assets, min_lat, min_lng, max_lat, max_lng, centre, radius, limit)
+        return Response({
+            'count': count,
+            'results': [
+                {**AssetSerializer(billboard).data, 'distance': round(distance, 1)}
+                for billboard, distance in results
+            ],
+        })
 
 
 @extend_schema(
@@ -80,7 +304,7 @@ class CreateAssetAPIView(generics.CreateAPIView):
     tags=["Media Assets"],
 )
 class AssetRetrieveUpdateAPIView(RetrieveUpdateAPIView):
-    queryset = Billboards.objects.all()
+    queryset = Billboards.objects.select_related('sub_zone')
     serializer_class = AssetSerializer
     permission_classes = [IsAuthenticated]
 
@@ -103,10 +327,15 @@ class AssetRetrieveUpdateAPIView(RetrieveUpdateAPIView):
 class AssetListAPIView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = AssetSerializer
+    pagination_class = KeysetPagination
+
+    @conditional_get(['billboards:user:{user}', 'zones'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
-        return Billboards.objects.filter(user=user)
+        return Billboards.objects.filter(user=user).select_related('sub_zone')
 
 
 
@@ -149,35 +378,57 @@ class AssetDeleteAPIView(APIView):
 
             
 @extend_schema(
-    description="The endpoint is use to filter media assets by (sign type, zone, status and vacancy).",
+    parameters=[
+        OpenApiParameter('q', str, description=(
+            'Free text matched against company name, street address, LGA, ASIN and unique ID. '
+            'Results are ordered by relevance and limited to one page.'
+        )),
+        OpenApiParameter('sign_type', str),
+        OpenApiParameter('zone', str),
+        OpenApiParameter('status', str),
+        OpenApiParameter('vacancy', str),
+        OpenApiParameter('payment_status', str),
+        OpenApiParameter('facets', bool, description=(
+            'Also return `facets`: for sign_type, zone, vacancy, status and payment_status, the '
+            'number of results each value would give with the other filters applied.'
+        )),
+    ],
+    description="The endpoint is use to search media assets by free text and filter them by (sign type, zone, status, vacancy and payment status).",
     summary='Media Search(Filter) endpoint',
     tags=["Media Assets"],
 )
 class AssetSearchAPIView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = AssetSerializer
+    pagination_class = KeysetPagination
 
     def get(self, request, *args, **kwargs):
         # Retrieve query parameters
-        sign_type = request.query_params.get('sign_type', None)
-        zone = request.query_params.get('zone', None)
-        vacancy = request.query_params.get('vacancy', None)
-        status_param = request.query_params.get('status', None)
+        selected = {
+            field: request.query_params[field]
+            for field in search.FACET_FIELDS if request.query_params.get(field) is not None
+        }
+        query = request.query_params.get('q', '').strip()
+        with_facets = request.query_params.get('facets', '').lower() in ('1', 'true')
         user = request.user
 
         # Filter billboards based on query parameters
         assets = Billboards.objects.filter(user=user)
-        if sign_type is not None:
-            assets = assets.filter(sign_type=sign_type)
-        if zone is not None:
-            assets = assets.filter(zone=zone)
-        if status_param is not None:
-            assets = assets.filter(status=status_param)
-        if vacancy is not None:
-            assets = assets.filter(vacancy=vacancy)
+        results = assets.filter(**selected).select_related('sub_zone')
+
+        paginator = self.pagination_class()
+        if query:
+            # Ranked results have no stable key to page on, so the best page is returned
+            ranked = search.ranked(results, query)[:paginator.get_page_size(request)]
+            response = Response({'next': None, 'previous': None, 'results': self.serializer_class(ranked, many=True).data})
+        else:
+            page = paginator.paginate_queryset(results, request, view=self)
+            serializer = self.serializer_class(page, many=True)
+            response = paginator.get_paginated_response(serializer.data)
 
-        serializer = self.serializer_class(assets, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if with_facets:
+            response.data['facets'] = search.facet_counts(search.matching(assets, query), selected)
+        return response
 
 
 @extend_schema(
@@ -190,6 +441,13 @@ class ZonesListView(generics.ListAPIView):
     queryset = Zones.objects.all()
     serializer_class = ZonesSerializer
 
+    @conditional_get(['zones'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return registry.zones.all()
+
 
 @extend_schema(
     description="Media assets dimension for determining assets price",
@@ -201,21 +459,59 @@ class DimensionsListView(generics.ListAPIView):
     queryset = Dimensions.objects.all()
     serializer_class = DimensionsSerializer
 
+    @conditional_get(['dimensions'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return registry.dimensions.all()
+
 
 # oasis endpoints
 
 @extend_schema(
     request=AssetsDetailsSerializer,
     responses={status.HTTP_200_OK: AssetsDetailsSerializer},
-    description='List all uploaded media assets from database',
+    description=(
+        'List all completed media assets, newest first, with cursor pagination.\n\n'
+        'Change feed mode: pass `since=<cursor>` to get only the assets created or updated '
+        'after that cursor, plus tombstones for deleted assets, and the cursor to poll from next. '
+        '`since=latest` returns the current cursor without changes, to start polling after a full listing.'
+    ),
     tags=["Media Assets"],
     summary='List all uploaded media assets',
 )
 class AssetDetailsListAPIView(generics.ListAPIView):
     serializer_class = AssetsDetailsSerializer
+    pagination_class = KeysetPagination
+
     @apikey_required
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        if since is not None:
+            return self.change_feed(request, since)
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        return Billboards.objects.filter(status="completed")
+        return Billboards.objects.filter(status="completed").select_related('sub_zone')
+
+    def change_feed(self, request, since):
+        if since == 'latest':
+            return Response({'cursor': str(head_cursor()), 'has_more': False, 'changes': [], 'deleted': []})
+        try:
+            since = int(since)
+            limit = int(request.query_params.get('limit') or settings.CHANGE_FEED_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'since must be a cursor returned by this endpoint and limit a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = max(1, min(limit, settings.CHANGE_FEED_PAGE_SIZE))
+        upserted, tombstones, cursor, has_more = read_changes(since, limit, billboards=self.get_queryset())
+        return Response({
+            'cursor': str(cursor),
+            'has_more': has_more,
+            'changes': self.get_serializer(upserted, many=True).data,
+            'deleted': tombstones,
+        })
 
 
 @extend_schema(
@@ -227,6 +523,7 @@ class AssetDetailsListAPIView(generics.ListAPIView):
 )
 class UpdatePaymentView(APIView):
     @apikey_required
+    @idempotent
     def post(self, request, unique_id):
         billboard = get_object_or_404(Billboards, unique_id=unique_id)
         serializer = PaymentUpdateSerializer(billboard, data=request.data, partial=True)
@@ -0,0 +1,13 @@
+import logging
+
+from .snapshots import take_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def take_daily_snapshot():
+    """
+    Record yesterday's inventory per zone and sub zone.
+    """
+    written = take_snapshot()
+    logger.info(f"Daily snapshot written for {written} zone(s)")
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from report.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the analytics rollup table from the billboards table.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cells = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {cells} rollup cell(s) in {time.monotonic() - started:.1f}s'
+        ))
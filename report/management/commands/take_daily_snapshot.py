@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from report.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the daily inventory snapshot (yesterday by default), counting '
+        'the billboards uploaded by the end of the day. For older days, '
+        'billboards are counted with their current vacancy, payment status '
+        'and price, and deleted billboards are left out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', type=date.fromisoformat, help='Day to record, as YYYY-MM-DD.')
+
+    def handle(self, *args, **options):
+        if options['day'] and options['day'] >= timezone.localdate():
+            raise CommandError('Only days that have ended can be recorded.')
+        written = take_snapshot(options['day'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} snapshot row(s).'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(blank=True, max_length=50)),
+                ('sub_zone_id', models.PositiveIntegerField(default=0)),
+                ('sign_type', models.CharField(blank=True, max_length=50)),
+                ('vacancy', models.CharField(blank=True, max_length=20)),
+                ('payment_status', models.CharField(blank=True, max_length=20)),
+                ('asset_lga', models.CharField(blank=True, max_length=150)),
+                ('asset_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+            ],
+            options={
+                'verbose_name': 'Asset rollup',
+                'verbose_name_plural': 'Asset rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='assetrollup',
+            constraint=models.UniqueConstraint(fields=('zone', 'sub_zone_id', 'sign_type', 'vacancy', 'payment_status', 'asset_lga'), name='unique_asset_rollup_cell'),
+        ),
+    ]
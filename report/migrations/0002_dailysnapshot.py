@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('zone', models.CharField(blank=True, max_length=50)),
+                ('sub_zone_id', models.PositiveIntegerField(default=0)),
+                ('total_assets', models.IntegerField(default=0)),
+                ('vacant_assets', models.IntegerField(default=0)),
+                ('occupied_assets', models.IntegerField(default=0)),
+                ('paid_assets', models.IntegerField(default=0)),
+                ('not_paid_assets', models.IntegerField(default=0)),
+                ('pending_payment_assets', models.IntegerField(default=0)),
+                ('assets_added', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+            ],
+            options={
+                'verbose_name': 'Daily snapshot',
+                'verbose_name_plural': 'Daily snapshots',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysnapshot',
+            constraint=models.UniqueConstraint(fields=('day', 'zone', 'sub_zone_id'), name='unique_daily_snapshot'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+# Kept in step with report/rollups.py as of this migration
+DIMENSIONS = ('zone', 'sub_zone_id', 'sign_type', 'vacancy', 'payment_status', 'asset_lga')
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Count the billboards that existed before the rollups were kept, so
+    analytics include them and later edits do not subtract from empty
+    cells. Skipped if the rollups have already been filled.
+    """
+    AssetRollup = apps.get_model('report', 'AssetRollup')
+    Billboards = apps.get_model('media_asset', 'Billboards')
+    if AssetRollup.objects.exists():
+        return
+
+    rows = (
+        Billboards.objects
+        .order_by()
+        .values(*DIMENSIONS)
+        .annotate(asset_count=Count('id'), revenue=Coalesce(Sum('price'), Value(Decimal(0))))
+    )
+    cells = {}
+    for row in rows:
+        key = tuple(
+            (row[attname] or 0) if attname == 'sub_zone_id' else (row[attname] or '')
+            for attname in DIMENSIONS
+        )
+        count, revenue = cells.get(key, (0, Decimal(0)))
+        cells[key] = (count + row['asset_count'], revenue + row['revenue'])
+
+    AssetRollup.objects.bulk_create(
+        [
+            AssetRollup(**dict(zip(DIMENSIONS, key)), asset_count=count, revenue=revenue)
+            for key, (count, revenue) in cells.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0002_dailysnapshot'),
+        ('media_asset', '0037_joblease'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,104 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import gettext_lazy as _
+from media_asset.models import Billboards
+from media_asset.signals import billboards_bulk_created, billboards_bulk_updated
 
-# Create your models here.
+
+class AssetRollup(models.Model):
+    """
+    Billboard count and price total for one combination of the analytics
+    dimensions. Kept up to date incrementally as billboards change, so
+    dashboards aggregate a few thousand cells instead of every asset.
+    """
+    zone = models.CharField(max_length=50, blank=True)
+    sub_zone_id = models.PositiveIntegerField(default=0)  # 0 when the billboard has no sub zone
+    sign_type = models.CharField(max_length=50, blank=True)
+    vacancy = models.CharField(max_length=20, blank=True)
+    payment_status = models.CharField(max_length=20, blank=True)
+    asset_lga = models.CharField(max_length=150, blank=True)
+    asset_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _('Asset rollup')
+        verbose_name_plural = _('Asset rollups')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['zone', 'sub_zone_id', 'sign_type', 'vacancy', 'payment_status', 'asset_lga'],
+                name='unique_asset_rollup_cell',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.zone}/{self.sub_zone_id}/{self.sign_type}: {self.asset_count}'
+
+
+class DailySnapshot(models.Model):
+    """
+    End-of-day inventory figures for one zone and sub zone, written by the
+    `report.cron.take_daily_snapshot` cron job.
+    """
+    day = models.DateField()
+    zone = models.CharField(max_length=50, blank=True)
+    sub_zone_id = models.PositiveIntegerField(default=0)  # 0 when the billboard has no sub zone
+    total_assets = models.IntegerField(default=0)
+    vacant_assets = models.IntegerField(default=0)
+    occupied_assets = models.IntegerField(default=0)
+    paid_assets = models.IntegerField(default=0)
+    not_paid_assets = models.IntegerField(default=0)
+    pending_payment_assets = models.IntegerField(default=0)
+    assets_added = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _('Daily snapshot')
+        verbose_name_plural = _('Daily snapshots')
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'zone', 'sub_zone_id'], name='unique_daily_snapshot'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.zone}/{self.sub_zone_id}: {self.total_assets}'
+
+
+def update_asset_rollup(sender, instance, created, **kwargs):
+    """
+    Move the billboard's count and price from its previous rollup cell to
+    its current one.
+    """
+    from .rollups import rollup_delta, apply_rollup_deltas
+
+    old = None if created else instance.loaded_values()
+    if not created and not old:
+        # Saved without being loaded, so there is nothing to compare with
+        return
+    apply_rollup_deltas(rollup_delta(old, instance))
+
+
+def remove_from_asset_rollup(sender, instance, **kwargs):
+    from .rollups import rollup_delta, apply_rollup_deltas
+
+    apply_rollup_deltas(rollup_delta(instance.loaded_values() or instance, None))
+
+
+def apply_bulk_update_to_rollup(sender, changes, **kwargs):
+    from .rollups import rollup_delta, apply_rollup_deltas
+
+    deltas = {}
+    for old, new in changes:
+        for key, (count, revenue) in rollup_delta(old, new).items():
+            cell = deltas.setdefault(key, [0, 0])
+            cell[0] += count
+            cell[1] += revenue
+    apply_rollup_deltas({key: cell for key, cell in deltas.items() if cell[0] or cell[1]})
+
+
+def add_bulk_create_to_rollup(sender, billboards, **kwargs):
+    apply_bulk_update_to_rollup(sender, [(None, billboard) for billboard in billboards])
+
+
+post_save.connect(update_asset_rollup, sender=Billboards)
+post_delete.connect(remove_from_asset_rollup, sender=Billboards)
+billboards_bulk_updated.connect(apply_bulk_update_to_rollup, sender=Billboards)
+billboards_bulk_created.connect(add_bulk_create_to_rollup, sender=Billboards)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ansaa_server.db import increment
+from media_asset import registry
+from media_asset.models import Billboards
+from .models import AssetRollup
+
+# Analytics dimension -> AssetRollup/Billboards attname
+DIMENSIONS = {
+    'zone': 'zone',
+    'sub_zone': 'sub_zone_id',
+    'sign_type': 'sign_type',
+    'vacancy': 'vacancy',
+    'payment_status': 'payment_status',
+    'asset_lga': 'asset_lga',
+}
+
+
+def rollup_key(values):
+    """
+    Rollup cell for a billboard, from a dict of attnames or a model instance.
+    """
+    get = values.get if isinstance(values, dict) else lambda attname: getattr(values, attname)
+    return tuple(
+        (get(attname) or 0) if attname == 'sub_zone_id' else (get(attname) or '')
+        for attname in DIMENSIONS.values()
+    )
+
+
+def _price(values):
+    price = values.get('price') if isinstance(values, dict) else values.price
+    return Decimal(price or 0)
+
+
+def rollup_delta(old, new):
+    """
+    Count and revenue changes per rollup cell when a billboard moves from
+    `old` to `new` (either may be None for a create or delete).
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    if old:
+        cell = deltas[rollup_key(old)]
+        cell[0] -= 1
+        cell[1] -= _price(old)
+    if new:
+        cell = deltas[rollup_key(new)]
+        cell[0] += 1
+        cell[1] += _price(new)
+    return {key: value for key, value in deltas.items() if value[0] or value[1]}
+
+
+def apply_rollup_deltas(deltas):
+    for key, (count, revenue) in deltas.items():
+        increment(
+            AssetRollup,
+            dict(zip(DIMENSIONS.values(), key)),
+            asset_count=count,
+            revenue=revenue,
+        )
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup cell from the billboards table in one grouped
+    query. Returns the number of cells written.
+
+    On PostgreSQL the rollup table is locked against increments before the
+    billboards are read, so a save that lands during the rebuild waits and
+    is added on top of it instead of being lost.
+    """
+    attnames = list(DIMENSIONS.values())
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                table = connection.ops.quote_name(AssetRollup._meta.db_table)
+                cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        rows = (
+            Billboards.objects
+            .order_by()
+            .values(*attnames)
+            .annotate(asset_count=Count('id'), revenue=Coalesce(Sum('price'), Value(Decimal(0))))
+        )
+        cells = {}
+        for row in rows:
+            key = rollup_key(row)
+            count, revenue = cells.get(key, (0, Decimal(0)))
+            cells[key] = (count + row['asset_count'], revenue + row['revenue'])
+
+        AssetRollup.objects.all().delete()
+        AssetRollup.objects.bulk_create(
+            [
+                AssetRollup(**dict(zip(attnames, key)), asset_count=count, revenue=revenue)
+                for key, (count, revenue) in cells.items()
+            ],
+            batch_size=1000,
+        )
+    return len(cells)
+
+
+def query_rollups(group_by=(), filters=None):
+    """
+    Answer an analytics query with one aggregate over the rollup table.
+    `group_by` is a list of dimension names and `filters` maps dimension
+    names to lists of accepted values.
+    """
+    filters = filters or {}
+    queryset = AssetRollup.objects.all()
+    zone_names = None
+
+    for dimension, values in filters.items():
+        if dimension == 'sub_zone':
+            values = registry.zones.ids_for_names(values)
+        queryset = queryset.filter(**{f'{DIMENSIONS[dimension]}__in': values})
+
+    attnames = [DIMENSIONS[dimension] for dimension in group_by]
+    rows = (
+        queryset
+        .order_by()
+        .values(*attnames)
+        .annotate(count=Sum('asset_count'), total=Sum('revenue'))
+        .filter(count__gt=0)
+        .order_by(*attnames)
+    )
+
+    if 'sub_zone' in group_by:
+        zone_names = registry.zones.names_by_id()
+
+    results = []
+    total_count, total_revenue = 0, Decimal(0)
+    for row in rows:
+        item = {}
+        for dimension, attname in zip(group_by, attnames):
+            value = row[attname]
+            item[dimension] = zone_names.get(value, '') if dimension == 'sub_zone' else value
+        item['count'] = row['count']
+        item['revenue'] = row['total']
+        total_count += row['count']
+        total_revenue += row['total']
+        results.append(item)
+
+    return {
+        'group_by': list(group_by),
+        'totals': {'count': total_count, 'revenue': total_revenue},
+        'results': results,
+    }
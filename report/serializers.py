@@ -1,9 +1,58 @@
 from media_asset.models import Billboards
 from rest_framework import serializers
+from datetime import timedelta
+from django.utils import timezone
+from .rollups import DIMENSIONS
 
 
 class ReportSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Billboards
-        fields = ['date','vacancy']
\ No newline at end of file
+        fields = ['date','vacancy']
+
+
+class CommaSeparatedField(serializers.CharField):
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    group_by = CommaSeparatedField(required=False, help_text='Comma separated dimensions to group by')
+    zone = CommaSeparatedField(required=False)
+    sub_zone = CommaSeparatedField(required=False, help_text='Sub zone names')
+    sign_type = CommaSeparatedField(required=False)
+    vacancy = CommaSeparatedField(required=False)
+    payment_status = CommaSeparatedField(required=False)
+    asset_lga = CommaSeparatedField(required=False)
+
+    def validate_group_by(self, value):
+        unknown = [dimension for dimension in value if dimension not in DIMENSIONS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown dimension(s): {', '.join(unknown)}. Choose from {', '.join(DIMENSIONS)}."
+            )
+        return list(dict.fromkeys(value))
+
+    def validate(self, data):
+        group_by = data.pop('group_by', [])
+        return {'group_by': group_by, 'filters': data}
+
+
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False, help_text='First day (defaults to one year before `end`)')
+    end = serializers.DateField(required=False, help_text='Last day (defaults to today)')
+    group_by = serializers.ChoiceField(choices=['zone', 'sub_zone'], required=False)
+    zone = CommaSeparatedField(required=False)
+    sub_zone = CommaSeparatedField(required=False, help_text='Sub zone names')
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=365))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        if (data['end'] - data['start']).days > 3 * 366:
+            raise serializers.ValidationError('The range is limited to three years.')
+        return data
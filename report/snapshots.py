@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from media_asset import registry
+from media_asset.models import Billboards
+from .models import DailySnapshot
+
+METRICS = (
+    'total_assets', 'vacant_assets', 'occupied_assets', 'paid_assets',
+    'not_paid_assets', 'pending_payment_assets', 'assets_added', 'revenue',
+)
+
+GROUPS = {
+    'zone': ('zone',),
+    'sub_zone': ('zone', 'sub_zone_id'),
+}
+
+
+def take_snapshot(day=None):
+    """
+    Write one snapshot row per zone and sub zone for `day` (yesterday by
+    default), as of the end of that day: every billboard uploaded before
+    midnight is counted, in one grouped read on `Billboards.date`. For a day
+    further back, billboards keep their current vacancy, payment status and
+    price, and billboards deleted since are not counted.
+    Returns the number of rows written.
+    """
+    if day is None:
+        day = timezone.localdate() - timedelta(days=1)
+
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    day_end = day_start + timedelta(days=1)
+    rows = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    cells = (
+        Billboards.objects
+        .filter(date__lt=day_end)
+        .order_by()
+        .values('zone', 'sub_zone_id', 'vacancy', 'payment_status')
+        .annotate(
+            count=Count('id'),
+            added=Count('id', filter=Q(date__gte=day_start)),
+            total=Coalesce(Sum('price'), Value(Decimal(0))),
+        )
+    )
+    for cell in cells:
+        row = rows[(cell['zone'] or '', cell['sub_zone_id'] or 0)]
+        row['total_assets'] += cell['count']
+        row['assets_added'] += cell['added']
+        row['revenue'] += cell['total']
+
+        vacancy = (cell['vacancy'] or '').lower()
+        if vacancy == Billboards.VACANCY_VACANT.lower():
+            row['vacant_assets'] += cell['count']
+        elif vacancy == Billboards.VACANCY_OCCUPIED.lower():
+            row['occupied_assets'] += cell['count']
+
+        if cell['payment_status'] == Billboards.PAID:
+            row['paid_assets'] += cell['count']
+        elif cell['payment_status'] == Billboards.NOT_PAID:
+            row['not_paid_assets'] += cell['count']
+        elif cell['payment_status'] == Billboards.PENDING:
+            row['pending_payment_assets'] += cell['count']
+
+    snapshots = [
+        DailySnapshot(day=day, zone=zone, sub_zone_id=sub_zone_id, **values)
+        for (zone, sub_zone_id), values in rows.items()
+    ]
+    DailySnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['day', 'zone', 'sub_zone_id'],
+        update_fields=list(METRICS),
+    )
+    return len(snapshots)
+
+
+def query_timeseries(start, end, group_by=None, zone=None, sub_zone=None):
+    """
+    Daily figures between `start` and `end` (inclusive), summed over the
+    requested scope and optionally split by zone or sub zone.
+    """
+    queryset = DailySnapshot.objects.filter(day__range=(start, end))
+    if zone:
+        queryset = queryset.filter(zone__in=zone)
+    if sub_zone:
+        queryset = queryset.filter(sub_zone_id__in=registry.zones.ids_for_names(sub_zone))
+
+    group_fields = GROUPS.get(group_by, ())
+    rows = (
+        queryset
+        .order_by()
+        .values('day', *group_fields)
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by('day', *group_fields)
+    )
+
+    zone_names = registry.zones.names_by_id() if group_by == 'sub_zone' else {}
+    results = []
+    for row in rows:
+        if 'sub_zone_id' in row:
+            row['sub_zone'] = zone_names.get(row.pop('sub_zone_id'), '')
+        total = row['total_assets'] or 0
+        row['vacancy_ratio'] = round(row['vacant_assets'] / total, 4) if total else None
+        row['revenue'] = row['revenue'] or Decimal(0)
+        results.append(row)
+    return results
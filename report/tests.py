@@ -1,3 +1,121 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from ansaa_server.testing import QueryBudgetTestCase, SeededDataMixin
+from media_asset.bulk import create_billboards
+from media_asset.models import Billboards
+from media_asset.tests import asset_payload
+from .models import AssetRollup, DailySnapshot
+from .rollups import rebuild_rollups
+from .snapshots import take_snapshot
+from .utils import period_start
+
+
+class ReportQueryBudgetTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        rebuild_rollups()
+        take_snapshot()
+
+    def test_download_report(self):
+        self.assertQueryBudget(1, '/api/download-report/')
+        self.assertQueryBudget(1, '/api/download-report/', {'time_filter': 'year', 'vacancy': 'vacant'})
+
+    def test_download_report_cached(self):
+        self.assertQueryBudget(1, '/api/download-report/', {'time_filter': 'month'})
+        self.assertQueryBudget(0, '/api/download-report/', {'time_filter': 'month'})
+
+    def test_count_assets(self):
+        response = self.assertQueryBudget(1, '/api/count-assets/', {'time_filter': 'year'})
+        self.assertTrue(response.data['count'])
+
+    def test_analytics(self):
+        self.client.force_authenticate(self.admin)
+        response = self.assertQueryBudget(1, '/api/analytics/', {'group_by': 'zone,sign_type'})
+        self.assertTrue(response.data)
+        # The first sub zone lookup loads the zone registry
+        self.assertQueryBudget(2, '/api/analytics/', {'group_by': 'sub_zone', 'sub_zone': 'Sub zone 1'})
+        self.assertQueryBudget(1, '/api/analytics/', {'group_by': 'sub_zone', 'sub_zone': 'Sub zone 2'})
+
+    def test_timeseries(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(1, '/api/analytics/timeseries/', {'group_by': 'zone'})
+
+
+class RollupTests(SeededDataMixin, APITestCase):
+
+    def rollups(self):
+        return set(
+            AssetRollup.objects.exclude(asset_count=0)
+            .values_list('zone', 'sub_zone_id', 'sign_type', 'vacancy', 'payment_status', 'asset_lga', 'asset_count', 'revenue')
+        )
+
+    def test_edits_match_rebuild(self):
+        rebuild_rollups()
+        billboard = Billboards.objects.filter(user=self.user).first()
+        billboard.vacancy = 'occupied' if billboard.vacancy == 'vacant' else 'vacant'
+        billboard.save()
+        with patch('media_asset.bulk.schedule_qr_render'):
+            created, = create_billboards(self.user, [{**asset_payload(1), 'sub_zone': self.sub_zones[1]}])
+        # Saved again without being read back from the database
+        created.price = Decimal('10.00')
+        created.save()
+
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_migration_backfills_existing_billboards(self):
+        rebuild_rollups()
+        rebuilt = self.rollups()
+        AssetRollup.objects.all().delete()
+        backfill = import_module('report.migrations.0003_backfill_asset_rollups').backfill_rollups
+        backfill(apps, None)
+        self.assertEqual(self.rollups(), rebuilt)
+        # Rollups already in use are not counted twice
+        backfill(apps, None)
+        self.assertEqual(self.rollups(), rebuilt)
+
+
+class SnapshotTests(SeededDataMixin, APITestCase):
+
+    def test_past_day_counts_billboards_uploaded_by_then(self):
+        dates = sorted(Billboards.objects.values_list('date', flat=True))
+        day = timezone.localdate(dates[len(dates) // 2])
+        take_snapshot(day)
+
+        day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        totals = DailySnapshot.objects.filter(day=day).aggregate(total=Sum('total_assets'), added=Sum('assets_added'))
+        self.assertEqual(totals['total'], Billboards.objects.filter(date__lt=day_end).count())
+        self.assertEqual(totals['added'], Billboards.objects.filter(date__lt=day_end, date__gte=day_end - timedelta(days=1)).count())
+        self.assertLess(totals['total'], Billboards.objects.count())
+
+    def test_command_rejects_unfinished_days(self):
+        with self.assertRaises(CommandError):
+            call_command('take_daily_snapshot', day=timezone.localdate(), stdout=StringIO())
+
+
+class PeriodStartTests(SimpleTestCase):
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_periods_start_at_local_midnight(self):
+        # Thursday 14 March 2024, 03:30 in Kolkata and still Wednesday in UTC
+        now = datetime(2024, 3, 13, 22, 0, tzinfo=dt_timezone.utc)
+        local = timezone.get_current_timezone()
+        with patch('django.utils.timezone.now', return_value=now):
+            self.assertEqual(period_start('week'), timezone.make_aware(datetime(2024, 3, 11), local))
+            self.assertEqual(period_start('month'), timezone.make_aware(datetime(2024, 3, 1), local))
+            self.assertEqual(period_start('year'), timezone.make_aware(datetime(2024, 1, 1), local))
+            self.assertIsNone(period_start(None))
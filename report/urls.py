@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('download-report/', views.ReportDownloadView.as_view(), name='download-report'),
     path('count-assets/', views.CountReportView.as_view(), name='count-assets'),
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+    path('analytics/timeseries/', views.TimeseriesView.as_view(), name='analytics-timeseries'),
 ]
@@ -1,22 +1,29 @@
 import csv
-from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 from media_asset.models import Billboards
+from ansaa_server.versioning import get_versions
 
 
-def filter_billboards(user, time_filter=None, vacancy=None):
-    now = timezone.now()
+def period_start(time_filter):
+    """
+    Start of the current week, month or year (midnight, local time), or None.
+    """
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # Determine the start date based on time_filter
     if time_filter == 'week':
-        start_date = now - timedelta(days=now.weekday())
-    elif time_filter == 'month':
-        start_date = now.replace(day=1)
-    elif time_filter == 'year':
-        start_date = now.replace(month=1, day=1)
-    else:
-        start_date = None
+        return today - timedelta(days=today.weekday())
+    if time_filter == 'month':
+        return today.replace(day=1)
+    if time_filter == 'year':
+        return today.replace(month=1, day=1)
+    return None
+
+
+def filter_billboards(user, time_filter=None, vacancy=None):
+    start_date = period_start(time_filter)
 
     # Superuser sees all billboards; others only their own
     if user.is_superuser:
@@ -35,63 +42,142 @@ def filter_billboards(user, time_filter=None, vacancy=None):
     return queryset
 
 
+REPORT_HEADER = [
+    'Unique ID', 'Asset Type', 'Signage Type', 'Zone', 'Sub Zone',
+    'Status', 'Vacancy', 'Dimension', 'Actual_size', 'Price',
+    'Payment status', 'Payment date', 'User', 'Qr_code', 'Date'
+]
+
+REPORT_COLUMNS = (
+    'unique_id', 'sign_type', 'signage_type', 'zone', 'sub_zone__name',
+    'status', 'vacancy', 'dimension', 'actual_size', 'price',
+    'payment_status', 'payment_date', 'user__fullname', 'qr_code', 'date',
+)
+
+# Rows are written to the response in blocks of this many lines.
+REPORT_ROWS_PER_CHUNK = 500
+
+
+class Echo:
+    """
+    File-like object whose write() hands the value straight back, so
+    csv.writer can format rows for a streaming response.
+    """
+    def write(self, value):
+        return value
+
+
+def _choice_labels(choices):
+    return {value: str(label) for value, label in choices.items()}
+
+
+def iter_csv_report(user, time_filter=None, vacancy=None, chunk_size=2000):
+    """
+    Return an iterator of CSV text blocks for the billboard report.
+
+    Rows are read as plain tuples through a server-side cursor, with the
+    sub zone and user names joined in the same query and choice labels
+    translated once up front, so memory stays flat and the query count
+    does not grow with the number of rows.
+    """
+    rows = filter_billboards(user, time_filter, vacancy).values_list(*REPORT_COLUMNS)
+
+    sign_types = _choice_labels(Billboards.SIGN_TYPE)
+    signage_types = _choice_labels(Billboards.SIGNAGE_TYPE)
+    zones = _choice_labels(Billboards.ZONE_CHOICES)
+    statuses = _choice_labels(Billboards.STATUS_CHOICES)
+    vacancies = _choice_labels(Billboards.VACANCY_CHOICES)
+    payment_statuses = _choice_labels(Billboards.PAYMENT_CHOICES)
+
+    def stream():
+        writer = csv.writer(Echo())
+        yield writer.writerow(REPORT_HEADER)
+
+        block = []
+        for (unique_id, sign_type, signage_type, zone, sub_zone, status, vacancy, dimension,
+             actual_size, price, payment_status, payment_date, fullname, qr_code, date) in rows.iterator(chunk_size=chunk_size):
+            block.append(writer.writerow([
+                unique_id,
+                sign_types.get(sign_type, sign_type),
+                signage_types.get(signage_type, signage_type),
+                zones.get(zone, zone),
+                sub_zone,
+                statuses.get(status, status),
+                vacancies.get(vacancy, vacancy),
+                dimension,
+                actual_size,
+                price,
+                payment_statuses.get(payment_status, payment_status),
+                payment_date,
+                fullname,
+                f"https://dotsassets.com/{qr_code or ''}",
+                date,
+            ]))
+            if len(block) >= REPORT_ROWS_PER_CHUNK:
+                yield ''.join(block)
+                block = []
+        if block:
+            yield ''.join(block)
+
+    return stream()
+
+
 def generate_csv_report(user, time_filter=None, vacancy=None):
-    billboards = filter_billboards(user, time_filter, vacancy)
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        'Unique ID', 'Asset Type', 'Signage Type', 'Zone', 'Sub Zone',
-        'Status', 'Vacancy', 'Dimension', 'Actual_size', 'Price',
-        'Payment status', 'Payment date', 'User', 'Qr_code', 'Date'
-    ])
-
-    for billboard in billboards:
-        writer.writerow([
-            billboard.unique_id,
-            billboard.get_sign_type_display(),
-            billboard.get_signage_type_display(),
-            billboard.get_zone_display(),
-            billboard.sub_zone,
-            billboard.get_status_display(),
-            billboard.get_vacancy_display(),
-            billboard.dimension,
-            billboard.actual_size,
-            billboard.price,
-            billboard.get_payment_status_display(),
-            billboard.payment_date,
-            billboard.user,
-            f"https://dotsassets.com/{billboard.qr_code}",
-            billboard.date,
-        ])
-
-    return output.getvalue()
+    return ''.join(iter_csv_report(user, time_filter, vacancy))
 
 
 def count_billboards(user, time_filter=None, vacancy=None):
-    now = timezone.now()
+    return filter_billboards(user, time_filter, vacancy)
 
-    # Determine the start date based on time_filter
-    if time_filter == 'week':
-        start_date = now - timedelta(days=now.weekday())
-    elif time_filter == 'month':
-        start_date = now.replace(day=1)
-    elif time_filter == 'year':
-        start_date = now.replace(month=1, day=1)
-    else:
-        start_date = None
 
-    # Superuser sees all billboards; others only their own
+def report_cache_key(kind, user, time_filter=None, vacancy=None):
+    """
+    Cache key for a report snapshot. It changes whenever the billboards in
+    the user's scope change, or the reporting period rolls over.
+    """
     if user.is_superuser:
-        queryset = Billboards.objects.all()
+        scope, namespace = 'all', 'billboards'
     else:
-        queryset = Billboards.objects.filter(user=user)
-
-    # Apply filters
-    if start_date:
-        queryset = queryset.filter(date__gte=start_date)
-
-    if vacancy is not None:
-        queryset = queryset.filter(vacancy=vacancy)
-
-    return queryset
+        scope, namespace = f'user:{user.pk}', f'billboards:user:{user.pk}'
+    billboards_version, zones_version = get_versions(namespace, 'zones')
+    start_date = period_start(time_filter)
+    period = start_date.date().isoformat() if start_date else 'all'
+    return f'report:{kind}:{scope}:{period}:{vacancy}:{billboards_version}:{zones_version}'
+
+
+def cached_csv_report(user, time_filter=None, vacancy=None):
+    """
+    Return an iterator of CSV text blocks, served from the snapshot cache
+    when possible. On a miss the report is streamed as usual and stored
+    once it has been fully sent, unless it exceeds REPORT_CACHE_MAX_BYTES.
+    """
+    key = report_cache_key('csv', user, time_filter, vacancy)
+    content = cache.get(key)
+    if content is not None:
+        return iter([content])
+
+    rows = iter_csv_report(user, time_filter, vacancy)
+
+    def stream_and_store():
+        blocks, size = [], 0
+        for block in rows:
+            yield block
+            if blocks is not None:
+                size += len(block)
+                if size > settings.REPORT_CACHE_MAX_BYTES:
+                    blocks = None
+                else:
+                    blocks.append(block)
+        if blocks is not None:
+            cache.set(key, ''.join(blocks), settings.REPORT_CACHE_TIMEOUT)
+
+    return stream_and_store()
+
+
+def cached_count(user, time_filter=None, vacancy=None):
+    key = report_cache_key('count', user, time_filter, vacancy)
+    count = cache.get(key)
+    if count is None:
+        count = count_billboards(user, time_filter, vacancy).count()
+        cache.set(key, count, settings.REPORT_CACHE_TIMEOUT)
+    return count
@@ -1,10 +1,12 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
-from django.http import HttpResponse
-from .utils import generate_csv_report, count_billboards
-from .serializers import ReportSerializer
+from django.http import StreamingHttpResponse
+from .utils import cached_csv_report, cached_count
+from .serializers import ReportSerializer, AnalyticsQuerySerializer, TimeseriesQuerySerializer
+from .rollups import query_rollups
+from .snapshots import query_timeseries
 from drf_spectacular.utils import extend_schema
 
 
@@ -32,7 +34,7 @@ class ReportDownloadView(APIView):
         vacancy = request.query_params.get('vacancy')
 
         try:
-            csv_content = generate_csv_report(user, time_filter, vacancy)
+            csv_rows = cached_csv_report(user, time_filter, vacancy)
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -46,8 +48,8 @@ class ReportDownloadView(APIView):
             filename += '_full'
         filename += '.csv'
 
-        # Return CSV response
-        response = HttpResponse(csv_content, content_type='text/csv')
+        # Stream the CSV so memory use does not grow with the report size
+        response = StreamingHttpResponse(csv_rows, content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
@@ -81,7 +83,50 @@ class CountReportView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        billboards = count_billboards(user, time_filter, vacancy)
-        count = billboards.count()
+        count = cached_count(user, time_filter, vacancy)
 
         return Response({'count': count}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[AnalyticsQuerySerializer],
+    description=(
+        "Billboard counts and price totals grouped by any combination of "
+        "`zone`, `sub_zone`, `sign_type`, `vacancy`, `payment_status` and `asset_lga`. "
+        "The same names can be used as filters; separate several values with commas.\n\n"
+        "**Examples:**\n"
+        "`/analytics/?group_by=zone,sign_type`\n"
+        "`/analytics/?group_by=sub_zone&vacancy=Vacant&payment_status=paid,pending`\n"
+    ),
+    summary='Asset analytics',
+    tags=["Report"],
+)
+class AnalyticsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(query_rollups(**query.validated_data), status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[TimeseriesQuerySerializer],
+    description=(
+        "Daily inventory figures (total, vacant, occupied, paid, not paid, pending payment, "
+        "assets added, revenue and vacancy ratio) from the nightly snapshots. "
+        "Defaults to the last year, summed over the whole state.\n\n"
+        "**Examples:**\n"
+        "`/analytics/timeseries/?group_by=zone`\n"
+        "`/analytics/timeseries/?start=2025-01-01&end=2025-06-30&sub_zone=Awka`\n"
+    ),
+    summary='Asset time series',
+    tags=["Report"],
+)
+class TimeseriesView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        query = TimeseriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response({'results': query_timeseries(**query.validated_data)}, status=status.HTTP_200_OK)
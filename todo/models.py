@@ -1,5 +1,6 @@
 from django.db import models
 from authentication.models import AnsaaUser
+from ansaa_server.versioning import bump_version
 
 
 class DeviceDetail(models.Model):
@@ -45,4 +46,14 @@ def create_default_task(sender, instance, created, **kwargs):
         )
 
 # Connect signal to create default task
-models.signals.post_save.connect(create_default_task, sender=AnsaaUser)
\ No newline at end of file
+models.signals.post_save.connect(create_default_task, sender=AnsaaUser)
+
+
+def bump_tasks_version(sender, instance, **kwargs):
+    """
+    Invalidate the ETag of the user's task list.
+    """
+    bump_version(f'tasks:user:{instance.user_id}')
+
+models.signals.post_save.connect(bump_tasks_version, sender=Task)
+models.signals.post_delete.connect(bump_tasks_version, sender=Task)
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from ansaa_server.testing import QueryBudgetTestCase
+from .models import DeviceDetail, Task
 
-# Create your tests here.
+
+class TodoQueryBudgetTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        DeviceDetail.objects.bulk_create(
+            DeviceDetail(user=cls.user, device_name=f'Device {number}', device_id=f'device-{number}', os='android')
+            for number in range(10)
+        )
+
+    def test_tasks(self):
+        response = self.assertQueryBudget(1, '/api/task/')
+        self.assertEqual(len(response.data), 3)
+
+    def test_devices(self):
+        response = self.assertQueryBudget(1, '/api/task/devices/')
+        self.assertEqual(len(response.data), 10)
+
+    def test_tasks_not_modified(self):
+        etag = self.client.get('/api/task/')['ETag']
+        response = self.assertQueryBudget(0, '/api/task/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.filter(user=self.user).first()
+            task.is_completed = True
+            task.save()
+        self.assertEqual(self.client.get('/api/task/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -14,6 +14,8 @@ from . serializers import DeviceDetailSerializer, TaskSerializer
 from . models import DeviceDetail, Task
 import asyncio
 from drf_spectacular.utils import extend_schema
+from ansaa_server.etags import conditional_get
+from media_asset.decorator import idempotent
 import logging
 logger = logging.getLogger(__name__)
 from drf_spectacular.utils import extend_schema
@@ -31,6 +33,7 @@ class DeviceCreateAPIView(CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = DeviceDetailSerializer
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = DeviceDetailSerializer(data=request.data)
         user = request.user
@@ -100,6 +103,10 @@ class TaskAPIView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = TaskSerializer
 
+    @conditional_get(['tasks:user:{user}'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         return Task.objects.filter(user=user)
\ No newline at end of file